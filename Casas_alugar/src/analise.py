@@ -0,0 +1,197 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import config as cfg
+import etl
+import consulta
+import servico_dados
+
+# ==============================================================================
+# CAMADA DE ANÁLISE (KPIs E DADOS DOS GRÁFICOS, SEM STREAMLIT)
+# ==============================================================================
+# Cada função recebe a versão da base (snapshots.py) e os termos do filtro
+# (consulta.py: (coluna, operador, valor), combinados com E) e devolve os KPIs
+# de uma aba ou a tabela de um gráfico. São puras: o resultado só depende dos
+# argumentos, então ficam memoizadas por (versão, termos) no processo
+# (servico_dados.memorizar) e o mesmo estado de filtros em outra sessão não
+# recalcula nada. As tabelas devolvidas são compartilhadas: somente leitura.
+#
+# Os resultados (pequenos) ficam em servico_dados.RESULTADOS. As linhas
+# filtradas, que podem ser grandes, só ficam para as últimas SELECOES_RETIDAS
+# seleções: as funções das duas abas filtram a base uma vez só.
+
+# Participação da imobiliária sobre o aluguel
+TAXA_PARTICIPACAO = 0.10
+SELECOES_RETIDAS = 2
+
+_SELECOES = servico_dados.CacheResultados(limite=SELECOES_RETIDAS)
+
+
+def normalizar_termos(termos):
+    """Termos como tupla hasheável (listas de valores viram tuplas): a chave de cache do filtro."""
+    return tuple(
+        (coluna, operador, tuple(valor) if isinstance(valor, (list, tuple, set)) else valor)
+        for coluna, operador, valor in termos
+    )
+
+
+def _filtrar(versao, termos):
+    df = etl.carregar_dados(cfg.COLUNAS_DASHBOARD, versao=versao)
+    filtro = consulta.Consulta(df, etl.carregar_indice(versao=versao))
+    for coluna, operador, valor in termos:
+        filtro.filtrar(coluna, operador, list(valor) if isinstance(valor, tuple) else valor)
+    return filtro.resultado(cfg.COLUNAS_ABA_FINANCEIRO + [c for c in cfg.COLUNAS_ABA_IMOVEIS
+                                                          if c not in cfg.COLUNAS_ABA_FINANCEIRO])
+
+
+def _imoveis(versao, termos):
+    """Linhas que passam nos termos, com as colunas das duas abas (uma seleção para todas as funções)."""
+    return _SELECOES.obter((cfg.PASTA_VERSOES, versao, termos), lambda: _filtrar(versao, termos))
+
+
+# --- RESUMO EM UMA PASSADA (TIPO IMÓVEL × ESTADO) ---
+# Os KPIs e gráficos das abas que não dependem do bairro saem de um único
+# agrupamento das linhas filtradas: para cada par (Tipo Imóvel, Estado), o nº
+# de imóveis e, por medida, a soma e a contagem de não nulos. O par vira um
+# código só (códigos das duas categorias) e cada total é um np.bincount: sem
+# máscaras nem cópias do quadro. Médias = soma / contagem, como o mean(), que
+# ignora nulos; por status ou no filtro inteiro, somam-se as células.
+#
+# Matrizes (tipos + 1) × (estados + 1): a linha/coluna 0 guarda os imóveis sem
+# tipo/estado, que contam nos totais mas não aparecem nas contagens por valor.
+
+MEDIDAS_RESUMO = {'aluguel': 'Valor do Aluguel', 'custo': 'Custo_Mensal', 'm2': 'Preco_m2', 'area': 'Area'}
+
+# imoveis: matriz de contagens; somas e contagens: {medida: matriz}
+Resumo = namedtuple('Resumo', ['tipos', 'estados', 'imoveis', 'somas', 'contagens'])
+
+
+def resumir(df_filt):
+    """Resumo (Tipo Imóvel × Estado) das linhas de 'df_filt'."""
+    tipo = df_filt['Tipo Imóvel'].astype('category').cat
+    estado = df_filt['Estado'].astype('category').cat
+    forma = (len(tipo.categories) + 1, len(estado.categories) + 1)
+    celulas = forma[0] * forma[1]
+    codigos = (tipo.codes.to_numpy(np.int64) + 1) * forma[1] + estado.codes.to_numpy(np.int64) + 1
+
+    somas, contagens = {}, {}
+    for nome, coluna in MEDIDAS_RESUMO.items():
+        valores = df_filt[coluna].to_numpy(np.float64)
+        nulos = np.isnan(valores)
+        somas[nome] = np.bincount(codigos, np.where(nulos, 0.0, valores), celulas).reshape(forma)
+        contagens[nome] = np.bincount(codigos[~nulos], minlength=celulas).reshape(forma)
+    imoveis = np.bincount(codigos, minlength=celulas).reshape(forma)
+    return Resumo(list(tipo.categories), list(estado.categories), imoveis, somas, contagens)
+
+
+@servico_dados.memorizar
+def resumo(versao, termos):
+    """resumir() das linhas que passam nos termos."""
+    return resumir(_imoveis(versao, termos))
+
+
+def _media(soma, n):
+    return soma / n if n > 0 else float('nan')
+
+
+def _por_estado(matriz):
+    return matriz[:, 1:].sum(axis=0)
+
+
+def _contagem(valores, contagens, nome):
+    """Como value_counts().loc[> 0]: (nome, Qtd) do valor mais frequente ao menos."""
+    serie = pd.Series(contagens, index=pd.CategoricalIndex(valores, categories=valores), name='Qtd')
+    contagem = serie.sort_values(ascending=False).loc[lambda s: s > 0].reset_index()
+    contagem.columns = [nome, 'Qtd']
+    return contagem
+
+
+def _por_status(r, valores, nome):
+    """Tabela (Estado, nome) dos status presentes no filtro."""
+    presentes = _por_estado(r.imoveis) > 0
+    estados = pd.Categorical(np.array(r.estados, dtype=object)[presentes], categories=r.estados)
+    return pd.DataFrame({'Estado': estados, nome: valores[presentes]})
+
+
+# --- PAINEL FINANCEIRO ---
+
+@servico_dados.memorizar
+def kpis_financeiros(versao, termos):
+    """Médias de aluguel, custo mensal e m², e a participação sobre disponíveis e locados."""
+    r = resumo(versao, termos)
+    aluguel = dict(zip(r.estados, _por_estado(r.somas['aluguel'])))
+    return {
+        'aluguel_medio': _media(r.somas['aluguel'].sum(), r.contagens['aluguel'].sum()),
+        'custo_medio': _media(r.somas['custo'].sum(), r.contagens['custo'].sum()),
+        'preco_m2': _media(r.somas['m2'].sum(), r.contagens['m2'].sum()),
+        'participacao_disponivel': aluguel.get('Disponível', 0.0) * TAXA_PARTICIPACAO,
+        'participacao_locados': aluguel.get('Locado', 0.0) * TAXA_PARTICIPACAO,
+    }
+
+
+@servico_dados.memorizar
+def ocupacao(versao, termos):
+    """Imóveis por status (Estado, Qtd), só os status presentes."""
+    r = resumo(versao, termos)
+    return _contagem(r.estados, _por_estado(r.imoveis), 'Estado')
+
+
+@servico_dados.memorizar
+def volume_por_status(versao, termos):
+    """Soma dos aluguéis por status (Estado, Valor do Aluguel)."""
+    r = resumo(versao, termos)
+    return _por_status(r, _por_estado(r.somas['aluguel']), 'Valor do Aluguel')
+
+
+@servico_dados.memorizar
+def top_bairros_valor(versao, termos, n=10):
+    """Aluguel médio por bairro e status (Bairro, Estado, Valor do Aluguel) nos n bairros de maior média."""
+    df_filt = _imoveis(versao, termos)
+    bairro_avg = df_filt.groupby(['Bairro', 'Estado'], observed=True)['Valor do Aluguel'].mean().reset_index()
+    top_bairros = df_filt.groupby('Bairro', observed=True)['Valor do Aluguel'].mean().sort_values(ascending=False).head(n).index
+    return bairro_avg[bairro_avg['Bairro'].isin(top_bairros)]
+
+
+# --- PAINEL IMÓVEIS ---
+
+@servico_dados.memorizar
+def kpis_imoveis(versao, termos):
+    """Casas e apartamentos locados e disponíveis."""
+    r = resumo(versao, termos)
+
+    def imoveis(tipo, estado):
+        if tipo not in r.tipos or estado not in r.estados:
+            return 0
+        return int(r.imoveis[r.tipos.index(tipo) + 1, r.estados.index(estado) + 1])
+
+    return {
+        'casas_locadas': imoveis('Casa', 'Locado'),
+        'aptos_locados': imoveis('Apartamento', 'Locado'),
+        'casas_disponiveis': imoveis('Casa', 'Disponível'),
+        'aptos_disponiveis': imoveis('Apartamento', 'Disponível'),
+    }
+
+
+@servico_dados.memorizar
+def tipos_imovel(versao, termos):
+    """Imóveis por tipo (Tipo, Qtd), só os tipos presentes."""
+    r = resumo(versao, termos)
+    return _contagem(r.tipos, r.imoveis[1:, :].sum(axis=1), 'Tipo')
+
+
+@servico_dados.memorizar
+def area_por_status(versao, termos):
+    """Área média por status (Estado, Area)."""
+    r = resumo(versao, termos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = _por_estado(r.somas['area']) / _por_estado(r.contagens['area'])
+    return _por_status(r, media, 'Area')
+
+
+@servico_dados.memorizar
+def bairros_mais_frequentes(versao, termos, n=10):
+    """Imóveis por bairro e status (Bairro, Estado, Qtd) nos n bairros com mais imóveis."""
+    df_filt = _imoveis(versao, termos)
+    top_bairros = df_filt['Bairro'].value_counts().head(n).index
+    no_top = df_filt[df_filt['Bairro'].isin(top_bairros)]
+    return no_top.groupby(['Bairro', 'Estado'], observed=True).size().rename('Qtd').reset_index()
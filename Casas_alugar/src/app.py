@@ -1,21 +1,30 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import config as cfg
 import etl
+import instrumentacao
+import consulta
+import analise
+import graficos
+import tarefas
+import snapshots
+import quartis
 
-# --- CORES ---
-CORES = {
-    'primary': '#003366', 'secondary': '#E5E5E5', 
-    'background': '#0E1117', 'card_bg': '#1A1C24', 'accent': '#FFD700',
-    'locado': '#FF4B4B', 'disponivel': '#00CC96'
-}
+# --- CORES (as mesmas dos gráficos, ver graficos.py) ---
+CORES = graficos.CORES
 
 def formatar_real(valor):
     return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
+def renderizar(aba):
+    """A aba deve calcular e desenhar: é a aberta (cfg.ABAS_SOB_DEMANDA) ou as abas não guardam estado."""
+    return aba.open is not False
+
 st.set_page_config(layout="wide", page_title=cfg.NOME_CLIENTE, page_icon="🏢")
 
+# Instrumentação (cfg.INSTRUMENTACAO): cada bloco abaixo é uma etapa do painel "Desempenho"
+instrumentacao.iniciar('dashboard', perfil=st.session_state.pop('perfil_dashboard', False))
+
 # --- CSS ---
 st.markdown(f"""
 <style>
@@ -37,237 +46,248 @@ st.markdown(f"""
 
 # --- UPLOAD ---
 st.sidebar.title("🏢 Gestão de Imóveis")
+
+
+@st.fragment(run_every=1)
+def acompanhar_tarefa():
+    """Andamento do upload em segundo plano; ao terminar, recarrega o Dashboard com a base nova."""
+    status = tarefas.consultar(st.session_state['tarefa_etl'])
+    if status is None or status['status'] in tarefas.FINAIS:
+        del st.session_state['tarefa_etl']
+        if status is not None:
+            st.session_state['resultado_etl'] = (status['status'] == 'READY', status['mensagem'])
+        etl.invalidar_cache()
+        st.rerun()
+    st.progress(tarefas.fracao(status), text=f"⏳ {status['arquivo']}: {status['etapa'] or 'na fila'}...")
+
+
+instrumentacao.etapa('dashboard.gestao_dados')
 with st.sidebar.expander("Atualizar Inventário", expanded=False):
     up_file = st.file_uploader("Arquivo CSV", type=['csv'])
-    if up_file and st.button("Processar Base"):
-        with st.spinner("Processando..."):
-            ok, msg = etl.processar_dados(up_file)
+    modo_carga = st.radio("Modo", ["Substituir base", "Atualizar imóveis"], horizontal=True,
+                          help="'Atualizar imóveis' mescla o arquivo pelo ID: inclui os novos e altera os existentes.")
+    if up_file and 'tarefa_etl' not in st.session_state and st.button("Processar Base"):
+        # O ETL roda num processo à parte (tarefas.py); a sessão segue respondendo
+        st.session_state['tarefa_etl'] = tarefas.enviar(
+            up_file, modo='atualizacao' if modo_carga == "Atualizar imóveis" else None)
+    if 'tarefa_etl' in st.session_state:
+        acompanhar_tarefa()
+
+    # Versões publicadas (snapshots.py): restaurar uma é só trocar o ponteiro
+    versoes = snapshots.resumo_versoes()
+    if len(versoes) > 1:
+        rotulos = {v['versao']: f"{v['versao']} · {v.get('linhas') or '?'} imóveis" + (" (atual)" if v['atual'] else "")
+                   for v in versoes}
+        atual = next((i for i, v in enumerate(versoes) if v['atual']), 0)
+        escolhida = st.selectbox("Versão da base", options=list(rotulos), index=atual, format_func=rotulos.get)
+        if escolhida != versoes[atual]['versao'] and st.button("Restaurar versão"):
+            st.session_state['resultado_etl'] = snapshots.reverter(escolhida)
+            etl.invalidar_cache()
+            st.rerun()
+
+    # Cortes dos quartis herdados entre as versões (quartis.py): recalcular é explícito
+    if snapshots.versao_atual() is not None:
+        cortes = quartis.ler(snapshots.pasta_atual())
+        if cortes is not None:
+            st.caption(f"Quartis definidos em {cortes['definidos_em']} ({cortes['motivo']}, {cortes['linhas']} imóveis)")
+        if 'tarefa_etl' not in st.session_state and st.button(
+                "Rebalancear quartis", help="Recalcula os cortes com o inventário atual e reclassifica os imóveis."):
+            # Na mesma fila dos uploads (tarefas.py); o andamento aparece acima
+            st.session_state['tarefa_etl'] = tarefas.enviar_operacao('rebalancear_quartis', "Rebalanceamento dos quartis")
+            st.rerun()
+
+    if 'resultado_etl' in st.session_state:
+        ok, msg = st.session_state.pop('resultado_etl')
         if ok:
             st.success(msg)
-            st.cache_data.clear()
-            if st.button("Recarregar"): st.rerun()
         else:
             st.error(msg)
 st.sidebar.divider()
 
 # --- CARGA ---
-df = etl.carregar_dados()
+# Cópia da base compartilhada por todas as sessões (servico_dados.py).
+# A versão da base é resolvida uma vez: linhas e índice saem da mesma.
+instrumentacao.etapa('dashboard.carga')
+versao = etl.versao_atual()
+df = etl.carregar_dados(cfg.COLUNAS_DASHBOARD, sessao=st.session_state, versao=versao)
 if df is None:
     st.info("Aguardando base de imóveis.")
     st.stop()
 
 # --- FILTROS (Mantendo a lógica hierárquica) ---
+# Cada seleção vira um termo da consulta; as opções de cada nível saem das
+# linhas que passam até ali (bitmaps do índice, sem cópias do DataFrame).
 st.sidebar.subheader("🎯 Filtros")
+instrumentacao.etapa('dashboard.filtros', len(df))
 
-df_principal = df.copy()
+filtro = consulta.Consulta(df, etl.carregar_indice(sessao=st.session_state, versao=versao))
 
 # 1. CATEGORIA (Quartil)
-if 'Categoria_Preco' in df_principal.columns:
-    opcoes_cat = sorted(list(df_principal['Categoria_Preco'].unique()))
+if 'Categoria_Preco' in df.columns:
+    opcoes_cat = filtro.opcoes('Categoria_Preco')
     sel_cat = st.sidebar.multiselect("Segmento (Quartil)", options=opcoes_cat, default=opcoes_cat)
-    df_l1 = df_principal[df_principal['Categoria_Preco'].isin(sel_cat)] if sel_cat else df_principal
-else:
-    df_l1 = df_principal.copy()
+    if sel_cat:
+        filtro.filtrar('Categoria_Preco', 'in', sel_cat)
 
 # 2. STATUS
-if 'Estado' in df_l1.columns:
-    estados = ['Todos'] + sorted(list(df_l1['Estado'].unique()))
+if 'Estado' in df.columns:
+    estados = ['Todos'] + filtro.opcoes('Estado')
     sel_estado = st.sidebar.selectbox("Status do Imóvel", options=estados)
-    df_l2 = df_l1[df_l1['Estado'] == sel_estado] if sel_estado != 'Todos' else df_l1
-else:
-    df_l2 = df_l1
+    if sel_estado != 'Todos':
+        filtro.filtrar('Estado', '==', sel_estado)
 
 # 3. TIPO
-if 'Tipo Imóvel' in df_l2.columns:
-    tipos = sorted(list(df_l2['Tipo Imóvel'].unique()))
+if 'Tipo Imóvel' in df.columns:
+    tipos = filtro.opcoes('Tipo Imóvel')
     sel_tipo = st.sidebar.multiselect("Tipo de Imóvel", options=tipos, placeholder="Todos os tipos")
-    df_l3 = df_l2[df_l2['Tipo Imóvel'].isin(sel_tipo)] if sel_tipo else df_l2
-else:
-    df_l3 = df_l2
+    if sel_tipo:
+        filtro.filtrar('Tipo Imóvel', 'in', sel_tipo)
 
 # 4. BAIRRO
-if 'Bairro' in df_l3.columns:
-    bairros = sorted(list(df_l3['Bairro'].unique()))
+if 'Bairro' in df.columns:
+    bairros = filtro.opcoes('Bairro')
     sel_bairro = st.sidebar.multiselect("Bairro", options=bairros, placeholder="Todos os bairros")
-    df_l4 = df_l3[df_l3['Bairro'].isin(sel_bairro)] if sel_bairro else df_l3
-else:
-    df_l4 = df_l3
+    if sel_bairro:
+        filtro.filtrar('Bairro', 'in', sel_bairro)
 
 # 5. DINÂMICOS
-if not df_l4.empty:
-    min_p = float(df_l4['Valor do Aluguel'].min())
-    max_p = float(df_l4['Valor do Aluguel'].max())
+if filtro.total > 0:
+    min_p, max_p = (float(v) for v in filtro.faixa('Valor do Aluguel'))
     if min_p == max_p: max_p += 1 
     f_preco = st.sidebar.slider("Faixa de Aluguel (R$)", min_p, max_p, (min_p, max_p))
     
-    max_q = int(df_l4['Quartos'].max()) if df_l4['Quartos'].max() > 0 else 5
+    maior_q = filtro.faixa('Quartos')[1]
+    max_q = int(maior_q) if maior_q > 0 else 5
     f_quartos = st.sidebar.slider("Mínimo de Quartos", 0, max_q, 1)
 else:
     st.stop()
 
 # Aplicação Final
-mask = (df_l4['Valor do Aluguel'] >= f_preco[0]) & \
-       (df_l4['Valor do Aluguel'] <= f_preco[1]) & \
-       (df_l4['Quartos'] >= f_quartos)
+filtro.filtrar('Valor do Aluguel', '>=', f_preco[0])
+filtro.filtrar('Valor do Aluguel', '<=', f_preco[1])
+filtro.filtrar('Quartos', '>=', f_quartos)
 
-df_filt = df_l4[mask]
+# KPIs e gráficos saem da camada de análise (analise.py), memoizados por (versão, termos do filtro)
+termos = analise.normalizar_termos(filtro.termos)
 
 # --- DASHBOARD ---
 st.title(cfg.NOME_CLIENTE)
-st.caption(f"{len(df_filt)} imóveis encontrados no filtro atual")
+st.caption(f"{filtro.total} imóveis encontrados no filtro atual")
 st.divider()
 
-if df_filt.empty:
+if filtro.total == 0:
     st.warning("Nenhum imóvel encontrado.")
     st.stop()
 
 # --- DEFINIÇÃO DAS ABAS ---
-tab1, tab2 = st.tabs(["💲 Painel Financeiro", "🏠 Painel Imóveis"])
+# Com cfg.ABAS_SOB_DEMANDA só a aba aberta roda; a outra fica vazia até ser
+# aberta (o que ela já calculou para estes filtros volta do cache)
+tab1, tab2 = st.tabs(["💲 Painel Financeiro", "🏠 Painel Imóveis"], key='aba_painel',
+                     on_change="rerun" if cfg.ABAS_SOB_DEMANDA else "ignore")
 
 # ==============================================================================
 # ABA 1: PAINEL FINANCEIRO
 # ==============================================================================
-with tab1:
-    # 1. CÁLCULO KPIS
-    aluguel_medio = df_filt['Valor do Aluguel'].mean()
-    custo_medio = df_filt['Custo_Mensal'].mean()
-    preco_m2 = df_filt['Preco_m2'].mean()
-    
-    # Participação (10% do aluguel)
-    # Precisamos filtrar por estado no DF original filtrado para pegar os totais corretos
-    soma_disp = df_filt[df_filt['Estado'] == 'Disponível']['Valor do Aluguel'].sum()
-    soma_loc = df_filt[df_filt['Estado'] == 'Locado']['Valor do Aluguel'].sum()
-    
-    part_disp = soma_disp * 0.10
-    part_loc = soma_loc * 0.10
-
-    # 2. EXIBIÇÃO KPIS
-    c1, c2, c3, c4, c5 = st.columns(5)
-    c1.metric("Aluguel Médio", formatar_real(aluguel_medio))
-    c2.metric("Custo Médio Total", formatar_real(custo_medio))
-    c3.metric("Preço Médio m²", formatar_real(preco_m2))
-    c4.metric("Part. Disponível (10%)", formatar_real(part_disp))
-    c5.metric("Part. Locados (10%)", formatar_real(part_loc))
+if renderizar(tab1):
+    with tab1:
+        instrumentacao.etapa('dashboard.kpis_financeiros', filtro.total)
+
+        # 1. CÁLCULO KPIS (participação: 10% do aluguel, por status)
+        kpis = analise.kpis_financeiros(versao, termos)
+
+        # 2. EXIBIÇÃO KPIS
+        c1, c2, c3, c4, c5 = st.columns(5)
+        c1.metric("Aluguel Médio", formatar_real(kpis['aluguel_medio']))
+        c2.metric("Custo Médio Total", formatar_real(kpis['custo_medio']))
+        c3.metric("Preço Médio m²", formatar_real(kpis['preco_m2']))
+        c4.metric("Part. Disponível (10%)", formatar_real(kpis['participacao_disponivel']))
+        c5.metric("Part. Locados (10%)", formatar_real(kpis['participacao_locados']))
     
-    st.markdown("---")
+        st.markdown("---")
 
-    # 3. GRÁFICOS FINANCEIROS
-    g1, g2 = st.columns(2)
+        # 3. GRÁFICOS FINANCEIROS
+        g1, g2 = st.columns(2)
     
-    with g1:
-        st.subheader("Status da Ocupação")
-        if 'Estado' in df_filt.columns:
-            status_counts = df_filt['Estado'].value_counts().reset_index()
-            status_counts.columns = ['Estado', 'Qtd']
-            fig_rosca = px.pie(status_counts, values='Qtd', names='Estado', hole=0.5,
-                               color='Estado',
-                               color_discrete_map={'Locado': CORES['locado'], 'Disponível': CORES['disponivel']})
-            fig_rosca.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white")
-            st.plotly_chart(fig_rosca, use_container_width=True)
-
-    with g2:
-        st.subheader("Volume Financeiro por Status")
-        # Gráfico Colunas: X=Estado, Y=Valor Aluguel (Soma)
-        vol_estado = df_filt.groupby('Estado')['Valor do Aluguel'].sum().reset_index()
-        fig_col = px.bar(vol_estado, x='Estado', y='Valor do Aluguel', text_auto=True,
-                         color='Estado',
-                         color_discrete_map={'Locado': CORES['locado'], 'Disponível': CORES['disponivel']})
-        fig_col.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white")
-        fig_col.update_traces(texttemplate='R$ %{y:,.2s}')
-        st.plotly_chart(fig_col, use_container_width=True)
-
-    st.subheader("Top Bairros (Valor Médio do Aluguel)")
-    # Gráfico Barras Empilhadas/Agrupadas: X=Valor Médio, Y=Bairro, Cor=Estado
-    # Agrupamos por Bairro e Estado para ter a média
-    if 'Bairro' in df_filt.columns:
-        bairro_avg = df_filt.groupby(['Bairro', 'Estado'])['Valor do Aluguel'].mean().reset_index()
-        
-        # Filtra Top 10 bairros gerais para não poluir (ALTERADO AQUI)
-        top_bairros = df_filt.groupby('Bairro')['Valor do Aluguel'].mean().sort_values(ascending=False).head(10).index
-        bairro_avg = bairro_avg[bairro_avg['Bairro'].isin(top_bairros)]
-        
-        fig_bar = px.bar(bairro_avg, y='Bairro', x='Valor do Aluguel', color='Estado',
-                         orientation='h', barmode='group', # Group facilita comparação de médias
-                         color_discrete_map={'Locado': CORES['locado'], 'Disponível': CORES['disponivel']},
-                         text_auto=True)
-        
-        fig_bar.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white",
-            xaxis_title="Valor Médio do Aluguel", yaxis={'categoryorder':'total ascending'},
-            height=600
-        )
-        fig_bar.update_traces(texttemplate='R$ %{x:,.0f}')
-        st.plotly_chart(fig_bar, use_container_width=True)
+        with g1:
+            instrumentacao.etapa('grafico.status_ocupacao')
+            st.subheader("Status da Ocupação")
+            status_counts = analise.ocupacao(versao, termos)
+            st.plotly_chart(graficos.rosca_ocupacao(status_counts), use_container_width=True)
+
+        with g2:
+            instrumentacao.etapa('grafico.volume_status')
+            st.subheader("Volume Financeiro por Status")
+            # Gráfico Colunas: X=Estado, Y=Valor Aluguel (Soma)
+            vol_estado = analise.volume_por_status(versao, termos)
+            st.plotly_chart(graficos.colunas_volume_status(vol_estado), use_container_width=True)
+
+        instrumentacao.etapa('grafico.top_bairros_valor')
+        st.subheader("Top Bairros (Valor Médio do Aluguel)")
+        # Gráfico Barras Empilhadas/Agrupadas: X=Valor Médio, Y=Bairro, Cor=Estado
+        # Média por Bairro e Estado, só nos Top 10 bairros gerais para não poluir
+        bairro_avg = analise.top_bairros_valor(versao, termos)
+        st.plotly_chart(graficos.barras_top_bairros(bairro_avg), use_container_width=True)
 
 
 # ==============================================================================
 # ABA 2: PAINEL IMÓVEIS
 # ==============================================================================
-with tab2:
-    # 1. CÁLCULO KPIS
-    # Contagens específicas
-    casas_loc = len(df_filt[(df_filt['Tipo Imóvel'] == 'Casa') & (df_filt['Estado'] == 'Locado')])
-    aptos_loc = len(df_filt[(df_filt['Tipo Imóvel'] == 'Apartamento') & (df_filt['Estado'] == 'Locado')])
-    
-    casas_disp = len(df_filt[(df_filt['Tipo Imóvel'] == 'Casa') & (df_filt['Estado'] == 'Disponível')])
-    aptos_disp = len(df_filt[(df_filt['Tipo Imóvel'] == 'Apartamento') & (df_filt['Estado'] == 'Disponível')])
-
-    # 2. EXIBIÇÃO KPIS
-    k1, k2, k3, k4 = st.columns(4)
-    k1.metric("Casas Alugadas", f"{casas_loc}")
-    k2.metric("Apartamentos Alugados", f"{aptos_loc}")
-    k3.metric("Casas Disponíveis", f"{casas_disp}")
-    k4.metric("Apartamentos Disponíveis", f"{aptos_disp}")
+if renderizar(tab2):
+    with tab2:
+        instrumentacao.etapa('dashboard.kpis_imoveis', filtro.total)
+
+        # 1. CÁLCULO KPIS (contagens por tipo e status)
+        kpis_imoveis = analise.kpis_imoveis(versao, termos)
+
+        # 2. EXIBIÇÃO KPIS
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Casas Alugadas", f"{kpis_imoveis['casas_locadas']}")
+        k2.metric("Apartamentos Alugados", f"{kpis_imoveis['aptos_locados']}")
+        k3.metric("Casas Disponíveis", f"{kpis_imoveis['casas_disponiveis']}")
+        k4.metric("Apartamentos Disponíveis", f"{kpis_imoveis['aptos_disponiveis']}")
     
-    st.markdown("---")
+        st.markdown("---")
     
-    # 3. GRÁFICOS OPERACIONAIS
-    r1, r2 = st.columns(2)
+        # 3. GRÁFICOS OPERACIONAIS
+        r1, r2 = st.columns(2)
     
-    with r1:
-        st.subheader("Proporção Casas vs Apartamentos")
-        tipo_counts = df_filt['Tipo Imóvel'].value_counts().reset_index()
-        tipo_counts.columns = ['Tipo', 'Qtd']
-        fig_tipo = px.pie(tipo_counts, values='Qtd', names='Tipo', hole=0.5,
-                          color_discrete_sequence=px.colors.sequential.RdBu)
-        fig_tipo.update_layout(paper_bgcolor="rgba(0,0,0,0)", font_color="white")
-        st.plotly_chart(fig_tipo, use_container_width=True)
+        with r1:
+            instrumentacao.etapa('grafico.casas_apartamentos')
+            st.subheader("Proporção Casas vs Apartamentos")
+            tipo_counts = analise.tipos_imovel(versao, termos)
+            st.plotly_chart(graficos.rosca_tipos(tipo_counts), use_container_width=True)
         
-    with r2:
-        st.subheader("Área Média por Status")
-        area_stats = df_filt.groupby('Estado')['Area'].mean().reset_index()
-        fig_area = px.bar(area_stats, x='Estado', y='Area', text_auto=True,
-                          color='Estado',
-                          color_discrete_map={'Locado': CORES['locado'], 'Disponível': CORES['disponivel']})
-        fig_area.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white",
-                               yaxis_title="Área Média (m²)")
-        fig_area.update_traces(texttemplate='%{y:.0f} m²')
-        st.plotly_chart(fig_area, use_container_width=True)
-
-    c_g1, c_g2 = st.columns(2)
+        with r2:
+            instrumentacao.etapa('grafico.area_status')
+            st.subheader("Área Média por Status")
+            area_stats = analise.area_por_status(versao, termos)
+            st.plotly_chart(graficos.colunas_area_status(area_stats), use_container_width=True)
+
+        c_g1, c_g2 = st.columns(2)
     
-    with c_g1:
-        st.subheader("Contagem de Imóveis")
-        # Contagem simples Locado vs Disponível
-        fig_count = px.histogram(df_filt, x='Estado', color='Estado',
-                                 color_discrete_map={'Locado': CORES['locado'], 'Disponível': CORES['disponivel']},
-                                 text_auto=True)
-        fig_count.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white",
-                                yaxis_title="Quantidade")
-        st.plotly_chart(fig_count, use_container_width=True)
+        with c_g1:
+            instrumentacao.etapa('grafico.contagem_imoveis')
+            st.subheader("Contagem de Imóveis")
+            # Contagem simples Locado vs Disponível (já contada: o navegador recebe 2 barras, não os imóveis)
+            st.plotly_chart(graficos.colunas_contagem_status(analise.ocupacao(versao, termos)), use_container_width=True)
         
-    with c_g2:
-        st.subheader("Distribuição por Bairro (Top 10)")
-        # Empilhadas: X=Bairro, Y=Contagem, Cor=Estado
-        if 'Bairro' in df_filt.columns:
-            top_bairros_qtd = df_filt['Bairro'].value_counts().head(10).index
-            df_bairro_top = df_filt[df_filt['Bairro'].isin(top_bairros_qtd)]
-            
-            fig_stack = px.histogram(df_bairro_top, y='Bairro', color='Estado',
-                                     orientation='h', barmode='stack',
-                                     color_discrete_map={'Locado': CORES['locado'], 'Disponível': CORES['disponivel']},
-                                     text_auto=True)
-            
-            fig_stack.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white",
-                                    yaxis={'categoryorder':'total ascending'}, xaxis_title="Quantidade")
-            st.plotly_chart(fig_stack, use_container_width=True)
\ No newline at end of file
+        with c_g2:
+            instrumentacao.etapa('grafico.distribuicao_bairros')
+            st.subheader("Distribuição por Bairro (Top 10)")
+            # Empilhadas: X=Contagem, Y=Bairro, Cor=Estado (contagens por bairro e status, não os imóveis)
+            bairros_top = analise.bairros_mais_frequentes(versao, termos)
+            st.plotly_chart(graficos.barras_bairros_frequentes(bairros_top), use_container_width=True)
+
+
+# --- PAINEL DE DESEMPENHO (cfg.INSTRUMENTACAO; ver instrumentacao.py) ---
+execucao = instrumentacao.finalizar()
+if execucao is not None:
+    with st.sidebar.expander("⏱️ Desempenho", expanded=False):
+        st.caption(f"Execução: {execucao.duracao * 1000:.0f} ms · log em {cfg.ARQUIVO_LOG_DESEMPENHO}")
+        st.dataframe(instrumentacao.tabela(execucao), hide_index=True, use_container_width=True)
+        if execucao.perfil:
+            st.caption(f"cProfile: {execucao.arquivo_perfil}")
+            st.code(execucao.perfil, language=None)
+        if st.button("Capturar perfil (cProfile)", help="Roda a próxima execução do Dashboard sob cProfile."):
+            st.session_state['perfil_dashboard'] = True
+            st.rerun()
@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# ARMAZENAMENTO DA BASE PROCESSADA (CSV / PARQUET / FEATHER)
+# ==============================================================================
+# Parquet e Feather guardam os tipos (datas, categorias, inteiros) e permitem
+# ler só as colunas necessárias. Colunas de texto são gravadas como categorias
+# (dictionary encoding), o que reduz disco e memória na leitura.
+
+FORMATOS = ('csv', 'parquet', 'feather')
+
+
+def formato_do_caminho(caminho):
+    """Deduz o formato pela extensão do arquivo."""
+    ext = os.path.splitext(caminho)[1].lower().lstrip('.')
+    if ext not in FORMATOS:
+        raise ValueError(f"Formato de armazenamento não suportado: '{ext}'")
+    return ext
+
+
+def _codificar_textos(df):
+    """Converte colunas de texto (object) em categóricas para o dictionary encoding."""
+    colunas_texto = df.select_dtypes(include='object').columns
+    if len(colunas_texto) == 0:
+        return df
+    df = df.copy()
+    for col in colunas_texto:
+        df[col] = df[col].astype('category')
+    return df
+
+
+def compactar_tipos(df, plano):
+    """
+    Converte as colunas do plano (ex.: cfg.PLANO_DTYPES) para tipos compactos:
+    'category' para textos repetidos, inteiros e floats menores para números.
+    Um inteiro só é reduzido se todos os valores couberem no tipo novo; senão
+    (ou se a coluna tiver nulos) fica como está. Colunas ausentes são ignoradas.
+    """
+    df = df.copy(deep=False)
+    for col, dtype in plano.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        serie = df[col]
+        if dtype == 'category':
+            df[col] = serie.astype('category')
+        elif np.dtype(dtype).kind in 'iu':
+            if serie.dtype.kind not in 'iu':
+                continue
+            limites = np.iinfo(dtype)
+            if serie.empty or (limites.min <= serie.min() and serie.max() <= limites.max):
+                df[col] = serie.astype(dtype)
+        elif serie.dtype.kind == 'f':
+            df[col] = serie.astype(dtype)
+    return df
+
+
+def bytes_por_linha(df):
+    """Memória ocupada pelo DataFrame (textos incluídos) dividida pelo número de linhas."""
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+
+
+def salvar_tabela(df, caminho):
+    """Grava o DataFrame no formato indicado pela extensão do caminho."""
+    formato = formato_do_caminho(caminho)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+    if formato == 'csv':
+        df.to_csv(caminho, index=False, encoding='utf-8')
+    elif formato == 'parquet':
+        _codificar_textos(df).to_parquet(caminho, index=False, engine='pyarrow')
+    else:
+        _codificar_textos(df).reset_index(drop=True).to_feather(caminho)
+
+
+def ler_tabela(caminho, colunas=None):
+    """Lê a tabela; 'colunas' restringe a leitura às colunas pedidas."""
+    formato = formato_do_caminho(caminho)
+    colunas = list(colunas) if colunas is not None else None
+
+    if formato == 'csv':
+        return pd.read_csv(caminho, usecols=colunas)
+    if formato == 'parquet':
+        return pd.read_parquet(caminho, columns=colunas, engine='pyarrow')
+    return pd.read_feather(caminho, columns=colunas)
+
+
+def migrar_tabela(caminho_origem, caminho_destino, preparar=None):
+    """
+    Converte uma base já processada (ex.: CSV legado) para o formato de destino.
+    'preparar' recebe o DataFrame lido e devolve a versão tipada.
+    """
+    df = ler_tabela(caminho_origem)
+    if preparar is not None:
+        df = preparar(df)
+    salvar_tabela(df, caminho_destino)
+    return len(df)
+
+
+def assinatura(caminho):
+    """
+    Identifica a versão de um arquivo, ou de uma pasta de arquivos, em disco:
+    (caminho, detalhes de mtime e tamanho).
+    """
+    caminho = os.path.abspath(caminho)
+    if os.path.isdir(caminho):
+        detalhes = []
+        for entrada in sorted(os.scandir(caminho), key=lambda e: e.name):
+            if entrada.is_file():
+                info = entrada.stat()
+                detalhes.append((entrada.name, info.st_mtime_ns, info.st_size))
+        return (caminho, tuple(detalhes))
+
+    info = os.stat(caminho)
+    return (caminho, (info.st_mtime_ns, info.st_size))
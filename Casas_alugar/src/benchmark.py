@@ -0,0 +1,531 @@
+"""
+Benchmarks do ETL de imóveis (rodam sem Streamlit).
+
+Uso:
+    python benchmark.py enriquecimento --linhas 300000
+    python benchmark.py filtros --linhas 300000
+    python benchmark.py memoria --linhas 300000
+    python benchmark.py kpis --linhas 300000
+    python benchmark.py graficos --linhas 300000
+    python benchmark.py quartis --linhas 300000
+    python benchmark.py suite --tamanhos 10000 1000000 --salvar baseline.json
+    python benchmark.py suite --comparar baseline.json
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import config as cfg
+import analise
+import armazenamento
+import bancada
+import etl
+import consulta
+import graficos
+import guardiao
+import indice
+import quartis
+import servico_dados
+import snapshots
+
+
+def cronometrar(funcao, *args, repeticoes=3):
+    """Melhor tempo (s) entre as repetições e o último resultado."""
+    melhor, resultado = float('inf'), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def gerar_imoveis(linhas, seed=42, primeiro_id=0):
+    """Inventário sintético já tipado, no schema de COLUNAS_OFICIAIS."""
+    rng = np.random.default_rng(seed)
+    cidades = np.array(['Jundiaí', 'Campinas', 'São Paulo', 'Sorocaba', 'Valinhos'])
+    bairros = np.array([f'Bairro {i:03d}' for i in range(300)])
+    area = rng.integers(20, 400, linhas)
+    area[rng.random(linhas) < 0.01] = 0  # imóveis sem área informada
+
+    return pd.DataFrame({
+        'ID': np.arange(primeiro_id, primeiro_id + linhas, dtype='int64'),
+        'Cidade': cidades[rng.integers(0, len(cidades), linhas)],
+        'Area': area,
+        'Quartos': rng.integers(0, 6, linhas),
+        'Banheiros': rng.integers(1, 5, linhas),
+        'Vagas garagem': rng.integers(0, 4, linhas),
+        'Aceita Animais': np.where(rng.random(linhas) < 0.6, 'Sim', 'Não'),
+        'Mobilhado': np.where(rng.random(linhas) < 0.3, 'Sim', 'Não'),
+        'Valor condomínio': rng.integers(0, 3000, linhas).astype('float64'),
+        'Valor do Aluguel': rng.lognormal(8, 0.6, linhas).round(0),
+        'IPTU': rng.integers(0, 1500, linhas).astype('float64'),
+        'Seguro': rng.integers(10, 200, linhas).astype('float64'),
+        'Tipo Imóvel': np.where(rng.random(linhas) < 0.5, 'Casa', 'Apartamento'),
+        'Bairro': bairros[rng.integers(0, len(bairros), linhas)],
+        'Estado': np.where(rng.random(linhas) < 0.45, 'Locado', 'Disponível'),
+    })
+
+
+# --- ENRIQUECIMENTO: apply linha a linha (versão anterior) x etl.enriquecer ---
+
+def _enriquecer_legado(df):
+    df = df.copy()
+    df['Custo_Mensal'] = df['Valor do Aluguel'] + df['Valor condomínio'] + df['IPTU'] + df['Seguro']
+    df['Preco_m2'] = df.apply(lambda x: x['Valor do Aluguel'] / x['Area'] if x['Area'] > 0 else 0, axis=1)
+    df['Categoria_Preco'] = pd.qcut(df['Valor do Aluguel'], q=4, labels=cfg.LABELS_QUARTIL, duplicates='drop')
+    return df
+
+
+def bench_enriquecimento(linhas):
+    df = gerar_imoveis(linhas)
+    t_legado, r_legado = cronometrar(_enriquecer_legado, df, repeticoes=1)
+    t_novo, r_novo = cronometrar(etl.enriquecer, df)
+
+    iguais = r_legado.equals(r_novo)
+    print(f"Enriquecimento ({linhas:,} imóveis)")
+    print(f"  apply por linha    : {t_legado * 1000:10.1f} ms")
+    print(f"  etl.enriquecer     : {t_novo * 1000:10.1f} ms  ({t_legado / t_novo:.0f}x)")
+    print(f"  resultados idênticos: {iguais}")
+
+
+# --- FILTROS: DataFrames intermediários (versão anterior) x consulta.Consulta ---
+
+SELECAO_FILTROS = {
+    'Categoria_Preco': cfg.LABELS_QUARTIL[1:3],
+    'Estado': 'Locado',
+    'Tipo Imóvel': ['Casa'],
+    'Bairro': [f'Bairro {i:03d}' for i in range(0, 300, 3)],
+    'Valor do Aluguel': (1500.0, 6000.0),
+    'Quartos': 2,
+}
+
+
+def _filtros_legado(df, sel):
+    """Hierarquia da barra lateral como era: uma cópia filtrada por nível."""
+    df_principal = df.copy()
+    sorted(list(df_principal['Categoria_Preco'].unique()))
+    df_l1 = df_principal[df_principal['Categoria_Preco'].isin(sel['Categoria_Preco'])]
+    sorted(list(df_l1['Estado'].unique()))
+    df_l2 = df_l1[df_l1['Estado'] == sel['Estado']]
+    sorted(list(df_l2['Tipo Imóvel'].unique()))
+    df_l3 = df_l2[df_l2['Tipo Imóvel'].isin(sel['Tipo Imóvel'])]
+    sorted(list(df_l3['Bairro'].unique()))
+    df_l4 = df_l3[df_l3['Bairro'].isin(sel['Bairro'])]
+    df_l4['Valor do Aluguel'].min(), df_l4['Valor do Aluguel'].max(), df_l4['Quartos'].max()
+
+    minimo, maximo = sel['Valor do Aluguel']
+    mask = (df_l4['Valor do Aluguel'] >= minimo) & (df_l4['Valor do Aluguel'] <= maximo) & \
+           (df_l4['Quartos'] >= sel['Quartos'])
+    return df_l4[mask]
+
+
+def _filtros_consulta(df, sel, indice_bitmaps=None):
+    """Mesma sequência de opções e filtros pela camada de consulta."""
+    filtro = consulta.Consulta(df, indice_bitmaps)
+    filtro.opcoes('Categoria_Preco')
+    filtro.filtrar('Categoria_Preco', 'in', sel['Categoria_Preco'])
+    filtro.opcoes('Estado')
+    filtro.filtrar('Estado', '==', sel['Estado'])
+    filtro.opcoes('Tipo Imóvel')
+    filtro.filtrar('Tipo Imóvel', 'in', sel['Tipo Imóvel'])
+    filtro.opcoes('Bairro')
+    filtro.filtrar('Bairro', 'in', sel['Bairro'])
+    filtro.faixa('Valor do Aluguel'), filtro.faixa('Quartos')
+
+    minimo, maximo = sel['Valor do Aluguel']
+    filtro.filtrar('Valor do Aluguel', '>=', minimo)
+    filtro.filtrar('Valor do Aluguel', '<=', maximo)
+    filtro.filtrar('Quartos', '>=', sel['Quartos'])
+    return filtro.resultado(cfg.COLUNAS_DASHBOARD)
+
+
+def bench_filtros(linhas):
+    # Mesmos tipos que o Dashboard recebe (cfg.PLANO_DTYPES)
+    df = armazenamento.compactar_tipos(etl.enriquecer(gerar_imoveis(linhas)), cfg.PLANO_DTYPES)[cfg.COLUNAS_DASHBOARD]
+
+    t_legado, r_legado = cronometrar(_filtros_legado, df, SELECAO_FILTROS)
+    t_novo, r_novo = cronometrar(_filtros_consulta, df, SELECAO_FILTROS)
+    t_indice_etl, bitmaps = cronometrar(indice.construir_indice, df, repeticoes=1)
+    t_indice, r_indice = cronometrar(_filtros_consulta, df, SELECAO_FILTROS, bitmaps)
+
+    iguais = r_legado.equals(r_novo) and r_legado.equals(r_indice)
+    print(f"Filtros da barra lateral ({linhas:,} imóveis, {len(r_novo):,} no resultado)")
+    print(f"  cópias por nível   : {t_legado * 1000:10.1f} ms")
+    print(f"  consulta.Consulta  : {t_novo * 1000:10.1f} ms  ({t_legado / t_novo:.1f}x)")
+    print(f"  + índice de bitmaps: {t_indice * 1000:10.1f} ms  ({t_legado / t_indice:.1f}x)"
+          f"  [montagem no ETL: {t_indice_etl * 1000:.0f} ms]")
+    print(f"  resultados idênticos: {iguais}")
+
+
+
+# --- MEMÓRIA: tipos da conversão (int64, textos object) x cfg.PLANO_DTYPES ---
+
+def _relatorio_memoria(titulo, antes, depois):
+    print(f"  {titulo}")
+    print(f"    sem plano de tipos : {armazenamento.bytes_por_linha(antes):7.1f} bytes/linha")
+    print(f"    cfg.PLANO_DTYPES   : {armazenamento.bytes_por_linha(depois):7.1f} bytes/linha"
+          f"  ({armazenamento.bytes_por_linha(antes) / armazenamento.bytes_por_linha(depois):.1f}x menos)")
+
+
+def _mesmos_valores(antes, depois):
+    """Só os tipos mudam: textos e inteiros iguais, floats iguais na precisão do float32."""
+    for col in antes.columns:
+        if antes[col].dtype.kind == 'f':
+            if not np.allclose(antes[col], depois[col].astype('float64'), rtol=1e-6, equal_nan=True):
+                return False
+        elif not antes[col].astype(object).equals(depois[col].astype(object)):
+            return False
+    return True
+
+
+def bench_memoria(linhas):
+    antes = etl.enriquecer(gerar_imoveis(linhas))
+    depois = armazenamento.compactar_tipos(antes, cfg.PLANO_DTYPES)
+
+    print(f"Memória por linha ({linhas:,} imóveis)")
+    _relatorio_memoria("base processada (ETL)", antes, depois)
+    _relatorio_memoria("colunas do Dashboard", antes[cfg.COLUNAS_DASHBOARD], depois[cfg.COLUNAS_DASHBOARD])
+    print(f"  valores preservados : {_mesmos_valores(antes, depois)}")
+
+
+# --- KPIs: uma varredura do quadro filtrado por KPI (versão anterior) x analise.resumo ---
+
+def _kpis_legado(df_filt):
+    """KPIs e gráficos das abas sem bairro como eram: cada um percorre o quadro filtrado."""
+    return {
+        'aluguel_medio': df_filt['Valor do Aluguel'].mean(),
+        'custo_medio': df_filt['Custo_Mensal'].mean(),
+        'preco_m2': df_filt['Preco_m2'].mean(),
+        'soma_disp': df_filt[df_filt['Estado'] == 'Disponível']['Valor do Aluguel'].sum(),
+        'soma_loc': df_filt[df_filt['Estado'] == 'Locado']['Valor do Aluguel'].sum(),
+        'ocupacao': df_filt['Estado'].value_counts().loc[lambda s: s > 0].tolist(),
+        'volume': df_filt.groupby('Estado', observed=True)['Valor do Aluguel'].sum().tolist(),
+        'casas_loc': len(df_filt[(df_filt['Tipo Imóvel'] == 'Casa') & (df_filt['Estado'] == 'Locado')]),
+        'aptos_loc': len(df_filt[(df_filt['Tipo Imóvel'] == 'Apartamento') & (df_filt['Estado'] == 'Locado')]),
+        'casas_disp': len(df_filt[(df_filt['Tipo Imóvel'] == 'Casa') & (df_filt['Estado'] == 'Disponível')]),
+        'aptos_disp': len(df_filt[(df_filt['Tipo Imóvel'] == 'Apartamento') & (df_filt['Estado'] == 'Disponível')]),
+        'tipos': df_filt['Tipo Imóvel'].value_counts().loc[lambda s: s > 0].tolist(),
+        'area': df_filt.groupby('Estado', observed=True)['Area'].mean().tolist(),
+    }
+
+
+# Varreduras do quadro inteiro em _kpis_legado (máscaras, seleções, médias,
+# value_counts e groupbys); o resumo faz um agrupamento só
+VARREDURAS_LEGADO = 27
+
+
+def _kpis_resumo(versao, termos):
+    """Os mesmos valores pela camada de análise, com o cache de resultados vazio."""
+    servico_dados.RESULTADOS.invalidar()
+    financeiro = analise.kpis_financeiros(versao, termos)
+    imoveis = analise.kpis_imoveis(versao, termos)
+    return {
+        'aluguel_medio': financeiro['aluguel_medio'],
+        'custo_medio': financeiro['custo_medio'],
+        'preco_m2': financeiro['preco_m2'],
+        'soma_disp': financeiro['participacao_disponivel'] / analise.TAXA_PARTICIPACAO,
+        'soma_loc': financeiro['participacao_locados'] / analise.TAXA_PARTICIPACAO,
+        'ocupacao': analise.ocupacao(versao, termos)['Qtd'].tolist(),
+        'volume': analise.volume_por_status(versao, termos)['Valor do Aluguel'].tolist(),
+        'casas_loc': imoveis['casas_locadas'],
+        'aptos_loc': imoveis['aptos_locados'],
+        'casas_disp': imoveis['casas_disponiveis'],
+        'aptos_disp': imoveis['aptos_disponiveis'],
+        'tipos': analise.tipos_imovel(versao, termos)['Qtd'].tolist(),
+        'area': analise.area_por_status(versao, termos)['Area'].tolist(),
+    }
+
+
+def _mesmos_kpis(legado, novo):
+    return all(np.allclose(legado[k], novo[k], rtol=1e-9, equal_nan=True) for k in legado)
+
+
+def bench_kpis(linhas):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_csv = os.path.join(pasta, 'entrada.csv')
+        bancada.gravar_csv(_gerar_bloco, linhas, caminho_csv)
+        _garantir_base(caminho_csv, pasta)
+        versao = etl.versao_atual()
+
+        print(f"KPIs das abas Financeiro e Imóveis ({linhas:,} imóveis)")
+        for titulo, termos in [("sem filtros", ()), ("filtros da barra lateral", _termos_selecao(SELECAO_FILTROS))]:
+            df_filt = analise._imoveis(versao, termos)
+            t_legado, r_legado = cronometrar(_kpis_legado, df_filt)
+            t_novo, r_novo = cronometrar(_kpis_resumo, versao, termos)
+            print(f"  {titulo} ({len(df_filt):,} imóveis no resultado)")
+            print(f"    {VARREDURAS_LEGADO} varreduras     : {t_legado * 1000:10.1f} ms")
+            print(f"    analise.resumo (1) : {t_novo * 1000:10.1f} ms  ({t_legado / t_novo:.1f}x)")
+            print(f"    resultados idênticos: {_mesmos_kpis(r_legado, r_novo)}")
+
+
+# --- GRÁFICOS: figuras montadas a cada execução x graficos.py (cache por conteúdo) ---
+
+# (gráfico, tabela da análise) das duas abas, na ordem do Dashboard
+FIGURAS_DASHBOARD = [
+    (graficos.rosca_ocupacao, analise.ocupacao),
+    (graficos.colunas_volume_status, analise.volume_por_status),
+    (graficos.barras_top_bairros, analise.top_bairros_valor),
+    (graficos.rosca_tipos, analise.tipos_imovel),
+    (graficos.colunas_area_status, analise.area_por_status),
+    (graficos.colunas_contagem_status, analise.ocupacao),
+    (graficos.barras_bairros_frequentes, analise.bairros_mais_frequentes),
+]
+
+
+def _histogramas_legado(df_filt):
+    """Os dois histogramas da aba Imóveis como eram: os imóveis vão na figura e o navegador conta."""
+    top_bairros = df_filt['Bairro'].value_counts().head(10).index
+    contagem = px.histogram(df_filt[['Estado']], x='Estado', color='Estado',
+                            color_discrete_map=graficos.CORES_STATUS, text_auto=True)
+    bairros = px.histogram(df_filt[df_filt['Bairro'].isin(top_bairros)][['Bairro', 'Estado']], y='Bairro',
+                           color='Estado', orientation='h', barmode='stack',
+                           color_discrete_map=graficos.CORES_STATUS, text_auto=True)
+    return [contagem.update_layout(**graficos.TEMA_ESCURO), bairros.update_layout(**graficos.TEMA_ESCURO)]
+
+
+def _histogramas_agregados(versao, termos):
+    """Os mesmos gráficos das contagens da análise (caches de resultados e figuras vazios)."""
+    servico_dados.RESULTADOS.invalidar()
+    graficos.FIGURAS.invalidar()
+    return [graficos.colunas_contagem_status(analise.ocupacao(versao, termos)),
+            graficos.barras_bairros_frequentes(analise.bairros_mais_frequentes(versao, termos))]
+
+
+def _figuras_montadas(tabelas):
+    return [grafico.__wrapped__(tabela).update_layout(**graficos.TEMA_ESCURO)
+            for (grafico, _), tabela in zip(FIGURAS_DASHBOARD, tabelas)]
+
+
+def _figuras_cache(tabelas):
+    return [grafico(tabela) for (grafico, _), tabela in zip(FIGURAS_DASHBOARD, tabelas)]
+
+
+def _payload_kb(figuras):
+    """Tamanho do JSON das figuras (o que o st.plotly_chart envia ao navegador)."""
+    return sum(len(pio.to_json(figura, validate=False)) for figura in figuras) / 1024
+
+
+def bench_graficos(linhas):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_csv = os.path.join(pasta, 'entrada.csv')
+        bancada.gravar_csv(_gerar_bloco, linhas, caminho_csv)
+        _garantir_base(caminho_csv, pasta)
+        versao = etl.versao_atual()
+
+        print(f"Gráficos do Dashboard ({linhas:,} imóveis)")
+        for titulo, termos in [("sem filtros", ()), ("filtros da barra lateral", _termos_selecao(SELECAO_FILTROS))]:
+            df_filt = analise._imoveis(versao, termos)
+            t_legado, figs_legado = cronometrar(_histogramas_legado, df_filt)
+            t_novo, figs_novo = cronometrar(_histogramas_agregados, versao, termos)
+            print(f"  {titulo} ({len(df_filt):,} imóveis no resultado)")
+            print(f"    histogramas (linhas)   : {t_legado * 1000:8.1f} ms  {_payload_kb(figs_legado):9.1f} KB")
+            print(f"    contagens + px.bar     : {t_novo * 1000:8.1f} ms  {_payload_kb(figs_novo):9.1f} KB"
+                  f"  ({t_legado / t_novo:.1f}x)")
+
+            tabelas = [tabela(versao, termos) for _, tabela in FIGURAS_DASHBOARD]
+            graficos.FIGURAS.invalidar()
+            t_montadas, _ = cronometrar(_figuras_montadas, tabelas)
+            t_cache, _ = cronometrar(_figuras_cache, tabelas)
+            print(f"    {len(tabelas)} figuras, montadas    : {t_montadas * 1000:8.1f} ms  {_payload_kb(_figuras_cache(tabelas)):9.1f} KB")
+            print(f"    {len(tabelas)} figuras, em cache    : {t_cache * 1000:8.1f} ms  ({t_montadas / t_cache:.0f}x)")
+
+
+# --- QUARTIS: pd.qcut a cada upload (versão anterior) x cortes persistidos (quartis.py) ---
+
+def _quartis_legado(valores):
+    return pd.qcut(valores, q=4, labels=cfg.LABELS_QUARTIL, duplicates='drop')
+
+
+def bench_quartis(linhas):
+    antes = gerar_imoveis(linhas)['Valor do Aluguel']
+    # Upload seguinte: o mesmo inventário e 1% de imóveis novos, mais caros
+    novos = gerar_imoveis(linhas // 100, seed=7)['Valor do Aluguel'] * 1.5
+    depois = pd.concat([antes, novos], ignore_index=True)
+    cortes = quartis.calcular(antes)
+
+    t_legado, r_legado = cronometrar(_quartis_legado, depois)
+    t_novo, r_novo = cronometrar(quartis.classificar, depois, cortes['limites'])
+    mudaram_legado = int((r_legado[:linhas].astype(str) != _quartis_legado(antes).astype(str)).sum())
+    mudaram_novo = int((r_novo[:linhas].astype(str) != quartis.classificar(antes, cortes['limites']).astype(str)).sum())
+
+    print(f"Upload com 1% de imóveis novos ({linhas:,} imóveis)")
+    print(f"  pd.qcut no inventário inteiro : {t_legado * 1000:8.1f} ms  {mudaram_legado:,} imóveis antigos mudaram de segmento")
+    print(f"  cortes persistidos            : {t_novo * 1000:8.1f} ms  {mudaram_novo:,} imóveis antigos mudaram de segmento"
+          f"  (deriva {quartis.deriva(r_novo, cortes['fatias']) * 100:.1f} p.p.)")
+
+    print("Cálculo dos cortes (rebalanceamento, quantis exatos)")
+    for n in (linhas, linhas * 10):
+        valores = gerar_imoveis(n)['Valor do Aluguel'].to_numpy()
+        t_cortes, _ = cronometrar(quartis.calcular, valores)
+        print(f"  {n:,} imóveis: {t_cortes * 1000:8.1f} ms")
+
+
+# --- SUITE: etapas do ETL e do Dashboard em 10k / 1M / 10M linhas (ver bancada.py) ---
+# preparar(csv, pasta) roda fora da medição; executar(*entradas) é cronometrado.
+
+def _gerar_bloco(linhas, inicio):
+    return gerar_imoveis(linhas, seed=42 + inicio, primeiro_id=inicio).to_csv(index=False).encode('utf-8')
+
+
+def _isolar(pasta):
+    """Aponta bases, cache e flags para 'pasta' (os dados do cliente não são tocados)."""
+    cfg.PASTA_VERSOES = os.path.join(pasta, 'imoveis_versoes')
+    cfg.ARQUIVOS_LEGADOS = []
+    cfg.DIRS = {'FLAGS': os.path.join(pasta, 'flags')}
+    cfg.PASTA_CACHE_DADOS = os.path.join(pasta, 'cache')
+    cfg.ARQUIVO_LOG_ALTERACOES = os.path.join(pasta, 'imoveis_alteracoes.jsonl')
+
+
+def _ler_csv(caminho_csv):
+    with open(caminho_csv, 'rb') as f:
+        return io.BytesIO(f.read())
+
+
+def _garantir_base(caminho_csv, pasta):
+    """Base publicada do CSV em 'pasta' (processada uma vez) e cache vazio (carga a frio)."""
+    _isolar(pasta)
+    if snapshots.versao_atual() is None:
+        sucesso, msg = etl.processar_dados(_ler_csv(caminho_csv))
+        if not sucesso:
+            raise RuntimeError(msg)
+    shutil.rmtree(cfg.PASTA_CACHE_DADOS, ignore_errors=True)
+
+
+def _preparar_validacao(caminho_csv, pasta):
+    return (pd.read_csv(caminho_csv),)
+
+
+def _preparar_processamento(caminho_csv, pasta):
+    _isolar(pasta)
+    return (_ler_csv(caminho_csv),)
+
+
+def _processar(arquivo):
+    arquivo.seek(0)
+    sucesso, msg = etl.processar_dados(arquivo)
+    if not sucesso:
+        raise RuntimeError(msg)
+
+
+def _preparar_atualizacao(caminho_csv, pasta):
+    """Arquivo de atualização com 1% do inventário: metade imóveis existentes (alterados), metade novos."""
+    _garantir_base(caminho_csv, pasta)
+    versao = snapshots.versao_atual()
+    linhas = snapshots.metadados(versao)['linhas']
+    delta = gerar_imoveis(max(linhas // 100, 2), seed=7, primeiro_id=linhas - max(linhas // 200, 1))
+    return io.BytesIO(delta.to_csv(index=False).encode('utf-8')), versao
+
+
+def _atualizar(arquivo, versao):
+    snapshots.ativar(versao)  # cada repetição parte da mesma base
+    arquivo.seek(0)
+    sucesso, msg = etl.processar_dados(arquivo, modo='atualizacao')
+    if not sucesso:
+        raise RuntimeError(msg)
+
+
+def _preparar_carga(caminho_csv, pasta):
+    _garantir_base(caminho_csv, pasta)
+    return ()
+
+
+def _carregar():
+    etl.invalidar_cache()
+    if etl.carregar_dados(cfg.COLUNAS_DASHBOARD) is None or etl.carregar_indice() is None:
+        raise RuntimeError("Base não encontrada")
+
+
+def _termos_selecao(sel):
+    """SELECAO_FILTROS como termos da consulta (na ordem da barra lateral)."""
+    minimo, maximo = sel['Valor do Aluguel']
+    return analise.normalizar_termos([
+        ('Categoria_Preco', 'in', sel['Categoria_Preco']),
+        ('Estado', '==', sel['Estado']),
+        ('Tipo Imóvel', 'in', sel['Tipo Imóvel']),
+        ('Bairro', 'in', sel['Bairro']),
+        ('Valor do Aluguel', '>=', minimo),
+        ('Valor do Aluguel', '<=', maximo),
+        ('Quartos', '>=', sel['Quartos']),
+    ])
+
+
+def _agregacoes_dashboard(versao, termos):
+    """KPIs e gráficos das duas abas (analise.py), calculados do zero (cache de resultados vazio)."""
+    servico_dados.RESULTADOS.invalidar()
+    analise.kpis_financeiros(versao, termos)
+    analise.ocupacao(versao, termos)
+    analise.volume_por_status(versao, termos)
+    analise.top_bairros_valor(versao, termos)
+    analise.kpis_imoveis(versao, termos)
+    analise.tipos_imovel(versao, termos)
+    analise.area_por_status(versao, termos)
+    analise.bairros_mais_frequentes(versao, termos)
+
+
+def _preparar_agregacoes(caminho_csv, pasta, termos=()):
+    # Base e índice já em memória: a etapa mede só os filtros e os cálculos
+    _garantir_base(caminho_csv, pasta)
+    etl.carregar_dados(cfg.COLUNAS_DASHBOARD)
+    etl.carregar_indice()
+    return etl.versao_atual(), termos
+
+
+def _preparar_agregacoes_filtros(caminho_csv, pasta):
+    return _preparar_agregacoes(caminho_csv, pasta, _termos_selecao(SELECAO_FILTROS))
+
+
+ETAPAS_SUITE = [
+    ('guardiao.validar_arquivo', _preparar_validacao, guardiao.validar_arquivo),
+    ('etl.processar_dados', _preparar_processamento, _processar),
+    ('etl.processar_dados (atualização de 1%)', _preparar_atualizacao, _atualizar),
+    ('etl.carregar_dados + índice', _preparar_carga, _carregar),
+    ('agregações do Dashboard', _preparar_agregacoes, _agregacoes_dashboard),
+    ('agregações do Dashboard (filtros)', _preparar_agregacoes_filtros, _agregacoes_dashboard),
+]
+
+
+def bench_suite(args):
+    relatorio = bancada.executar_suite(ETAPAS_SUITE, _gerar_bloco, args.tamanhos, args.etapas, args.repeticoes)
+    if args.salvar:
+        bancada.salvar_relatorio(relatorio, args.salvar)
+        print(f"\nBaseline salva em {args.salvar}")
+    if args.comparar:
+        regressoes = bancada.comparar(relatorio, args.comparar, args.tolerancia)
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('alvo', choices=['enriquecimento', 'filtros', 'memoria', 'kpis', 'graficos', 'quartis', 'suite'])
+    parser.add_argument('--linhas', type=int, default=300_000)
+    # Opções da suite
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=bancada.TAMANHOS_PADRAO)
+    parser.add_argument('--etapas', nargs='+', help="Nomes das etapas (padrão: todas)")
+    parser.add_argument('--repeticoes', type=int, default=1)
+    parser.add_argument('--salvar', help="Grava o resultado (JSON) para servir de baseline")
+    parser.add_argument('--comparar', help="Baseline (JSON) para comparar; sai com código 1 se houver regressão")
+    parser.add_argument('--tolerancia', type=float, default=bancada.TOLERANCIA_PADRAO)
+    args = parser.parse_args()
+
+    if args.alvo == 'enriquecimento':
+        bench_enriquecimento(args.linhas)
+    elif args.alvo == 'filtros':
+        bench_filtros(args.linhas)
+    elif args.alvo == 'memoria':
+        bench_memoria(args.linhas)
+    elif args.alvo == 'kpis':
+        bench_kpis(args.linhas)
+    elif args.alvo == 'graficos':
+        bench_graficos(args.linhas)
+    elif args.alvo == 'quartis':
+        bench_quartis(args.linhas)
+    elif args.alvo == 'suite':
+        bench_suite(args)
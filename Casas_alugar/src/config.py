@@ -11,7 +11,76 @@ MOEDA = "R$"
 # --- CAMINHOS ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INPUT_DIR = os.path.join(BASE_DIR, 'dados', 'input')
-ARQUIVO_PROCESSADO = os.path.join(INPUT_DIR, 'imoveis_processados.csv')
+
+# Flags de status das tarefas de ETL em segundo plano (ver tarefas.py)
+DIRS = {
+    'FLAGS': os.path.join(BASE_DIR, 'dados', 'flags'),
+}
+
+# --- ARMAZENAMENTO ---
+# 'parquet' (colunar e tipado, padrão), 'feather' ou 'csv' (legado)
+FORMATO_ARMAZENAMENTO = 'parquet'
+
+# Base processada publicada em versões (ver snapshots.py): cada carga grava uma
+# pasta nova em PASTA_VERSOES e troca o ponteiro ATUAL.json de uma vez
+PASTA_VERSOES = os.path.join(INPUT_DIR, 'imoveis_versoes')
+# Versões mantidas para rollback (a atual nunca é apagada)
+VERSOES_RETIDAS = 5
+# Arquivos de cada versão: a base e o índice de bitmaps dos filtros (ver indice.py)
+NOME_BASE = f'imoveis_processados.{FORMATO_ARMAZENAMENTO}'
+NOME_INDICE = 'imoveis_processados.indice.npz'
+
+# Bases das versões anteriores do sistema, sem versões (a primeira que existir
+# é migrada automaticamente)
+ARQUIVOS_LEGADOS = [
+    os.path.join(INPUT_DIR, f'imoveis_processados.{ext}') for ext in ('parquet', 'feather', 'csv')
+]
+
+# --- INGESTÃO ---
+# 'completo': o arquivo substitui o inventário. 'atualizacao': o arquivo traz só
+# imóveis novos ou alterados e é mesclado no inventário atual pela CHAVE_IMOVEL
+# (upsert); só as linhas que mudam são recalculadas
+MODO_INGESTAO = 'completo'
+CHAVE_IMOVEL = 'ID'
+# Registro das atualizações: uma linha JSON por campo alterado ou imóvel incluído
+ARQUIVO_LOG_ALTERACOES = os.path.join(INPUT_DIR, 'imoveis_alteracoes.jsonl')
+
+# --- SERVIÇO DE DADOS (servico_dados.py) ---
+# Uma cópia de cada base por processo, compartilhada pelas sessões do Dashboard.
+# Base sem sessões usando e sem acesso há TEMPO_OCIOSO_DADOS segundos é descarregada.
+TEMPO_OCIOSO_DADOS = 300
+# Lê as bases por memory map (Arrow IPC em PASTA_CACHE_DADOS): sem cópia e com
+# as páginas compartilhadas entre processos do mesmo host
+DADOS_MMAP = True
+PASTA_CACHE_DADOS = os.path.join(INPUT_DIR, 'cache')
+# KPIs e dados de gráfico memoizados por (versão, filtro) (analise.py), em LRU
+MAX_RESULTADOS = 256
+
+# --- DASHBOARD ---
+# Abas sob demanda: só a aba aberta calcula os KPIs e monta os gráficos; trocar
+# de aba roda o script de novo (st.tabs com on_change="rerun"). Desligado, as
+# duas abas rodam a cada interação e a troca de aba fica só no navegador.
+ABAS_SOB_DEMANDA = True
+
+# --- TAREFAS DE ETL EM SEGUNDO PLANO (tarefas.py) ---
+# Processos que executam os uploads. Tarefas do mesmo cliente gravam a mesma
+# base, então 1 = fila (uma por vez, na ordem de envio).
+MAX_TAREFAS_ETL = 1
+
+# --- INSTRUMENTAÇÃO (instrumentacao.py) ---
+# Tempo, linhas e variação de memória por etapa do ETL e por bloco do Dashboard:
+# painel "Desempenho" na barra lateral e uma linha JSON por trecho em
+# ARQUIVO_LOG_DESEMPENHO. Desligada, cada marcação custa uma chamada de função.
+INSTRUMENTACAO = False
+# Cada execução medida roda sob cProfile (.prof em PASTA_LOGS); no Dashboard
+# também pode ser ligado pelo painel, só para a próxima execução
+PERFIL_CPROFILE = False
+PASTA_LOGS = os.path.join(BASE_DIR, 'dados', 'logs')
+ARQUIVO_LOG_DESEMPENHO = os.path.join(PASTA_LOGS, 'desempenho.jsonl')
+
+# --- VALIDAÇÃO (GUARDIÃO) ---
+# % mínimo de linhas sem nenhum campo nulo para aceitar um arquivo
+INTEGRIDADE_MINIMA = 80.0
 
 # --- DEFINIÇÃO DO SCHEMA ---
 COLUNAS_OFICIAIS = [
@@ -45,4 +114,49 @@ COLUNAS_NUMERICAS = {
     'Seguro': 'float64'
 }
 
-COLUNAS_TEXTO = ['Cidade', 'Aceita Animais', 'Mobilhado', 'Tipo Imóvel', 'Bairro', 'Estado']
\ No newline at end of file
+COLUNAS_TEXTO = ['Cidade', 'Aceita Animais', 'Mobilhado', 'Tipo Imóvel', 'Bairro', 'Estado']
+
+# Tipos compactos em memória e em disco (aplicados no ETL e na carga do Dashboard).
+# COLUNAS_NUMERICAS segue sendo o tipo da conversão; aqui fica o tipo final.
+# Inteiros só encolhem se os valores couberem; valores usados em médias e somas
+# do Dashboard (aluguel, custo, preço/m²) ficam em float64.
+PLANO_DTYPES = {
+    'ID': 'int32',
+    'Area': 'int32',
+    'Quartos': 'int8',
+    'Banheiros': 'int8',
+    'Vagas garagem': 'int8',
+    'Valor condomínio': 'float32',
+    'IPTU': 'float32',
+    'Seguro': 'float32',
+    'Cidade': 'category',
+    'Aceita Animais': 'category',
+    'Mobilhado': 'category',
+    'Tipo Imóvel': 'category',
+    'Bairro': 'category',
+    'Estado': 'category',
+}
+
+# --- CATEGORIZAÇÃO ---
+LABELS_QUARTIL = ['1. Econômico (Q1)', '2. Médio Padrão (Q2)', '3. Alto Padrão (Q3)', '4. Luxo/Premium (Q4)']
+
+# Cortes dos quartis, gravados na pasta de cada versão e herdados pelas cargas
+# seguintes (ver quartis.py)
+NOME_QUARTIS = 'quartis.json'
+# Uma carga recalcula os cortes se a fatia do inventário em algum quartil se
+# afastar mais que isto (0.05 = 5 pontos percentuais) da fatia de quando os
+# cortes foram definidos
+DERIVA_MAXIMA_QUARTIS = 0.05
+
+# Colunas usadas pelo Dashboard (o resto não é lido do disco)
+COLUNAS_DASHBOARD = [
+    'Categoria_Preco', 'Estado', 'Tipo Imóvel', 'Bairro',
+    'Valor do Aluguel', 'Quartos', 'Area', 'Custo_Mensal', 'Preco_m2'
+]
+
+# Colunas categóricas indexadas (bitmaps por valor + opções ordenadas dos filtros)
+COLUNAS_INDEXADAS = ['Categoria_Preco', 'Estado', 'Tipo Imóvel', 'Bairro']
+
+# Colunas de cada aba (a consulta devolve só estas linhas × colunas)
+COLUNAS_ABA_FINANCEIRO = ['Estado', 'Bairro', 'Valor do Aluguel', 'Custo_Mensal', 'Preco_m2']
+COLUNAS_ABA_IMOVEIS = ['Estado', 'Tipo Imóvel', 'Bairro', 'Area']
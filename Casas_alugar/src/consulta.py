@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import indice as idx
+
+# ==============================================================================
+# CAMADA DE CONSULTA (FILTROS DO DASHBOARD)
+# ==============================================================================
+# Os filtros da barra lateral viram termos (coluna, operador, valor), no mesmo
+# formato do 'filters' do pyarrow, combinados com E. Nenhum DataFrame
+# intermediário é criado: as linhas filtradas só são materializadas no fim,
+# com as colunas que cada aba usa.
+#
+# Operadores: 'in' (lista), '==', '>=', '<='.
+
+OPERADORES = {
+    'in': lambda valores, valor: pd.Series(valores).isin(valor).to_numpy(),
+    '==': lambda valores, valor: valores == valor,
+    '>=': lambda valores, valor: valores >= valor,
+    '<=': lambda valores, valor: valores <= valor,
+}
+
+# Acima disso, as opções de uma coluna indexada saem dos códigos das linhas
+# que passam (varrer um bitmap por valor custaria mais)
+MAX_VALORES_BITMAP = 32
+
+
+class Consulta:
+    """
+    Filtros encadeados (E) sobre um DataFrame somente leitura.
+    Guarda só as posições das linhas que ainda passam (None = todas): cada
+    filtrar() avalia o termo novo apenas nessas linhas, e as opções de cada
+    nível da barra lateral (hierarquia) saem do mesmo conjunto de linhas.
+
+    Com um índice de bitmaps (indice.py) do mesmo DataFrame, os primeiros termos
+    'in'/'==' de colunas indexadas são resolvidos com OR/AND de bitmaps, e as
+    opções dessas colunas saem do índice, já ordenadas. Depois que as linhas
+    viram posições, os termos seguintes avaliam só essas linhas.
+    """
+
+    def __init__(self, df, indice=None):
+        self.df = df
+        self.termos = []
+        self.linhas = None
+        # Bitmap das linhas que passam, enquanto só houver termos indexados
+        self.bits = None
+        self.indice = indice if indice is not None and indice.linhas == len(df) else None
+
+    def _indexado(self, coluna):
+        return self.indice is not None and coluna in self.indice
+
+    def _posicoes(self):
+        """Troca o bitmap por posições (para termos não indexados e leitura das linhas)."""
+        if self.bits is not None:
+            self.linhas = idx.posicoes(self.bits, len(self.df))
+            self.bits = None
+        return self.linhas
+
+    def _valores(self, coluna):
+        """Valores da coluna nas linhas atuais (códigos, se for categórica)."""
+        serie = self.df[coluna]
+        valores = serie.cat.codes.to_numpy() if isinstance(serie.dtype, pd.CategoricalDtype) else serie.to_numpy()
+        linhas = self._posicoes()
+        return valores if linhas is None else valores[linhas]
+
+    def filtrar(self, coluna, operador, valor):
+        self.termos.append((coluna, operador, valor))
+
+        if self.linhas is None and self._indexado(coluna) and operador in ('in', '=='):
+            bits = self.indice[coluna].bitmap(valor if operador == 'in' else [valor])
+            self.bits = bits if self.bits is None else self.bits & bits
+            return self
+
+        serie = self.df[coluna]
+        valores = self._valores(coluna)
+        if isinstance(serie.dtype, pd.CategoricalDtype) and operador in ('in', '=='):
+            # Tabela categoria -> passa? (a última posição atende o código -1, nulo)
+            aceitas = serie.cat.categories.isin(valor if operador == 'in' else [valor])
+            passa = np.append(aceitas, False)[valores]
+        else:
+            passa = OPERADORES[operador](valores, valor)
+        passa = np.asarray(passa, dtype=bool)
+        self.linhas = np.flatnonzero(passa) if self.linhas is None else self.linhas[passa]
+        return self
+
+    @property
+    def total(self):
+        if self.bits is not None:
+            return idx.contar(self.bits)
+        return len(self.df) if self.linhas is None else len(self.linhas)
+
+    def opcoes(self, coluna):
+        """Valores distintos (ordenados) da coluna entre as linhas que passam nos filtros."""
+        if self.linhas is None and self._indexado(coluna):
+            indice_coluna = self.indice[coluna]
+            if self.bits is None:
+                return list(indice_coluna.valores)
+            if len(indice_coluna.valores) <= MAX_VALORES_BITMAP:
+                return indice_coluna.presentes(self.bits)
+
+        serie = self.df[coluna]
+        valores = self._valores(coluna)
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Categorias presentes, contadas pelos códigos (sem comparar textos)
+            presentes = np.bincount(valores[valores >= 0], minlength=len(serie.cat.categories)) > 0
+            return sorted(serie.cat.categories[presentes])
+        valores = pd.unique(valores)
+        return sorted(valores[pd.notna(valores)])
+
+    def faixa(self, coluna):
+        """(mínimo, máximo) da coluna entre as linhas que passam nos filtros."""
+        valores = self._valores(coluna)
+        return valores.min(), valores.max()
+
+    def resultado(self, colunas=None):
+        """Linhas filtradas, só com as colunas pedidas (uma única seleção)."""
+        linhas = self._posicoes()
+        linhas = slice(None) if linhas is None else linhas
+        if colunas is None:
+            return self.df.iloc[linhas]
+        # Coluna a coluna: só as pedidas são copiadas (iloc[linhas, colunas] é bem mais lento)
+        return pd.DataFrame({col: self.df[col].iloc[linhas] for col in colunas})
+
@@ -1,7 +1,15 @@
+import json
+import numpy as np
 import pandas as pd
 import os
 import config as cfg
 import guardiao
+import instrumentacao
+import armazenamento
+import indice
+import quartis
+import servico_dados
+import snapshots
 import re
 
 def ler_csv_robusto(uploaded_file):
@@ -24,74 +32,430 @@ def limpar_string_numerica(series):
     series = series.astype(str).str.replace(r'[^\d,\.]', '', regex=True)
     return series.str.replace(',', '.', regex=False)
 
-def processar_dados(uploaded_file):
+def _divisao_segura(numerador, denominador):
+    """numerador / denominador, com 0 onde o denominador não é positivo."""
+    numerador = np.asarray(numerador, dtype='float64')
+    denominador = np.asarray(denominador, dtype='float64')
+    return np.divide(numerador, denominador, out=np.zeros_like(numerador), where=denominador > 0)
+
+
+def enriquecer(df, limites=None):
+    """
+    Etapa de enriquecimento, toda vetorizada: Custo_Mensal, Preco_m2 e Categoria_Preco.
+    Recebe o DataFrame já tipado e devolve uma cópia com as colunas calculadas.
+    Categoria_Preco segue os 'limites' dos quartis (quartis.py); sem eles, os
+    quartis do próprio conjunto.
+    """
+    custo_mensal = df['Valor do Aluguel'] + df['Valor condomínio'] + df['IPTU'] + df['Seguro']
+    if limites is None:
+        limites = quartis.calcular(df['Valor do Aluguel'])['limites']
+
+    return df.assign(
+        Custo_Mensal=custo_mensal,
+        Preco_m2=_divisao_segura(df['Valor do Aluguel'], df['Area']),
+        Categoria_Preco=quartis.classificar(df['Valor do Aluguel'], limites),
+    )
+
+
+def _avisar(progresso, etapa, linhas=None):
+    """Informa a etapa atual (ver tarefas.ETAPAS) a quem acompanha o processamento e à instrumentação."""
+    instrumentacao.etapa(f"etl.{etapa}", linhas)
+    if progresso is not None:
+        progresso(etapa, linhas)
+
+
+def _limpar_e_tipar(df):
+    """Limpeza e tipagem do arquivo lido: números, textos padronizados e sem vazios essenciais."""
+    df_limpo = df.copy()
+
+    # A. Numéricos
+    for col, dtype in cfg.COLUNAS_NUMERICAS.items():
+        if col in df_limpo.columns:
+            if df_limpo[col].dtype == 'object':
+                df_limpo[col] = limpar_string_numerica(df_limpo[col])
+            df_limpo[col] = pd.to_numeric(df_limpo[col], errors='coerce').fillna(0).astype(dtype)
+
+    # B. Textos (Padronização automática definida no config)
+    for col in cfg.COLUNAS_TEXTO:
+        if col in df_limpo.columns:
+            df_limpo[col] = df_limpo[col].astype(str).str.strip().str.title()
+
+    # C. Remove vazios essenciais
+    return df_limpo.dropna(subset=['Cidade', 'Valor do Aluguel'])
+
+
+def _sem_ids_repetidos(df):
+    """
+    Um registro por imóvel (cfg.CHAVE_IMOVEL): de IDs repetidos fica o último,
+    como no upsert. Retorna (DataFrame, quantos registros repetidos saíram).
+    """
+    repetidos = df.duplicated(subset=cfg.CHAVE_IMOVEL, keep='last').to_numpy()
+    if not repetidos.any():
+        return df, 0
+    return df[~repetidos].reset_index(drop=True), int(repetidos.sum())
+
+
+def _resumo_repetidos(repetidos):
+    """Complemento da mensagem da carga quando registros com ID repetido foram descartados."""
+    if not repetidos:
+        return ""
+    return f" {repetidos} registros com {cfg.CHAVE_IMOVEL} repetido descartados (vale o último de cada imóvel)."
+
+
+@instrumentacao.medido('etl.processar_dados')
+def processar_dados(uploaded_file, modo=None, progresso=None):
     """
     Lê, limpa, calcula custos e CLASSIFICA POR QUARTIS.
+    modo (se omitido, usa cfg.MODO_INGESTAO):
+      'completo'    o arquivo substitui o inventário
+      'atualizacao' o arquivo traz imóveis novos ou alterados, mesclados no
+                    inventário atual pela chave cfg.CHAVE_IMOVEL (upsert)
+    progresso(etapa, linhas), se informado, é chamado a cada etapa (ver tarefas.py).
     """
+    modo = modo or cfg.MODO_INGESTAO
     try:
         # 1. LEITURA
+        _avisar(progresso, 'leitura')
         df = ler_csv_robusto(uploaded_file)
 
     except Exception as e:
         return False, f"Erro ao ler arquivo: {e}"
 
     # 2. VALIDAÇÃO
+    _avisar(progresso, 'validacao', len(df))
     sucesso, msg = guardiao.validar_arquivo(df)
     if not sucesso:
         return False, msg
 
     # 3. LIMPEZA E TIPAGEM
     try:
-        df_limpo = df.copy()
-        
-        # A. Numéricos
-        for col, dtype in cfg.COLUNAS_NUMERICAS.items():
-            if col in df_limpo.columns:
-                if df_limpo[col].dtype == 'object':
-                    df_limpo[col] = limpar_string_numerica(df_limpo[col])
-                df_limpo[col] = pd.to_numeric(df_limpo[col], errors='coerce').fillna(0).astype(dtype)
-
-        # B. Textos (Padronização automática definida no config)
-        for col in cfg.COLUNAS_TEXTO:
-            if col in df_limpo.columns:
-                df_limpo[col] = df_limpo[col].astype(str).str.strip().str.title()
-                
-        # C. Remove vazios essenciais
-        df_limpo = df_limpo.dropna(subset=['Cidade', 'Valor do Aluguel'])
-
-        # 4. ENRIQUECIMENTO
-        df_limpo['Custo_Mensal'] = df_limpo['Valor do Aluguel'] + df_limpo['Valor condomínio'] + df_limpo['IPTU'] + df_limpo['Seguro']
-        
-        df_limpo['Preco_m2'] = df_limpo.apply(lambda x: x['Valor do Aluguel'] / x['Area'] if x['Area'] > 0 else 0, axis=1)
-
-        # --- QUARTIS ---
-        labels_quartil = ['1. Econômico (Q1)', '2. Médio Padrão (Q2)', '3. Alto Padrão (Q3)', '4. Luxo/Premium (Q4)']
-        try:
-            df_limpo['Categoria_Preco'] = pd.qcut(
-                df_limpo['Valor do Aluguel'], 
-                q=4, 
-                labels=labels_quartil,
-                duplicates='drop'
-            )
-        except ValueError:
-            df_limpo['Categoria_Preco'] = 'Geral'
-
-        # 5. SALVAMENTO
-        os.makedirs(cfg.INPUT_DIR, exist_ok=True)
-        df_limpo.to_csv(cfg.ARQUIVO_PROCESSADO, index=False, encoding='utf-8')
-        
-        return True, f"Sucesso! {len(df_limpo)} imóveis processados."
+        _avisar(progresso, 'tipagem', len(df))
+        df_limpo = _limpar_e_tipar(df)
+
+        if modo == 'atualizacao' and versao_atual() is not None:
+            return _processar_atualizacao(df_limpo, progresso)
+
+        # A chave do imóvel é única na base (o upsert localiza cada imóvel por ela)
+        df_limpo, repetidos = _sem_ids_repetidos(df_limpo)
+
+        # 4. ENRIQUECIMENTO (contas em float64) E TIPOS COMPACTOS (cfg.PLANO_DTYPES)
+        # Categoria_Preco pelos cortes dos quartis herdados da versão atual (quartis.py)
+        _avisar(progresso, 'enriquecimento', len(df_limpo))
+        cortes = quartis.definir(df_limpo['Valor do Aluguel'], quartis.ler(snapshots.pasta_atual()))
+        df_limpo = armazenamento.compactar_tipos(enriquecer(df_limpo, cortes['limites']), cfg.PLANO_DTYPES)
+
+        # 5. SALVAMENTO (base, índice e cortes numa versão nova, publicada de uma vez)
+        _avisar(progresso, 'gravacao', len(df_limpo))
+        msg_quartis = _resumo_quartis(cortes)
+        _publicar(df_limpo, cortes, carga='completa', repetidos=repetidos)
+
+        return True, f"Sucesso! {len(df_limpo)} imóveis processados.{_resumo_repetidos(repetidos)}{msg_quartis}"
 
     except Exception as e:
         return False, f"Erro no processamento lógico: {e}"
 
 
-def carregar_dados():
-    if not os.path.exists(cfg.ARQUIVO_PROCESSADO):
+# --- ATUALIZAÇÃO POR ID (UPSERT) ---
+# O arquivo traz só imóveis novos ou alterados. A base atual já está tipada e
+# enriquecida: as linhas do arquivo iguais às da base são descartadas, e só as
+# que mudam algo passam pelo enriquecimento (Custo_Mensal, Preco_m2 e
+# Categoria_Preco pelos cortes herdados). Imóveis alterados ficam na mesma
+# posição e os novos entram no fim, então o índice de bitmaps da versão atual
+# continua valendo para as demais linhas: só os bits das linhas tocadas são
+# refeitos (indice.atualizar_indice). Cada campo alterado e cada imóvel
+# incluído vai para o registro de alterações (cfg.ARQUIVO_LOG_ALTERACOES).
+
+def _diferencas(atuais, novos):
+    """Quadro booleano linhas × colunas oficiais: True onde 'novos' difere de 'atuais' (mesma ordem)."""
+    diferencas = {}
+    for col in cfg.COLUNAS_OFICIAIS:
+        antes = atuais[col].astype(object).to_numpy()
+        depois = novos[col].astype(object).to_numpy()
+        diferencas[col] = ~((antes == depois) | (pd.isna(antes) & pd.isna(depois)))
+    return pd.DataFrame(diferencas)
+
+
+def _aplicar_delta(base, linhas, posicoes):
+    """
+    Tabela nova: 'base' com as 'linhas' nas 'posicoes' (imóveis alterados) e as
+    de posição -1 (novos) anexadas no fim. Categorias ganham os valores novos.
+    """
+    existentes = posicoes >= 0
+    colunas = {}
+    for col in base.columns:
+        atual, novo = base[col], linhas[col]
+        if isinstance(atual.dtype, pd.CategoricalDtype):
+            faltam = pd.Index(novo.astype(object).dropna().unique()).difference(atual.cat.categories)
+            tipo = pd.CategoricalDtype(atual.cat.categories.append(faltam), ordered=atual.cat.ordered)
+            valores = atual.cat.codes.to_numpy().astype(np.int32)
+            novos = pd.Categorical(novo.astype(object), dtype=tipo).codes.astype(np.int32)
+        else:
+            novos = novo.astype(object).to_numpy() if atual.dtype == object else novo.to_numpy()
+            valores = atual.to_numpy().astype(np.result_type(atual.to_numpy().dtype, novos.dtype))
+        valores[posicoes[existentes]] = novos[existentes]
+        valores = np.concatenate([valores, novos[~existentes].astype(valores.dtype)])
+        colunas[col] = pd.Categorical.from_codes(valores, dtype=tipo) if isinstance(atual.dtype, pd.CategoricalDtype) else valores
+    return armazenamento.compactar_tipos(pd.DataFrame(colunas), cfg.PLANO_DTYPES)
+
+
+def _valores_log(serie):
+    """Valores de uma coluna para o registro de alterações (JSON): números e textos."""
+    if serie.dtype.kind == 'f':
+        return serie.astype('float64').round(2).tolist()
+    if serie.dtype.kind in 'iu':
+        return serie.tolist()
+    return serie.astype(str).tolist()
+
+
+def _registrar_alteracoes(versao, ids, antigos, novos, diferencas, incluidos):
+    """Anexa ao cfg.ARQUIVO_LOG_ALTERACOES um registro por campo alterado e por imóvel incluído."""
+    registros = []
+    for col in diferencas.columns:
+        marcadas = diferencas[col].to_numpy()
+        if not marcadas.any():
+            continue
+        for id_imovel, antes, depois in zip(_valores_log(ids[marcadas]), _valores_log(antigos[col][marcadas]),
+                                            _valores_log(novos[col][marcadas])):
+            registros.append({'versao': versao, cfg.CHAVE_IMOVEL: id_imovel, 'operacao': 'alteracao',
+                              'campo': col, 'antes': antes, 'depois': depois})
+    registros.extend({'versao': versao, cfg.CHAVE_IMOVEL: id_imovel, 'operacao': 'inclusao'}
+                     for id_imovel in _valores_log(incluidos))
+
+    os.makedirs(os.path.dirname(cfg.ARQUIVO_LOG_ALTERACOES), exist_ok=True)
+    with open(cfg.ARQUIVO_LOG_ALTERACOES, 'a', encoding='utf-8') as f:
+        f.writelines(json.dumps(registro, ensure_ascii=False) + '\n' for registro in registros)
+
+
+def _processar_atualizacao(delta, progresso=None):
+    """4. e 5. da atualização: mescla o arquivo (já tipado) na versão atual e publica uma versão nova."""
+    chave = cfg.CHAVE_IMOVEL
+    versao = versao_atual()
+    base = _tipar(armazenamento.ler_tabela(caminho_base(versao)))
+    anterior = quartis.ler(snapshots.pasta_versao(versao))
+    # Bases publicadas antes da chave única podem repetir IDs: fica o último
+    # registro de cada imóvel, e as posições mudam (o índice é remontado)
+    base, repetidos = _sem_ids_repetidos(base)
+
+    # Último registro de cada imóvel no arquivo; fora os que não mudam nada
+    _avisar(progresso, 'enriquecimento', len(delta))
+    delta, _ = _sem_ids_repetidos(delta)
+    posicoes = pd.Index(base[chave]).get_indexer(delta[chave])
+    existentes = np.flatnonzero(posicoes >= 0)
+    antigos = base.iloc[posicoes[existentes]].reset_index(drop=True)
+    atualizados = armazenamento.compactar_tipos(delta.iloc[existentes].reset_index(drop=True), cfg.PLANO_DTYPES)
+    diferencas = _diferencas(antigos, atualizados)
+    alterados = diferencas.any(axis=1).to_numpy()
+    mudam = posicoes < 0
+    mudam[existentes[alterados]] = True
+    if not mudam.any() and not repetidos:
+        return True, f"Nenhuma alteração: os {len(delta)} imóveis do arquivo já estão na base."
+
+    # Enriquecimento só das linhas que mudam, pelos cortes herdados
+    limites = anterior['limites'] if anterior is not None else None
+    linhas = armazenamento.compactar_tipos(enriquecer(delta[mudam], limites), cfg.PLANO_DTYPES)
+    tabela = _aplicar_delta(base, linhas.reset_index(drop=True), posicoes[mudam])
+
+    # Deriva dos quartis no inventário mesclado: recalcula só se passar do limite
+    cortes = quartis.definir(tabela['Valor do Aluguel'], anterior, categorias=tabela['Categoria_Preco'])
+    if cortes is not anterior:
+        tabela['Categoria_Preco'] = quartis.classificar(tabela['Valor do Aluguel'], cortes['limites'])
+        pronto = None
+    elif repetidos:
+        pronto = None
+    else:
+        pronto = indice.atualizar_indice(_ler_ou_reconstruir_indice(versao), tabela, posicoes[mudam & (posicoes >= 0)])
+
+    _avisar(progresso, 'gravacao', len(tabela))
+    n_alterados, n_novos = int(alterados.sum()), int((posicoes < 0).sum())
+    msg_quartis = _resumo_quartis(cortes)
+    nova = _publicar(tabela, cortes, pronto, carga='atualizacao', alterados=n_alterados, novos=n_novos,
+                     repetidos=repetidos)
+    _registrar_alteracoes(nova, antigos[chave][alterados], antigos[alterados], atualizados[alterados],
+                          diferencas[alterados], delta[chave][posicoes < 0])
+
+    return True, (f"Sucesso! {n_alterados} imóveis alterados e {n_novos} novos "
+                  f"({len(delta) - n_alterados - n_novos} sem mudança).{_resumo_repetidos(repetidos)}{msg_quartis}")
+
+
+def _resumo_quartis(cortes):
+    """Complemento da mensagem da carga quando os cortes dos quartis foram recalculados por deriva."""
+    if cortes['definidos_em'] is None and cortes['motivo'] == 'deriva':
+        return f" Quartis recalculados (deriva de {cortes['deriva'] * 100:.0f} p.p. num segmento)."
+    return ""
+
+
+def _publicar(df, cortes, pronto=None, **info):
+    """
+    Grava base, índice e cortes dos quartis numa versão nova e a publica.
+    'pronto': índice de bitmaps de 'df' já montado (None = montar).
+    Cortes recém-calculados (definidos_em None) são marcados com a versão nova.
+    """
+    nova = snapshots.NovaVersao()
+    try:
+        novos = cortes['definidos_em'] is None
+        if novos:
+            cortes = {**cortes, 'definidos_em': nova.versao}
+        armazenamento.salvar_tabela(df, os.path.join(nova.raiz, cfg.NOME_BASE))
+        salvar_indice(df, nova.raiz, pronto)
+        quartis.gravar(cortes, nova.raiz)
+        return nova.publicar(linhas=len(df), quartis=cortes['motivo'] if novos else 'mantidos', **info)
+    except BaseException:
+        nova.descartar()
+        raise
+
+
+@instrumentacao.medido('etl.rebalancear_quartis')
+def rebalancear_quartis(progresso=None):
+    """
+    Recalcula os cortes dos quartis com o inventário da versão atual e publica
+    uma versão nova com Categoria_Preco reclassificada. Retorna (sucesso, mensagem).
+    O Dashboard a executa na fila de tarefas (tarefas.enviar_operacao); 'progresso'
+    como em processar_dados.
+    """
+    versao = versao_atual()
+    if versao is None:
+        return False, "❌ Não há base para rebalancear."
+    try:
+        _avisar(progresso, 'leitura')
+        df = _tipar(armazenamento.ler_tabela(caminho_base(versao)))
+
+        _avisar(progresso, 'enriquecimento', len(df))
+        cortes = quartis.definir(df['Valor do Aluguel'], rebalancear=True)
+        categorias = pd.Series(quartis.classificar(df['Valor do Aluguel'], cortes['limites']), index=df.index)
+        mudaram = int((categorias.astype(str) != df['Categoria_Preco'].astype(str)).sum())
+
+        _avisar(progresso, 'gravacao', len(df))
+        df = armazenamento.compactar_tipos(df.assign(Categoria_Preco=categorias), cfg.PLANO_DTYPES)
+        _publicar(df, cortes, carga='rebalanceamento', reclassificados=mudaram)
+        return True, f"Quartis recalculados: {mudaram} imóveis mudaram de segmento."
+    except Exception as e:
+        return False, f"Erro ao rebalancear: {e}"
+
+
+def salvar_indice(df, raiz, pronto=None):
+    """
+    Grava o índice de bitmaps de 'df', já salvo como cfg.NOME_BASE na pasta 'raiz'
+    de uma versão; 'pronto' é o índice de 'df' já montado (None = montar).
+    """
+    versao = armazenamento.assinatura(os.path.join(raiz, cfg.NOME_BASE))[1]
+    pronto = pronto if pronto is not None else indice.construir_indice(df)
+    indice.salvar_indice(pronto, os.path.join(raiz, cfg.NOME_INDICE), versao)
+
+
+def _tipar_categoria(df):
+    """Restaura Categoria_Preco como categórica ordenada (o CSV legado perde a tipagem)."""
+    if 'Categoria_Preco' in df.columns and not isinstance(df['Categoria_Preco'].dtype, pd.CategoricalDtype):
+        categorias = [c for c in cfg.LABELS_QUARTIL if c in set(df['Categoria_Preco'].unique())]
+        if len(categorias) == df['Categoria_Preco'].nunique():
+            df['Categoria_Preco'] = pd.Categorical(df['Categoria_Preco'], categories=categorias, ordered=True)
+    return df
+
+
+def _tipar(df):
+    """Categoria_Preco ordenada e tipos compactos (cfg.PLANO_DTYPES) de uma tabela lida do disco."""
+    return armazenamento.compactar_tipos(_tipar_categoria(df), cfg.PLANO_DTYPES)
+
+
+def migrar_processado_legado():
+    """
+    Migração única: a base sem versões das versões anteriores do sistema
+    (cfg.ARQUIVOS_LEGADOS, ex.: imoveis_processados.csv) vira a primeira versão
+    da base (snapshots.py), no formato de FORMATO_ARMAZENAMENTO, com o índice.
+    """
+    if snapshots.versao_atual() is not None:
+        return False
+    legados = [caminho for caminho in cfg.ARQUIVOS_LEGADOS if os.path.exists(caminho)]
+    if not legados:
+        return False
+
+    nova = snapshots.NovaVersao()
+    try:
+        caminho = os.path.join(nova.raiz, cfg.NOME_BASE)
+        linhas = armazenamento.migrar_tabela(legados[0], caminho, preparar=_tipar)
+        salvar_indice(armazenamento.ler_tabela(caminho, cfg.COLUNAS_INDEXADAS), nova.raiz)
+        nova.publicar(linhas=linhas, carga='migracao')
+    except BaseException:
+        nova.descartar()
+        raise
+    return True
+
+
+def invalidar_cache():
+    """Descarta as bases em memória (as sessões abertas mantêm as suas até recarregar)."""
+    servico_dados.SERVICO.invalidar()
+    servico_dados.RESULTADOS.invalidar()
+
+
+def versao_atual():
+    """
+    Versão publicada da base (migrando a legada, se for o caso); None se não houver.
+    O Dashboard a resolve uma vez por execução e a passa às cargas (versão fixada).
+    """
+    try:
+        migrar_processado_legado()
+    except Exception as e:
+        print(f"Erro ao migrar base legada: {e}")
+    return snapshots.versao_atual()
+
+
+def caminho_base(versao=None):
+    """Arquivo da base na 'versao' (padrão: a atual); None se não houver versão publicada."""
+    versao = versao or versao_atual()
+    return os.path.join(snapshots.pasta_versao(versao), cfg.NOME_BASE) if versao else None
+
+
+@instrumentacao.medido('etl.carregar_dados')
+def carregar_dados(colunas=None, sessao=None, versao=None):
+    """
+    Lê a base processada; 'colunas' limita a leitura (ex.: cfg.COLUNAS_DASHBOARD).
+    A base fica no serviço de dados do processo, uma cópia somente leitura por
+    versão compartilhada entre as sessões; 'sessao' (st.session_state) registra o uso.
+    'versao' fixa a versão lida (padrão: a atual).
+    """
+    versao = versao or versao_atual()
+    if versao is None:
         return None
     try:
-        df = pd.read_csv(cfg.ARQUIVO_PROCESSADO)
-        return df
+        caminho = caminho_base(versao)
+        chave = (cfg.PASTA_VERSOES, 'base', tuple(colunas) if colunas is not None else None)
+        leitor = lambda: _tipar(armazenamento.ler_tabela(caminho, colunas))
+        return servico_dados.SERVICO.obter(chave, versao, leitor, sessao)
     except Exception as e:
         print(f"Erro ao carregar: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def _ler_ou_reconstruir_indice(versao):
+    """
+    Índice gravado na pasta da versão ou, se faltar ou não for do arquivo da
+    base, montado em memória. A pasta de uma versão publicada não é alterada.
+    """
+    caminho = caminho_base(versao)
+    assinatura = armazenamento.assinatura(caminho)[1]
+    atual = indice.ler_indice(os.path.join(snapshots.pasta_versao(versao), cfg.NOME_INDICE))
+    if atual is not None and atual.assinatura == assinatura:
+        return atual
+
+    novo = indice.construir_indice(armazenamento.ler_tabela(caminho, cfg.COLUNAS_INDEXADAS))
+    novo.assinatura = tuple(assinatura)
+    return novo
+
+
+@instrumentacao.medido('etl.carregar_indice')
+def carregar_indice(sessao=None, versao=None):
+    """
+    Lê o índice de bitmaps dos filtros, gravado na pasta da versão. Se faltar ou
+    não for do arquivo da base (assinatura diferente), é remontado em memória.
+    Também fica no serviço de dados (uma cópia por versão para todas as sessões).
+    'versao' fixa a versão lida (padrão: a atual).
+    None se não houver base ou o índice não puder ser montado.
+    """
+    versao = versao or versao_atual()
+    if versao is None:
+        return None
+    try:
+        return servico_dados.SERVICO.obter((cfg.PASTA_VERSOES, 'indice'), versao,
+                                           lambda: _ler_ou_reconstruir_indice(versao), sessao, mapear=False)
+    except Exception as e:
+        print(f"Erro ao carregar índice: {e}")
+        return None
@@ -0,0 +1,118 @@
+import hashlib
+from functools import wraps
+import pandas as pd
+import plotly.express as px
+import servico_dados
+
+# ==============================================================================
+# CAMADA DE GRÁFICOS (FIGURAS PLOTLY DAS TABELAS DA ANÁLISE, SEM STREAMLIT)
+# ==============================================================================
+# Cada função recebe a tabela pequena, já agregada, de um gráfico (analise.py)
+# e devolve a figura. O plotly express leva dezenas de ms por figura mesmo com
+# duas linhas de dados, e cada execução do Dashboard montava todas de novo:
+# as figuras ficam em FIGURAS, com a chave (gráfico, hash do conteúdo da
+# tabela). Mesma tabela, mesma figura, qualquer que seja a sessão ou o filtro
+# que a gerou. As figuras são compartilhadas: somente leitura (o
+# st.plotly_chart não as altera).
+#
+# O tema escuro (TEMA_ESCURO) é aplicado num lugar só, no decorador figura().
+# Fica no layout da figura e não num template do plotly: com o tema
+# "streamlit", o navegador sobrescreve o layout do template (fundo, fonte)
+# com as cores do Streamlit, e o layout da figura é o que prevalece.
+
+# --- CORES ---
+CORES = {
+    'primary': '#003366', 'secondary': '#E5E5E5',
+    'background': '#0E1117', 'card_bg': '#1A1C24', 'accent': '#FFD700',
+    'locado': '#FF4B4B', 'disponivel': '#00CC96'
+}
+CORES_STATUS = {'Locado': CORES['locado'], 'Disponível': CORES['disponivel']}
+
+TEMA_ESCURO = dict(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white")
+
+FIGURAS_RETIDAS = 64
+
+FIGURAS = servico_dados.CacheResultados(limite=FIGURAS_RETIDAS)
+
+
+def assinatura(tabela):
+    """Hash do conteúdo de uma tabela (valores, índice e nomes das colunas)."""
+    h = hashlib.sha1(pd.util.hash_pandas_object(tabela, index=True).to_numpy().tobytes())
+    h.update(repr(list(tabela.columns)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def figura(construir):
+    """
+    Decorador: construir(tabela) passa a devolver a figura guardada em FIGURAS
+    para o mesmo conteúdo de tabela, já com o TEMA_ESCURO.
+    A função original fica em .__wrapped__ (figura sem cache nem tema).
+    """
+    @wraps(construir)
+    def memorizada(tabela):
+        chave = (construir.__qualname__, assinatura(tabela))
+        return FIGURAS.obter(chave, lambda: construir(tabela).update_layout(**TEMA_ESCURO))
+    return memorizada
+
+
+# --- PAINEL FINANCEIRO ---
+
+@figura
+def rosca_ocupacao(tabela):
+    """Rosca dos imóveis por status (analise.ocupacao)."""
+    return px.pie(tabela, values='Qtd', names='Estado', hole=0.5,
+                  color='Estado', color_discrete_map=CORES_STATUS)
+
+
+@figura
+def colunas_volume_status(tabela):
+    """Colunas da soma dos aluguéis por status (analise.volume_por_status)."""
+    fig = px.bar(tabela, x='Estado', y='Valor do Aluguel', text_auto=True,
+                 color='Estado', color_discrete_map=CORES_STATUS)
+    return fig.update_traces(texttemplate='R$ %{y:,.2s}')
+
+
+@figura
+def barras_top_bairros(tabela):
+    """Barras agrupadas do aluguel médio por bairro e status (analise.top_bairros_valor)."""
+    fig = px.bar(tabela, y='Bairro', x='Valor do Aluguel', color='Estado',
+                 orientation='h', barmode='group', # Group facilita comparação de médias
+                 color_discrete_map=CORES_STATUS,
+                 text_auto=True)
+    fig.update_layout(xaxis_title="Valor Médio do Aluguel", yaxis={'categoryorder':'total ascending'}, height=600)
+    return fig.update_traces(texttemplate='R$ %{x:,.0f}')
+
+
+# --- PAINEL IMÓVEIS ---
+
+@figura
+def rosca_tipos(tabela):
+    """Rosca dos imóveis por tipo (analise.tipos_imovel)."""
+    return px.pie(tabela, values='Qtd', names='Tipo', hole=0.5,
+                  color_discrete_sequence=px.colors.sequential.RdBu)
+
+
+@figura
+def colunas_area_status(tabela):
+    """Colunas da área média por status (analise.area_por_status)."""
+    fig = px.bar(tabela, x='Estado', y='Area', text_auto=True,
+                 color='Estado', color_discrete_map=CORES_STATUS)
+    fig.update_layout(yaxis_title="Área Média (m²)")
+    return fig.update_traces(texttemplate='%{y:.0f} m²')
+
+
+@figura
+def colunas_contagem_status(tabela):
+    """Colunas da contagem de imóveis por status (analise.ocupacao)."""
+    fig = px.bar(tabela, x='Estado', y='Qtd', color='Estado',
+                 color_discrete_map=CORES_STATUS, text_auto=True)
+    return fig.update_layout(yaxis_title="Quantidade")
+
+
+@figura
+def barras_bairros_frequentes(tabela):
+    """Barras empilhadas dos imóveis por bairro e status (analise.bairros_mais_frequentes)."""
+    fig = px.bar(tabela, y='Bairro', x='Qtd', color='Estado',
+                 orientation='h', barmode='stack',
+                 color_discrete_map=CORES_STATUS, text_auto=True)
+    return fig.update_layout(yaxis={'categoryorder':'total ascending'}, xaxis_title="Quantidade")
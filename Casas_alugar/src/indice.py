@@ -0,0 +1,170 @@
+import os
+import numpy as np
+import pandas as pd
+import config as cfg
+
+# ==============================================================================
+# ÍNDICE DE BITMAPS DAS COLUNAS CATEGÓRICAS (FILTROS DA BARRA LATERAL)
+# ==============================================================================
+# Para cada coluna de cfg.COLUNAS_INDEXADAS guarda a lista ordenada de valores
+# (as opções dos filtros) e, para cada valor, um bitmap das linhas que o contêm
+# (np.packbits: 1 bit por linha). Filtrar vira OR/AND de bitmaps, sem comparar
+# textos. Montado no ETL e gravado na pasta da versão da base (cfg.NOME_INDICE),
+# junto com a assinatura (mtime, tamanho) do arquivo que indexa.
+
+# Bits ligados em cada byte (popcount sem depender da versão do numpy)
+_BITS_POR_BYTE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+class IndiceColuna:
+    """Valores ordenados de uma coluna e o bitmap de cada um (matriz valores × bytes)."""
+
+    def __init__(self, valores, bitmaps):
+        self.valores = list(valores)
+        self.bitmaps = bitmaps
+        self._posicao = {valor: i for i, valor in enumerate(self.valores)}
+
+    def bitmap(self, valores):
+        """OR dos bitmaps dos valores pedidos (valores ausentes do índice são ignorados)."""
+        posicoes = [self._posicao[v] for v in valores if v in self._posicao]
+        if not posicoes:
+            return np.zeros(self.bitmaps.shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitmaps[posicoes], axis=0)
+
+    def presentes(self, bits):
+        """Valores (em ordem) com pelo menos uma linha em 'bits'."""
+        tem_linha = (self.bitmaps & bits).any(axis=1)
+        return [valor for valor, tem in zip(self.valores, tem_linha) if tem]
+
+
+class Indice:
+    """Índices das colunas de um DataFrame com 'linhas' linhas."""
+
+    def __init__(self, linhas, colunas, assinatura=None):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.assinatura = assinatura
+
+    def __contains__(self, coluna):
+        return coluna in self.colunas
+
+    def __getitem__(self, coluna):
+        return self.colunas[coluna]
+
+
+# --- OPERAÇÕES COM BITMAPS ---
+
+def contar(bits):
+    return int(_BITS_POR_BYTE[bits].sum())
+
+
+def posicoes(bits, linhas):
+    """Posições (ordenadas) das linhas ligadas no bitmap."""
+    return np.flatnonzero(np.unpackbits(bits, count=linhas))
+
+
+# --- CONSTRUÇÃO E PERSISTÊNCIA ---
+
+def _codigos(serie):
+    """(códigos por linha, valores distintos); -1 para nulos."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    return pd.factorize(serie)
+
+
+def _bitmaps(codigos, quantidade):
+    """Matriz quantidade × bytes: linha c tem os bits das linhas com código c."""
+    n_bytes = (len(codigos) + 7) // 8
+    bitmaps = np.zeros(quantidade * n_bytes, dtype=np.uint8)
+    linhas = np.flatnonzero(codigos >= 0)
+    # Cada linha liga um bit distinto do seu byte, então somar equivale a OR
+    np.add.at(bitmaps, codigos[linhas] * n_bytes + (linhas >> 3),
+              (np.uint8(128) >> (linhas & 7).astype(np.uint8)))
+    return bitmaps.reshape(quantidade, n_bytes)
+
+
+def construir_indice(df, colunas=None):
+    """Monta os bitmaps das colunas indexadas presentes no DataFrame."""
+    colunas = colunas or cfg.COLUNAS_INDEXADAS
+    indices = {}
+    for coluna in colunas:
+        if coluna not in df.columns:
+            continue
+        codigos, unicos = _codigos(df[coluna])
+
+        # Só valores presentes, em ordem alfabética (as opções do filtro)
+        presentes = np.flatnonzero(np.bincount(codigos[codigos >= 0], minlength=len(unicos)))
+        valores = [str(unicos[c]) for c in presentes]
+        ordem = presentes[np.argsort(np.array(valores, dtype=str), kind='stable')]
+
+        novo_codigo = np.full(len(unicos) + 1, -1, dtype=np.int64)
+        novo_codigo[ordem] = np.arange(len(ordem))
+        codigos = novo_codigo[codigos]  # -1 (nulo) cai na última posição, que é -1
+
+        indices[coluna] = IndiceColuna([str(unicos[c]) for c in ordem], _bitmaps(codigos, len(ordem)))
+    return Indice(len(df), indices)
+
+
+def atualizar_indice(anterior, df, posicoes):
+    """
+    Índice de 'df' a partir do 'anterior', que indexava as primeiras
+    anterior.linhas linhas de df antes de as linhas 'posicoes' mudarem (as
+    novas, do fim, entram sozinhas). Só os bits dessas linhas são refeitos;
+    valores que ficam sem linhas saem das opções.
+    """
+    linhas = len(df)
+    n_bytes = (linhas + 7) // 8
+    posicoes = np.union1d(np.asarray(posicoes, dtype=np.int64), np.arange(anterior.linhas, linhas))
+    bytes_linha = posicoes >> 3
+    bit_linha = np.uint8(128) >> (posicoes & 7).astype(np.uint8)
+    tocados = np.zeros(n_bytes, dtype=np.uint8)
+    np.bitwise_or.at(tocados, bytes_linha, bit_linha)
+
+    indices = {}
+    for coluna, antigo in anterior.colunas.items():
+        if coluna not in df.columns:
+            continue
+        novos = df[coluna].iloc[posicoes]
+        valores = sorted(set(antigo.valores) | {str(v) for v in novos.dropna().unique()})
+        posicao = {valor: i for i, valor in enumerate(valores)}
+
+        bitmaps = np.zeros((len(valores), n_bytes), dtype=np.uint8)
+        bitmaps[[posicao[v] for v in antigo.valores], :antigo.bitmaps.shape[1]] = antigo.bitmaps
+        bitmaps &= ~tocados
+        codigos = np.array([posicao[str(v)] if pd.notna(v) else -1 for v in novos], dtype=np.int64)
+        marcadas = codigos >= 0
+        np.bitwise_or.at(bitmaps, (codigos[marcadas], bytes_linha[marcadas]), bit_linha[marcadas])
+
+        presentes = bitmaps.any(axis=1)
+        indices[coluna] = IndiceColuna([v for v, tem in zip(valores, presentes) if tem], bitmaps[presentes])
+    return Indice(linhas, indices)
+
+
+def salvar_indice(indice, caminho, assinatura):
+    """Grava o índice (npz compactado) com a assinatura do arquivo indexado."""
+    indice.assinatura = tuple(assinatura)
+    dados = {
+        'linhas': np.array([indice.linhas]),
+        'assinatura': np.array(assinatura, dtype=np.int64),
+        'colunas': np.array(list(indice.colunas), dtype=str),
+    }
+    for i, indice_coluna in enumerate(indice.colunas.values()):
+        dados[f'valores_{i}'] = np.array(indice_coluna.valores, dtype=str)
+        dados[f'bitmaps_{i}'] = indice_coluna.bitmaps
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_tmp = caminho + '.tmp.npz'
+    np.savez_compressed(caminho_tmp, **dados)
+    os.replace(caminho_tmp, caminho)
+
+
+def ler_indice(caminho):
+    """Lê o índice gravado por salvar_indice (None se não existir)."""
+    if not os.path.exists(caminho):
+        return None
+    with np.load(caminho) as dados:
+        colunas = {
+            str(coluna): IndiceColuna(dados[f'valores_{i}'].tolist(), dados[f'bitmaps_{i}'])
+            for i, coluna in enumerate(dados['colunas'])
+        }
+        return Indice(int(dados['linhas'][0]), colunas, tuple(int(v) for v in dados['assinatura']))
@@ -0,0 +1,290 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+import config as cfg
+
+# ==============================================================================
+# INSTRUMENTAÇÃO: TEMPO, LINHAS E MEMÓRIA POR ETAPA (ETL E DASHBOARD)
+# ==============================================================================
+# Duas formas de marcar um trecho:
+#   with medir('etl.processar_dados'):   trecho delimitado (ou @medido(...) na função)
+#   etapa('grafico.mix', linhas=n)       etapa sequencial: vai até a próxima etapa
+#                                        do mesmo trecho ou até o fim dele
+# etapa() é a usada pelos avisos de progresso do ETL (_avisar) e pelos blocos
+# do app.py: marca sem reindentar o código. Trechos abertos durante uma etapa
+# ficam abaixo dela (ex.: etl.carregar_dados dentro de 'dashboard.carga').
+#
+# Cada trecho guarda duração, linhas (quando informadas) e a variação de RSS.
+# Quando o trecho raiz fecha (finalizar() no Dashboard ou o medir mais externo
+# da thread), a árvore vai para cfg.ARQUIVO_LOG_DESEMPENHO, uma linha JSON por
+# trecho, e o Dashboard a mostra no painel "Desempenho" da barra lateral.
+# Com perfil (cfg.PERFIL_CPROFILE ou pedido em iniciar), a raiz roda sob
+# cProfile: .prof em cfg.PASTA_LOGS e as funções mais caras no painel.
+#
+# Com cfg.INSTRUMENTACAO = False nada é medido: medir() devolve um contexto
+# vazio e etapa() retorna na primeira linha.
+
+LINHAS_PERFIL = 25
+
+_LOCAL = threading.local()
+_LOCK_LOG = threading.Lock()
+_PAGINA_KB = os.sysconf('SC_PAGE_SIZE') // 1024 if hasattr(os, 'sysconf') else 4
+
+
+def _rss_kb():
+    """RSS atual do processo (kB); None fora do Linux."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGINA_KB
+    except OSError:
+        return None
+
+
+def _pilha():
+    if not hasattr(_LOCAL, 'pilha'):
+        _LOCAL.pilha = []
+    return _LOCAL.pilha
+
+
+class Trecho:
+    """Um trecho medido: duração (s), linhas, variação de RSS (kB) e os trechos internos."""
+
+    def __init__(self, nome, linhas=None, sequencial=False):
+        self.nome = nome
+        self.linhas = linhas
+        self.sequencial = sequencial
+        self.filhos = []
+        self.duracao = None
+        self.rss_delta_kb = None
+        # Só na raiz com cProfile: funções mais caras (texto) e o .prof gravado
+        self.perfil = None
+        self.arquivo_perfil = None
+        self._profiler = None
+        self.iniciado_em = datetime.now()
+        self._rss = _rss_kb()
+        self._inicio = time.perf_counter()
+
+    def _fechar(self):
+        self.duracao = time.perf_counter() - self._inicio
+        rss = _rss_kb()
+        if rss is not None and self._rss is not None:
+            self.rss_delta_kb = rss - self._rss
+
+
+# --- ABERTURA E FECHAMENTO ---
+
+def _iniciar_perfil():
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Outro profiler já ativo (ex.: a própria execução sob cProfile)
+        print(f"cProfile indisponível: {e}")
+        return None
+    return profiler
+
+
+def _abrir(nome, linhas=None, sequencial=False, perfil=False):
+    pilha = _pilha()
+    trecho = Trecho(nome, linhas, sequencial)
+    if pilha:
+        pilha[-1].filhos.append(trecho)
+    elif perfil or cfg.PERFIL_CPROFILE:
+        trecho._profiler = _iniciar_perfil()
+    pilha.append(trecho)
+    return trecho
+
+
+def _fechar_ate(trecho):
+    """Fecha as etapas ainda abertas dentro de 'trecho' e o próprio trecho."""
+    pilha = _pilha()
+    if trecho not in pilha:
+        return
+    while True:
+        topo = pilha.pop()
+        topo._fechar()
+        if topo is trecho:
+            break
+    if not pilha:
+        _concluir(trecho)
+
+
+def _concluir(raiz):
+    """Raiz fechada: encerra o cProfile e grava a árvore no log."""
+    if raiz._profiler is not None:
+        raiz._profiler.disable()
+        _salvar_perfil(raiz)
+    try:
+        _gravar_log(raiz)
+    except OSError as e:
+        print(f"Erro ao gravar log de desempenho: {e}")
+
+
+def _salvar_perfil(raiz):
+    texto = io.StringIO()
+    pstats.Stats(raiz._profiler, stream=texto).sort_stats('cumulative').print_stats(LINHAS_PERFIL)
+    raiz.perfil = texto.getvalue()
+    try:
+        os.makedirs(cfg.PASTA_LOGS, exist_ok=True)
+        raiz.arquivo_perfil = os.path.join(
+            cfg.PASTA_LOGS, f"perfil_{raiz.nome}_{raiz.iniciado_em:%Y%m%d_%H%M%S_%f}.prof")
+        raiz._profiler.dump_stats(raiz.arquivo_perfil)
+    except OSError as e:
+        print(f"Erro ao gravar perfil: {e}")
+    raiz._profiler = None
+
+
+# --- LOG ESTRUTURADO (uma linha JSON por trecho) ---
+
+def _registros(trecho, execucao, pai=None, nivel=0):
+    yield {
+        'execucao': execucao,
+        'processo': os.getpid(),
+        'trecho': trecho.nome,
+        'pai': pai,
+        'nivel': nivel,
+        'iniciado_em': trecho.iniciado_em.isoformat(timespec='milliseconds'),
+        'duracao_ms': round(trecho.duracao * 1000, 3),
+        'linhas': trecho.linhas,
+        'linhas_por_s': round(trecho.linhas / trecho.duracao) if trecho.linhas and trecho.duracao else None,
+        'rss_delta_mb': round(trecho.rss_delta_kb / 1024, 1) if trecho.rss_delta_kb is not None else None,
+        'perfil': trecho.arquivo_perfil,
+    }
+    for filho in trecho.filhos:
+        yield from _registros(filho, execucao, trecho.nome, nivel + 1)
+
+
+def _gravar_log(raiz):
+    execucao = f"{raiz.nome}_{raiz.iniciado_em:%Y%m%d_%H%M%S_%f}_{os.getpid()}"
+    linhas = ''.join(json.dumps(registro, ensure_ascii=False) + '\n' for registro in _registros(raiz, execucao))
+    os.makedirs(os.path.dirname(cfg.ARQUIVO_LOG_DESEMPENHO), exist_ok=True)
+    # Um write só em modo append: processos do ETL e do Dashboard não intercalam linhas
+    with _LOCK_LOG, open(cfg.ARQUIVO_LOG_DESEMPENHO, 'a', encoding='utf-8') as f:
+        f.write(linhas)
+
+
+# --- API ---
+
+class _Medicao:
+    def __init__(self, nome, linhas, perfil):
+        self.nome, self.linhas, self.perfil = nome, linhas, perfil
+        self.trecho = None
+
+    def __enter__(self):
+        self.trecho = _abrir(self.nome, self.linhas, perfil=self.perfil)
+        return self.trecho
+
+    def __exit__(self, *erro):
+        _fechar_ate(self.trecho)
+        return False
+
+
+class _Desligada:
+    """Contexto de medir() com a instrumentação desligada (aceita .linhas = n e ignora)."""
+    linhas = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_DESLIGADA = _Desligada()
+
+
+def medir(nome, linhas=None, perfil=False):
+    """
+    Contexto que mede o trecho 'nome'; o objeto do 'as' aceita .linhas = n.
+    perfil=True roda o trecho sob cProfile se ele for a raiz.
+    """
+    if not cfg.INSTRUMENTACAO:
+        return _DESLIGADA
+    return _Medicao(nome, linhas, perfil)
+
+
+def medido(nome):
+    """Decorador: cada chamada da função é um trecho 'nome'."""
+    def decorar(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            if not cfg.INSTRUMENTACAO:
+                return funcao(*args, **kwargs)
+            with _Medicao(nome, None, False):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorar
+
+
+def etapa(nome, linhas=None):
+    """Fecha a etapa anterior do trecho atual (se houver) e abre a etapa 'nome'."""
+    if not cfg.INSTRUMENTACAO:
+        return
+    pilha = _pilha()
+    if pilha and pilha[-1].sequencial:
+        _fechar_ate(pilha[-1])
+    _abrir(nome, linhas, sequencial=True)
+
+
+def iniciar(nome, perfil=False):
+    """
+    Abre a raiz de uma execução (no Dashboard, uma por rerun). O que ficou
+    aberto numa execução interrompida da mesma thread (st.stop) é descartado.
+    """
+    if not cfg.INSTRUMENTACAO:
+        return None
+    pilha = _pilha()
+    if pilha and pilha[0]._profiler is not None:
+        pilha[0]._profiler.disable()
+    pilha.clear()
+    return _abrir(nome, perfil=perfil)
+
+
+def finalizar():
+    """Fecha a execução aberta por iniciar() e devolve a raiz (None se desligada ou não iniciada)."""
+    pilha = _pilha()
+    if not cfg.INSTRUMENTACAO or not pilha:
+        return None
+    raiz = pilha[0]
+    _fechar_ate(raiz)
+    return raiz
+
+
+def tabela(raiz):
+    """
+    Linhas do painel: a raiz e, em cada nível, um registro por nome (etapas
+    repetidas, como os chunks do streaming, somadas; linhas = maior contagem informada).
+    """
+    saida = []
+
+    def visitar(grupo, nivel):
+        duracao = sum(t.duracao for t in grupo)
+        contagens = [t.linhas for t in grupo if t.linhas is not None]
+        deltas = [t.rss_delta_kb for t in grupo if t.rss_delta_kb is not None]
+        linhas = max(contagens) if contagens else None
+        saida.append({
+            'trecho': '· ' * nivel + grupo[0].nome,
+            'ms': round(duracao * 1000, 1),
+            'vezes': len(grupo),
+            'linhas': linhas,
+            'linhas/s': round(linhas / duracao) if linhas and duracao else None,
+            'Δ RSS (MB)': round(sum(deltas) / 1024, 1) if deltas else None,
+        })
+        filhos = {}
+        for trecho in grupo:
+            for filho in trecho.filhos:
+                filhos.setdefault(filho.nome, []).append(filho)
+        for irmaos in filhos.values():
+            visitar(irmaos, nivel + 1)
+
+    visitar([raiz], 0)
+    return saida
@@ -0,0 +1,109 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import config as cfg
+
+# ==============================================================================
+# CORTES DOS QUARTIS DE ALUGUEL (Categoria_Preco), PERSISTIDOS POR VERSÃO
+# ==============================================================================
+# Os cortes ficam em cfg.NOME_QUARTIS, na pasta de cada versão da base
+# (snapshots.py), e passam de uma versão para a seguinte. Cada carga classifica
+# os imóveis contra os cortes herdados: um imóvel que não mudou de aluguel não
+# muda de segmento porque outros entraram. Os cortes só são recalculados:
+#   - na primeira carga (sem cortes herdados, ou herdados sem 4 faixas);
+#   - no rebalanceamento explícito (etl.rebalancear_quartis);
+#   - quando a deriva passa de cfg.DERIVA_MAXIMA_QUARTIS: a fatia do inventário
+#     em algum quartil se afastou demais da fatia de quando os cortes foram
+#     definidos (guardada junto deles).
+# O arquivo registra em que versão, por que motivo e com quantos imóveis os
+# cortes foram definidos.
+#
+# Os cortes são os quantis exatos (os mesmos do pd.qcut): np.quantile dá conta
+# de inventários de dezenas de milhões de imóveis.
+
+QUANTIS = [0, 0.25, 0.5, 0.75, 1]
+
+
+# --- CÁLCULO E CLASSIFICAÇÃO ---
+
+def validos(limites):
+    """True se os limites separam as 4 faixas (sem cortes repetidos)."""
+    return limites is not None and len(np.unique(limites)) == len(limites)
+
+
+def classificar(valores, limites):
+    """
+    Categoria_Preco dos aluguéis pelos limites (mínimo, Q1, Q2, Q3, máximo);
+    fora do mínimo/máximo vai para o primeiro/último quartil. 'Geral' se os
+    limites não separam 4 faixas.
+    """
+    if not validos(limites):
+        return 'Geral'
+    return pd.cut(valores, [-np.inf, *limites[1:-1], np.inf], labels=cfg.LABELS_QUARTIL)
+
+
+def fatias(categorias):
+    """Fração dos imóveis em cada quartil ({rótulo: fração})."""
+    contagens = pd.Series(categorias).value_counts(normalize=True)
+    return {rotulo: float(contagens.get(rotulo, 0.0)) for rotulo in cfg.LABELS_QUARTIL}
+
+
+def deriva(categorias, referencia):
+    """Maior diferença (fração do inventário) entre a fatia de um quartil e a de 'referencia'."""
+    atuais = fatias(categorias)
+    return max(abs(atuais[rotulo] - referencia.get(rotulo, 0.0)) for rotulo in cfg.LABELS_QUARTIL)
+
+
+def calcular(valores, motivo='inicial', deriva_medida=None):
+    """Cortes novos (quantis exatos) dos aluguéis 'valores'."""
+    valores = np.asarray(valores, dtype='float64')
+    valores = valores[~np.isnan(valores)]
+    limites = [float(v) for v in np.quantile(valores, QUANTIS)] if len(valores) else None
+
+    return {
+        'limites': limites,
+        'fatias': fatias(classificar(valores, limites)) if validos(limites) else {},
+        'linhas': int(len(valores)),
+        'motivo': motivo,
+        'deriva': deriva_medida,
+        'definidos_em': None,
+    }
+
+
+def definir(valores, anterior=None, rebalancear=False, categorias=None):
+    """
+    Cortes para classificar os aluguéis 'valores': os 'anterior' (herdados da
+    versão atual), se forem válidos e a deriva não passar de
+    cfg.DERIVA_MAXIMA_QUARTIS; senão, recalculados. rebalancear=True sempre
+    recalcula. Cortes mantidos voltam como o próprio 'anterior'.
+    'categorias': classificação de 'valores' pelos cortes 'anterior', se já conhecida.
+    """
+    deriva_medida = None
+    if anterior is not None and validos(anterior['limites']):
+        if categorias is None:
+            categorias = classificar(valores, anterior['limites'])
+        deriva_medida = deriva(categorias, anterior['fatias'])
+        if not rebalancear and deriva_medida <= cfg.DERIVA_MAXIMA_QUARTIS:
+            return anterior
+    motivo = 'rebalanceamento' if rebalancear else ('deriva' if deriva_medida is not None else 'inicial')
+    return calcular(valores, motivo, deriva_medida)
+
+
+# --- PERSISTÊNCIA (PASTA DA VERSÃO) ---
+
+def ler(pasta):
+    """Cortes gravados na pasta de uma versão; None se a pasta não os tiver."""
+    caminho = os.path.join(pasta, cfg.NOME_QUARTIS) if pasta else None
+    if caminho is None or not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def gravar(definicao, pasta):
+    """Grava os cortes na pasta de uma versão em montagem."""
+    caminho = os.path.join(pasta, cfg.NOME_QUARTIS)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(definicao, f, ensure_ascii=False)
+    os.replace(caminho + '.tmp', caminho)
@@ -0,0 +1,46 @@
+import io
+import pytest
+import config as cfg
+import etl
+import analise
+import benchmark
+
+# ==============================================================================
+# BASE ISOLADA PARA OS TESTES
+# ==============================================================================
+# Cada teste grava versões, cache, flags e o registro de alterações numa pasta
+# temporária (os dados do cliente não são tocados) e começa com os caches do
+# processo vazios.
+
+
+@pytest.fixture
+def base_isolada(tmp_path, monkeypatch):
+    monkeypatch.setattr(cfg, 'PASTA_VERSOES', str(tmp_path / 'imoveis_versoes'))
+    monkeypatch.setattr(cfg, 'ARQUIVOS_LEGADOS', [])
+    monkeypatch.setattr(cfg, 'DIRS', {'FLAGS': str(tmp_path / 'flags')})
+    monkeypatch.setattr(cfg, 'PASTA_CACHE_DADOS', str(tmp_path / 'cache'))
+    monkeypatch.setattr(cfg, 'ARQUIVO_LOG_ALTERACOES', str(tmp_path / 'imoveis_alteracoes.jsonl'))
+    monkeypatch.setattr(cfg, 'MODO_INGESTAO', 'completo')
+    etl.invalidar_cache()
+    analise._SELECOES.invalidar()
+    yield tmp_path
+    etl.invalidar_cache()
+    analise._SELECOES.invalidar()
+
+
+@pytest.fixture
+def imoveis():
+    """Inventário sintético (benchmark.gerar_imoveis)."""
+    return benchmark.gerar_imoveis(3_000, seed=7)
+
+
+@pytest.fixture
+def enviar(base_isolada):
+    """enviar(df, modo) processa o DataFrame como um upload CSV; falha o teste se o ETL recusar."""
+    def enviar(df, modo='completo'):
+        arquivo = io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+        arquivo.name = 'imoveis.csv'
+        sucesso, msg = etl.processar_dados(arquivo, modo=modo)
+        assert sucesso, msg
+        return msg
+    return enviar
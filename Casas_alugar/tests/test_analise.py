@@ -0,0 +1,110 @@
+import math
+import pandas as pd
+import pytest
+import config as cfg
+import analise
+import etl
+
+# Os KPIs e tabelas das abas saem de um resumo em uma passada (analise.resumir);
+# têm de bater com as contas diretas do pandas sobre as linhas filtradas.
+
+SELECOES = [
+    [],
+    [('Estado', '==', 'Locado')],
+    [('Tipo Imóvel', 'in', ['Casa']), ('Valor do Aluguel', '>=', 2500.0)],
+    [('Bairro', 'in', [f'Bairro {i:03d}' for i in range(0, 300, 11)]), ('Quartos', '>=', 2)],
+    [('Estado', '==', 'Nenhum')],
+]
+
+OPERACOES = {
+    'in': lambda serie, valor: serie.astype(object).isin(valor),
+    '==': lambda serie, valor: serie.astype(object) == valor,
+    '>=': lambda serie, valor: serie >= valor,
+}
+
+
+@pytest.fixture
+def versao(enviar, imoveis):
+    enviar(imoveis)
+    return etl.versao_atual()
+
+
+def _linhas(versao, termos):
+    df = etl.carregar_dados(cfg.COLUNAS_DASHBOARD, versao=versao)
+    mask = pd.Series(True, index=df.index)
+    for coluna, operador, valor in termos:
+        mask &= OPERACOES[operador](df[coluna], valor)
+    return df[mask].astype({'Estado': object, 'Tipo Imóvel': object})
+
+
+def _igual(obtido, esperado):
+    if isinstance(esperado, float) and math.isnan(esperado):
+        return math.isnan(obtido)
+    return obtido == pytest.approx(esperado)
+
+
+@pytest.mark.parametrize('termos', SELECOES)
+def test_kpis_financeiros(versao, termos):
+    df = _linhas(versao, termos)
+    kpis = analise.kpis_financeiros(versao, analise.normalizar_termos(termos))
+    esperado = {
+        'aluguel_medio': df['Valor do Aluguel'].mean(),
+        'custo_medio': df['Custo_Mensal'].mean(),
+        'preco_m2': df['Preco_m2'].mean(),
+        'participacao_disponivel': df.loc[df['Estado'] == 'Disponível', 'Valor do Aluguel'].sum() * analise.TAXA_PARTICIPACAO,
+        'participacao_locados': df.loc[df['Estado'] == 'Locado', 'Valor do Aluguel'].sum() * analise.TAXA_PARTICIPACAO,
+    }
+    assert kpis.keys() == esperado.keys()
+    for chave, valor in esperado.items():
+        assert _igual(kpis[chave], float(valor)), chave
+
+
+@pytest.mark.parametrize('termos', SELECOES)
+def test_kpis_imoveis(versao, termos):
+    df = _linhas(versao, termos)
+    kpis = analise.kpis_imoveis(versao, analise.normalizar_termos(termos))
+
+    def contar(tipo, estado):
+        return int(((df['Tipo Imóvel'] == tipo) & (df['Estado'] == estado)).sum())
+
+    assert kpis == {
+        'casas_locadas': contar('Casa', 'Locado'),
+        'aptos_locados': contar('Apartamento', 'Locado'),
+        'casas_disponiveis': contar('Casa', 'Disponível'),
+        'aptos_disponiveis': contar('Apartamento', 'Disponível'),
+    }
+
+
+@pytest.mark.parametrize('termos', SELECOES)
+def test_tabelas_dos_graficos(versao, termos):
+    df = _linhas(versao, termos)
+    termos = analise.normalizar_termos(termos)
+
+    ocupacao = analise.ocupacao(versao, termos)
+    assert dict(zip(ocupacao['Estado'].astype(str), ocupacao['Qtd'])) == df['Estado'].value_counts().to_dict()
+    assert list(ocupacao['Qtd']) == sorted(ocupacao['Qtd'], reverse=True)
+
+    tipos = analise.tipos_imovel(versao, termos)
+    assert dict(zip(tipos['Tipo'].astype(str), tipos['Qtd'])) == df['Tipo Imóvel'].value_counts().to_dict()
+
+    volume = analise.volume_por_status(versao, termos)
+    esperado = df.groupby('Estado')['Valor do Aluguel'].sum()
+    assert dict(zip(volume['Estado'].astype(str), volume['Valor do Aluguel'])) == pytest.approx(esperado.to_dict())
+
+    area = analise.area_por_status(versao, termos)
+    esperado = df.groupby('Estado')['Area'].mean()
+    assert dict(zip(area['Estado'].astype(str), area['Area'])) == pytest.approx(esperado.to_dict())
+
+
+def test_resultados_por_versao(enviar, imoveis):
+    enviar(imoveis.iloc[:1_000])
+    primeira = etl.versao_atual()
+    enviar(imoveis)
+    segunda = etl.versao_atual()
+
+    # Mesmo filtro, versões diferentes: cada uma com os seus números
+    assert sum(analise.kpis_imoveis(primeira, ()).values()) == \
+        int(imoveis.iloc[:1_000]['Estado'].isin(['Locado', 'Disponível']).sum())
+    assert sum(analise.kpis_imoveis(segunda, ()).values()) == \
+        int(imoveis['Estado'].isin(['Locado', 'Disponível']).sum())
+    assert analise.kpis_financeiros(primeira, ()) is analise.kpis_financeiros(primeira, ())
@@ -0,0 +1,140 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import config as cfg
+import armazenamento
+import etl
+import indice
+import quartis
+import snapshots
+
+# A atualização por ID (upsert) tem de chegar à mesma base e ao mesmo índice
+# que uma carga completa do inventário mesclado, inclusive com IDs repetidos.
+
+
+def _tabela(versao=None):
+    """Base da versão (padrão: a atual), com as categóricas como texto para comparar."""
+    df = armazenamento.ler_tabela(etl.caminho_base(versao or etl.versao_atual()))
+    return df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+
+def _indice(versao=None):
+    pasta = snapshots.pasta_versao(versao or etl.versao_atual())
+    return indice.ler_indice(os.path.join(pasta, cfg.NOME_INDICE))
+
+
+def _assert_indices_iguais(obtido, esperado):
+    assert obtido.linhas == esperado.linhas
+    assert list(obtido.colunas) == list(esperado.colunas)
+    for coluna in esperado.colunas:
+        assert obtido[coluna].valores == esperado[coluna].valores
+        np.testing.assert_array_equal(obtido[coluna].bitmaps, esperado[coluna].bitmaps)
+
+
+def _registros():
+    with open(cfg.ARQUIVO_LOG_ALTERACOES, encoding='utf-8') as f:
+        return [json.loads(linha) for linha in f]
+
+
+@pytest.fixture
+def atualizacao(imoveis):
+    """(inventário inicial, arquivo de atualização, inventário mesclado, IDs com aluguel e com estado alterados)."""
+    inicial, novos = imoveis.iloc[:2_500].copy(), imoveis.iloc[2_500:].copy()
+    rng = np.random.default_rng(11)
+    ids = rng.choice(inicial['ID'].to_numpy(), 80, replace=False)
+    ids_aluguel, ids_estado = ids[:50], ids[50:]
+
+    mesclado = inicial.set_index('ID')
+    mesclado.loc[ids_aluguel, 'Valor do Aluguel'] += 100
+    mesclado.loc[ids_estado, 'Estado'] = np.where(mesclado.loc[ids_estado, 'Estado'] == 'Locado', 'Disponível', 'Locado')
+    mesclado = mesclado.reset_index()
+
+    # Alterados, sem mudança e novos, fora de ordem
+    sem_mudanca = mesclado[~mesclado['ID'].isin(ids)].sample(40, random_state=1)
+    arquivo = pd.concat([mesclado[mesclado['ID'].isin(ids)], sem_mudanca, novos]).sample(frac=1, random_state=2)
+    # Os novos entram no fim, na ordem do arquivo
+    novos = arquivo[arquivo['ID'].isin(novos['ID'])]
+    return inicial, arquivo, pd.concat([mesclado, novos], ignore_index=True), ids_aluguel, ids_estado
+
+
+def test_upsert_igual_a_carga_completa(enviar, atualizacao):
+    inicial, arquivo, mesclado, ids_aluguel, ids_estado = atualizacao
+    enviar(inicial)
+    msg = enviar(arquivo, modo='atualizacao')
+    assert f"{len(ids_aluguel) + len(ids_estado)} imóveis alterados e 500 novos (40 sem mudança)" in msg
+    versao_upsert = etl.versao_atual()
+
+    # A carga completa herda os mesmos cortes dos quartis
+    enviar(mesclado)
+    versao_completa = etl.versao_atual()
+    assert quartis.ler(snapshots.pasta_versao(versao_upsert))['limites'] == \
+        quartis.ler(snapshots.pasta_versao(versao_completa))['limites']
+
+    pd.testing.assert_frame_equal(_tabela(versao_upsert), _tabela(versao_completa), check_dtype=False)
+    _assert_indices_iguais(_indice(versao_upsert), _indice(versao_completa))
+
+
+def test_upsert_registra_alteracoes(enviar, atualizacao):
+    inicial, arquivo, mesclado, ids_aluguel, ids_estado = atualizacao
+    enviar(inicial)
+    enviar(arquivo, modo='atualizacao')
+    versao = etl.versao_atual()
+
+    registros = _registros()
+    assert {r['versao'] for r in registros} == {versao}
+    alteracoes = [r for r in registros if r['operacao'] == 'alteracao']
+    assert sorted(r[cfg.CHAVE_IMOVEL] for r in alteracoes if r['campo'] == 'Valor do Aluguel') == sorted(ids_aluguel)
+    assert sorted(r[cfg.CHAVE_IMOVEL] for r in alteracoes if r['campo'] == 'Estado') == sorted(ids_estado)
+    assert {r['campo'] for r in alteracoes} == {'Valor do Aluguel', 'Estado'}
+    for r in alteracoes:
+        if r['campo'] == 'Valor do Aluguel':
+            assert r['depois'] == pytest.approx(r['antes'] + 100)
+
+    inclusoes = sorted(r[cfg.CHAVE_IMOVEL] for r in registros if r['operacao'] == 'inclusao')
+    assert inclusoes == sorted(mesclado['ID'].iloc[2_500:])
+
+
+def test_upsert_sem_mudancas_nao_publica(enviar, imoveis):
+    enviar(imoveis)
+    versao = etl.versao_atual()
+    msg = enviar(imoveis.sample(100, random_state=3), modo='atualizacao')
+    assert "Nenhuma alteração" in msg
+    assert etl.versao_atual() == versao
+
+
+def test_carga_completa_descarta_ids_repetidos(enviar, imoveis):
+    repetidos = imoveis.iloc[[10, 20, 30]].assign(**{'Valor do Aluguel': 99_999.0})
+    msg = enviar(pd.concat([imoveis, repetidos], ignore_index=True))
+    assert f"{len(imoveis)} imóveis processados" in msg
+    assert f"3 registros com {cfg.CHAVE_IMOVEL} repetido descartados" in msg
+
+    tabela = _tabela()
+    assert tabela['ID'].is_unique and len(tabela) == len(imoveis)
+    # Fica o último registro de cada imóvel
+    assert (tabela.set_index('ID').loc[repetidos['ID'], 'Valor do Aluguel'] == 99_999.0).all()
+    assert _indice().linhas == len(imoveis)
+
+
+def test_upsert_sobre_base_com_ids_repetidos(enviar, imoveis):
+    enviar(imoveis)
+    # Base publicada antes da chave única, com IDs repetidos
+    base = armazenamento.ler_tabela(etl.caminho_base())
+    duplicada = pd.concat([base, base.iloc[:3]], ignore_index=True)
+    etl._publicar(duplicada, quartis.ler(snapshots.pasta_atual()), carga='completa')
+    assert len(_tabela()) == len(imoveis) + 3
+
+    # Mesmo um arquivo sem mudanças publica a base sem os repetidos
+    msg = enviar(imoveis.iloc[100:110], modo='atualizacao')
+    assert "3 registros" in msg
+
+    alterado = imoveis.iloc[[0, 1, 500]].assign(Estado='Em Reforma')
+    msg = enviar(alterado, modo='atualizacao')
+    assert "3 imóveis alterados" in msg
+
+    tabela = _tabela()
+    assert tabela['ID'].is_unique and len(tabela) == len(imoveis)
+    assert (tabela.set_index('ID').loc[alterado['ID'], 'Estado'] == 'Em Reforma').all()
+    esperado = indice.construir_indice(etl._tipar(armazenamento.ler_tabela(etl.caminho_base())))
+    _assert_indices_iguais(_indice(), esperado)
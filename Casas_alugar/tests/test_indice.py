@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import config as cfg
+import consulta
+import etl
+import indice
+import snapshots
+
+# Os filtros da barra lateral resolvidos pelos bitmaps (indice.py) têm de dar
+# as mesmas linhas e as mesmas opções que a comparação direta no pandas.
+
+SELECOES = [
+    [],
+    [('Estado', '==', 'Locado')],
+    [('Categoria_Preco', 'in', cfg.LABELS_QUARTIL[1:3]), ('Estado', '==', 'Disponível')],
+    [('Tipo Imóvel', 'in', ['Casa']), ('Bairro', 'in', [f'Bairro {i:03d}' for i in range(0, 300, 7)])],
+    [('Bairro', 'in', ['Bairro 001', 'Inexistente']), ('Valor do Aluguel', '>=', 2000.0)],
+    [('Estado', '==', 'Locado'), ('Valor do Aluguel', '<=', 4000.0), ('Tipo Imóvel', 'in', ['Apartamento']),
+     ('Quartos', '>=', 2)],
+    [('Estado', '==', 'Nenhum')],
+]
+
+OPERACOES = {
+    'in': lambda serie, valor: serie.astype(object).isin(valor),
+    '==': lambda serie, valor: serie.astype(object) == valor,
+    '>=': lambda serie, valor: serie >= valor,
+    '<=': lambda serie, valor: serie <= valor,
+}
+
+
+@pytest.fixture
+def base(enviar, imoveis):
+    enviar(imoveis)
+    versao = etl.versao_atual()
+    return etl.carregar_dados(cfg.COLUNAS_DASHBOARD, versao=versao), etl.carregar_indice(versao=versao)
+
+
+def _filtrar_pandas(df, termos):
+    mask = pd.Series(True, index=df.index)
+    for coluna, operador, valor in termos:
+        mask &= OPERACOES[operador](df[coluna], valor)
+    return df[mask]
+
+
+@pytest.mark.parametrize('termos', SELECOES)
+def test_consulta_com_indice_igual_ao_pandas(base, termos):
+    df, bitmaps = base
+    esperado = _filtrar_pandas(df, termos)
+    for usar_indice in (bitmaps, None):
+        filtro = consulta.Consulta(df, usar_indice)
+        for termo in termos:
+            filtro.filtrar(*termo)
+
+        assert filtro.total == len(esperado)
+        resultado = filtro.resultado(cfg.COLUNAS_ABA_FINANCEIRO)
+        pd.testing.assert_frame_equal(resultado.reset_index(drop=True),
+                                      esperado[cfg.COLUNAS_ABA_FINANCEIRO].reset_index(drop=True))
+        for coluna in cfg.COLUNAS_INDEXADAS:
+            assert filtro.opcoes(coluna) == sorted(esperado[coluna].dropna().astype(str).unique())
+
+
+def test_atualizar_indice_igual_a_reconstruir(base):
+    df, bitmaps = base
+    df = df.copy()
+    rng = np.random.default_rng(3)
+    posicoes = rng.choice(len(df), 40, replace=False)
+    df['Estado'] = df['Estado'].cat.add_categories(['Em reforma'])
+    df.loc[posicoes[:20], 'Estado'] = 'Em reforma'
+    df.loc[posicoes[20:], 'Bairro'] = 'Bairro 000'
+    novas = df.iloc[:5].assign(Bairro='Bairro Novo')
+    novas['Bairro'] = novas['Bairro'].astype('category')
+    df = pd.concat([df, novas], ignore_index=True)
+
+    atualizado = indice.atualizar_indice(bitmaps, df, posicoes)
+    reconstruido = indice.construir_indice(df)
+    assert atualizado.linhas == reconstruido.linhas
+    for coluna in reconstruido.colunas:
+        assert atualizado[coluna].valores == reconstruido[coluna].valores
+        np.testing.assert_array_equal(atualizado[coluna].bitmaps, reconstruido[coluna].bitmaps)
+
+
+def test_indice_gravado_na_publicacao(enviar, imoveis):
+    enviar(imoveis)
+    pasta = snapshots.pasta_atual()
+    assert os.path.exists(os.path.join(pasta, cfg.NOME_INDICE))
+
+
+def test_leitura_nao_altera_a_versao_publicada(enviar, imoveis):
+    enviar(imoveis)
+    versao = etl.versao_atual()
+    pasta = snapshots.pasta_versao(versao)
+    os.remove(os.path.join(pasta, cfg.NOME_INDICE))
+    conteudo = sorted(os.listdir(pasta))
+
+    # Sem o índice gravado, ele é remontado em memória, não na pasta da versão
+    remontado = etl.carregar_indice(versao=versao)
+    assert sorted(os.listdir(pasta)) == conteudo
+    assert remontado.linhas == len(imoveis)
@@ -0,0 +1,18 @@
+import filecmp
+import os
+import pytest
+
+# Estes módulos são copiados de propósito entre os clientes (cada cliente roda
+# sozinho, com o seu src/). Uma correção em um tem de ir para o outro.
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src')
+SRC_PIZZARIA = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'Cliente_pizzaria', 'src')
+
+COMPARTILHADOS = ['guardiao.py', 'servico_dados.py', 'snapshots.py', 'tarefas.py', 'instrumentacao.py', 'bancada.py']
+
+
+@pytest.mark.skipif(not os.path.isdir(SRC_PIZZARIA), reason="Cliente_pizzaria fora da árvore")
+@pytest.mark.parametrize('modulo', COMPARTILHADOS)
+def test_modulo_igual_nos_clientes(modulo):
+    assert filecmp.cmp(os.path.join(SRC, modulo), os.path.join(SRC_PIZZARIA, modulo), shallow=False), \
+        f"{modulo} divergiu entre Casas_alugar e Cliente_pizzaria"
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+import config as cfg
+import armazenamento
+import etl
+import quartis
+import snapshots
+
+# Cortes dos quartis: quantis exatos (iguais ao pd.qcut), herdados entre
+# versões até a deriva passar do limite.
+
+
+def test_sem_valores():
+    cortes = quartis.calcular([np.nan, np.nan])
+    assert cortes['limites'] is None and cortes['fatias'] == {}
+    assert quartis.classificar(pd.Series([1.0]), cortes['limites']) == 'Geral'
+
+
+def test_classificar_igual_ao_qcut(imoveis):
+    aluguel = imoveis['Valor do Aluguel']
+    cortes = quartis.calcular(aluguel)
+    esperado = pd.qcut(aluguel, q=4, labels=cfg.LABELS_QUARTIL)
+    assert (quartis.classificar(aluguel, cortes['limites']).astype(str) == esperado.astype(str)).all()
+    assert cortes['fatias'] == pytest.approx({rotulo: 0.25 for rotulo in cfg.LABELS_QUARTIL}, abs=0.01)
+
+
+def test_cortes_mantidos_abaixo_da_deriva(enviar, imoveis):
+    enviar(imoveis)
+    primeiros = quartis.ler(snapshots.pasta_atual())
+    assert primeiros['motivo'] == 'inicial' and primeiros['definidos_em'] == etl.versao_atual()
+
+    # Poucos imóveis novos e caros: os demais não mudam de segmento
+    caros = imoveis.iloc[:30].assign(ID=imoveis['ID'].max() + 1 + np.arange(30), **{'Valor do Aluguel': 50_000.0})
+    antes = armazenamento.ler_tabela(etl.caminho_base()).set_index('ID')['Categoria_Preco']
+    enviar(caros, modo='atualizacao')
+    assert quartis.ler(snapshots.pasta_atual()) == primeiros
+    depois = armazenamento.ler_tabela(etl.caminho_base()).set_index('ID')['Categoria_Preco']
+    assert (depois.loc[antes.index].astype(str) == antes.astype(str)).all()
+
+
+def test_cortes_recalculados_acima_da_deriva(enviar, imoveis):
+    enviar(imoveis)
+    primeiros = quartis.ler(snapshots.pasta_atual())
+
+    # Metade do inventário novo acima do último corte: o Q4 passa muito da sua fatia
+    caros = imoveis.assign(ID=imoveis['ID'] + len(imoveis), **{'Valor do Aluguel': imoveis['Valor do Aluguel'] * 10})
+    msg = enviar(caros, modo='atualizacao')
+    assert "Quartis recalculados" in msg
+
+    novos = quartis.ler(snapshots.pasta_atual())
+    assert novos['motivo'] == 'deriva' and novos['deriva'] > cfg.DERIVA_MAXIMA_QUARTIS
+    assert novos['limites'] != primeiros['limites']
+    assert novos['fatias'] == pytest.approx({rotulo: 0.25 for rotulo in cfg.LABELS_QUARTIL}, abs=0.01)
+
+
+def test_rebalancear(enviar, imoveis):
+    enviar(imoveis)
+    caros = imoveis.iloc[:30].assign(ID=imoveis['ID'].max() + 1 + np.arange(30), **{'Valor do Aluguel': 50_000.0})
+    enviar(caros, modo='atualizacao')
+
+    sucesso, msg = etl.rebalancear_quartis()
+    assert sucesso, msg
+    cortes = quartis.ler(snapshots.pasta_atual())
+    assert cortes['motivo'] == 'rebalanceamento' and cortes['definidos_em'] == etl.versao_atual()
+
+    tabela = armazenamento.ler_tabela(etl.caminho_base())
+    esperado = pd.qcut(tabela['Valor do Aluguel'], q=4, labels=cfg.LABELS_QUARTIL)
+    assert (tabela['Categoria_Preco'].astype(str) == esperado.astype(str)).all()
@@ -0,0 +1,65 @@
+import threading
+import time
+import pandas as pd
+import pytest
+import config as cfg
+from servico_dados import ServicoDados
+
+# Bases sem empréstimos são despejadas por uma única thread varredora
+# ('servico_dados.despejo'), que termina quando não sobra base ociosa.
+
+OCIOSO = 0.2
+
+
+@pytest.fixture
+def servico(monkeypatch):
+    monkeypatch.setattr(cfg, 'TEMPO_OCIOSO_DADOS', OCIOSO)
+    return ServicoDados()
+
+
+def _varredores():
+    return [t for t in threading.enumerate() if t.name == 'servico_dados.despejo']
+
+
+def _esperar(condicao, limite=5.0):
+    fim = time.monotonic() + limite
+    while not condicao() and time.monotonic() < fim:
+        time.sleep(0.02)
+    return condicao()
+
+
+def _carregar():
+    return pd.DataFrame({'valor': range(10)})
+
+
+def test_um_varredor_para_muitos_acessos(servico):
+    antes = set(_varredores())
+    for i in range(1_000):
+        servico.obter(f'base{i % 3}', 1, _carregar, mapear=False)
+    assert len(set(_varredores()) - antes) == 1
+    assert servico.estatisticas()['bases'] == 3
+
+
+def test_base_ociosa_despejada_sem_novo_acesso(servico):
+    servico.obter('base', 1, _carregar, mapear=False)
+    assert servico.estatisticas()['bases'] == 1
+
+    assert _esperar(lambda: servico.estatisticas()['bases'] == 0)
+    assert servico.estatisticas()['despejos'] == 1
+    # Sem bases ociosas, o varredor termina
+    assert _esperar(lambda: servico._varredor is None)
+
+
+def test_base_emprestada_nao_e_despejada(servico):
+    sessao = {}
+    servico.obter('base', 1, _carregar, sessao=sessao, mapear=False)
+    servico.obter('outra', 1, _carregar, mapear=False)
+
+    assert _esperar(lambda: servico.estatisticas()['bases'] == 1)
+    time.sleep(OCIOSO * 2)
+    assert servico.estatisticas()['bases'] == 1
+    assert servico.estatisticas()['emprestimos'] == 1
+
+    for emprestimo in list(sessao.values()):
+        emprestimo.devolver()
+    assert _esperar(lambda: servico.estatisticas()['bases'] == 0)
@@ -0,0 +1,102 @@
+import os
+import pytest
+import config as cfg
+import etl
+import snapshots
+
+# Versões publicadas, rollback pelo ponteiro e retenção das
+# cfg.VERSOES_RETIDAS mais recentes (a atual nunca é apagada).
+
+
+@pytest.fixture
+def publicar(base_isolada):
+    """publicar(n) publica n versões vazias e devolve os nomes, da mais antiga à mais recente."""
+    def publicar(n):
+        versoes = []
+        for i in range(n):
+            nova = snapshots.NovaVersao()
+            with open(os.path.join(nova.raiz, 'dados.txt'), 'w') as f:
+                f.write(str(i))
+            versoes.append(nova.publicar(linhas=i))
+        return versoes
+    return publicar
+
+
+def test_publicar_troca_o_ponteiro(publicar):
+    assert snapshots.versao_atual() is None
+    versoes = publicar(2)
+    assert snapshots.versao_atual() == versoes[-1]
+    assert snapshots.listar_versoes() == versoes
+    assert snapshots.metadados(versoes[0])['linhas'] == 0
+
+
+def test_retencao_mantem_as_mais_recentes(publicar):
+    versoes = publicar(cfg.VERSOES_RETIDAS + 3)
+    assert snapshots.listar_versoes() == versoes[-cfg.VERSOES_RETIDAS:]
+
+
+def test_reverter_para_a_anterior(publicar):
+    versoes = publicar(3)
+    sucesso, _ = snapshots.reverter()
+    assert sucesso and snapshots.versao_atual() == versoes[1]
+    sucesso, _ = snapshots.reverter()
+    assert sucesso and snapshots.versao_atual() == versoes[0]
+
+    sucesso, msg = snapshots.reverter()
+    assert not sucesso and "anterior" in msg
+    assert snapshots.versao_atual() == versoes[0]
+
+
+def test_reverter_para_versao_escolhida(publicar):
+    versoes = publicar(3)
+    sucesso, _ = snapshots.reverter(versoes[0])
+    assert sucesso and snapshots.versao_atual() == versoes[0]
+
+    sucesso, msg = snapshots.reverter('19990101_000000_000000')
+    assert not sucesso and "inexistente" in msg
+    assert snapshots.versao_atual() == versoes[0]
+
+
+def test_retencao_nao_apaga_a_atual_apos_rollback(publicar, monkeypatch):
+    versoes = publicar(cfg.VERSOES_RETIDAS)
+    snapshots.reverter(versoes[0])
+
+    # A atual fica fora das mais recentes: é mantida junto delas
+    monkeypatch.setattr(cfg, 'VERSOES_RETIDAS', 2)
+    apagadas = snapshots.aplicar_retencao()
+    assert snapshots.versao_atual() == versoes[0]
+    assert snapshots.listar_versoes() == [versoes[0], *versoes[-2:]]
+    assert sorted(apagadas) == versoes[1:-2]
+
+    # Uma nova publicação volta o ponteiro para ela e a antiga deixa de ser protegida
+    novas = publicar(1)
+    assert snapshots.versao_atual() == novas[0]
+    assert snapshots.listar_versoes() == [versoes[-1], novas[0]]
+
+
+def test_descartar_nao_toca_a_atual(publicar):
+    versoes = publicar(1)
+    nova = snapshots.NovaVersao(origem=snapshots.pasta_atual())
+    # A cópia é por hard links: a carga regrava trocando o arquivo, nunca por cima
+    caminho = os.path.join(nova.raiz, 'dados.txt')
+    with open(caminho + '.tmp', 'w') as f:
+        f.write('incompleta')
+    os.replace(caminho + '.tmp', caminho)
+    nova.descartar()
+
+    assert not os.path.exists(nova.raiz)
+    assert snapshots.versao_atual() == versoes[0]
+    assert snapshots.listar_versoes() == versoes
+    with open(os.path.join(snapshots.pasta_atual(), 'dados.txt')) as f:
+        assert f.read() == '0'
+
+
+def test_rollback_volta_os_dados_do_dashboard(enviar, imoveis):
+    enviar(imoveis.iloc[:1_000])
+    enviar(imoveis)
+    assert len(etl.carregar_dados(cfg.COLUNAS_DASHBOARD)) == len(imoveis)
+
+    sucesso, _ = snapshots.reverter()
+    assert sucesso
+    assert len(etl.carregar_dados(cfg.COLUNAS_DASHBOARD)) == 1_000
+    assert etl.carregar_indice().linhas == 1_000
@@ -0,0 +1,183 @@
+from collections import namedtuple
+import pandas as pd
+import config as cfg
+import etl
+import cubo
+import esbocos
+import servico_dados
+
+# ==============================================================================
+# CAMADA DE ANÁLISE (KPIs E DADOS DOS GRÁFICOS, SEM STREAMLIT)
+# ==============================================================================
+# Cada função recebe a versão da base (snapshots.py) e o Filtro do Dashboard e
+# devolve os KPIs de uma aba ou a tabela de um gráfico. São puras: o resultado
+# só depende dos argumentos, então ficam memoizadas por (versão, filtro) no
+# processo (servico_dados.memorizar) e o mesmo estado de filtros em outra
+# sessão não recalcula nada. As tabelas devolvidas são compartilhadas:
+# somente leitura.
+#
+# Os resultados (pequenos) ficam em servico_dados.RESULTADOS. As seleções do
+# cubo e das linhas, que podem ser grandes, só ficam para as últimas
+# SELECOES_RETIDAS: as funções de um mesmo estado de filtros selecionam uma vez.
+#
+# Somas saem do cubo pré-agregado; a contagem de pedidos sai da tabela de
+# pedidos quando só o período está filtrado e das linhas originais caso
+# contrário (ver cubo.py). Com aproximado=True (cfg.CONTAGEM_PEDIDOS), no lugar
+# das linhas entram os esboços HyperLogLog (esbocos.py), se a versão os tiver.
+
+# Período (datas inclusivas; None = sem limite) e categorias/tamanhos (None = todos)
+Filtro = namedtuple('Filtro', ['inicio', 'fim', 'categorias', 'tamanhos'], defaults=(None, None, None, None))
+
+SELECOES_RETIDAS = 2
+
+_SELECOES = servico_dados.CacheResultados(limite=SELECOES_RETIDAS)
+
+
+def montar_filtro(inicio=None, fim=None, categorias=None, tamanhos=None):
+    """Filtro normalizado: listas viram tuplas ordenadas (mesma seleção, mesma chave de cache)."""
+    return Filtro(
+        inicio, fim,
+        tuple(sorted(categorias)) if categorias else None,
+        tuple(sorted(tamanhos)) if tamanhos else None,
+    )
+
+
+# --- SELEÇÕES (só as últimas ficam guardadas) ---
+
+def _so_periodo(filtro):
+    return filtro.categorias is None and filtro.tamanhos is None
+
+
+def _selecionar(nome, versao, filtro, selecionar):
+    return _SELECOES.obter((cfg.PASTA_VERSOES, nome, versao, filtro), selecionar)
+
+
+def _cubo(versao, filtro):
+    df_cubo, _ = etl.carregar_agregados(versao=versao)
+    return _selecionar('cubo', versao, filtro, lambda: cubo.aplicar_filtros(df_cubo, *filtro))
+
+
+def _pedidos(versao, filtro):
+    """Tabela de pedidos no período, se ela responder ao filtro; senão None."""
+    _, df_pedidos = etl.carregar_agregados(versao=versao)
+    if df_pedidos is None or not _so_periodo(filtro):
+        return None
+    return cubo.aplicar_filtros(df_pedidos, filtro.inicio, filtro.fim)
+
+
+def _vendas(versao, filtro):
+    df = etl.carregar_dados(cfg.COLUNAS_DASHBOARD, versao=versao)
+    return _selecionar('vendas', versao, filtro, lambda: cubo.aplicar_filtros(df, *filtro))
+
+
+def _esbocos_por_hora(versao, filtro):
+    """Esboços das células no filtro, juntados por hora: (horas, registradores)."""
+    tabela = etl.carregar_esbocos(versao=versao)
+
+    def juntar():
+        fatia = cubo.fatiar(tabela, filtro.inicio, filtro.fim)
+        selecao = None if _so_periodo(filtro) else cubo.mascara(fatia, categorias=filtro.categorias,
+                                                                  tamanhos=filtro.tamanhos)
+        return esbocos.juntar(fatia, 'hour_of_day', selecao)
+
+    return _selecionar('esbocos', versao, filtro, juntar)
+
+
+def fonte_pedidos(versao, filtro, aproximado=False):
+    """De onde sai a contagem de pedidos: 'pedidos' (exata, somável), 'esbocos' (aproximada) ou 'linhas'."""
+    if _pedidos(versao, filtro) is not None:
+        return 'pedidos'
+    if aproximado and etl.carregar_esbocos(versao=versao) is not None:
+        return 'esbocos'
+    return 'linhas'
+
+
+def _contar_pedidos(versao, filtro, aproximado=False):
+    """Equivalente a nunique(order_id) das linhas no filtro (estimado, se a fonte for 'esbocos')."""
+    fonte = fonte_pedidos(versao, filtro, aproximado)
+    if fonte == 'pedidos':
+        return int(_pedidos(versao, filtro)['pedidos'].sum())
+    if fonte == 'esbocos':
+        return esbocos.estimar_total(_esbocos_por_hora(versao, filtro)[1])
+    return _vendas(versao, filtro)['order_id'].nunique()
+
+
+# --- KPIs ---
+
+@servico_dados.memorizar
+def vazio(versao, filtro):
+    """True se nenhuma venda passa no filtro."""
+    return _cubo(versao, filtro).empty
+
+
+@servico_dados.memorizar
+def kpis_financeiros(versao, filtro, aproximado=False):
+    """
+    Faturamento, pedidos, dias com venda e tickets médios (por pedido e por dia).
+    'pedidos_aproximados' indica se a contagem saiu dos esboços.
+    """
+    cubo_filt = _cubo(versao, filtro)
+    faturamento = cubo_filt['total_item_value'].sum()
+    pedidos = _contar_pedidos(versao, filtro, aproximado)
+    dias = cubo_filt['order_date'].nunique()
+    return {
+        'faturamento': faturamento,
+        'pedidos': pedidos,
+        'dias': dias,
+        'ticket_medio_pedido': faturamento / pedidos if pedidos > 0 else 0,
+        'ticket_medio_dia': faturamento / dias if dias > 0 else 0,
+        'pedidos_aproximados': fonte_pedidos(versao, filtro, aproximado) == 'esbocos',
+    }
+
+
+@servico_dados.memorizar
+def kpis_operacionais(versao, filtro, aproximado=False):
+    """Pedidos realizados e pizzas vendidas."""
+    financeiros = kpis_financeiros(versao, filtro, aproximado)
+    return {
+        'pedidos': financeiros['pedidos'],
+        'pedidos_aproximados': financeiros['pedidos_aproximados'],
+        'pizzas': _cubo(versao, filtro)['quantity'].sum(),
+    }
+
+
+# --- DADOS DOS GRÁFICOS ---
+
+@servico_dados.memorizar
+def evolucao_faturamento(versao, filtro):
+    """Faturamento por dia (order_date, total_item_value)."""
+    return _cubo(versao, filtro).groupby('order_date')['total_item_value'].sum().reset_index()
+
+
+@servico_dados.memorizar
+def receita_por_categoria(versao, filtro):
+    """Faturamento por categoria (pizza_category, total_item_value)."""
+    return _cubo(versao, filtro).groupby('pizza_category', observed=True)['total_item_value'].sum().reset_index()
+
+
+@servico_dados.memorizar
+def ranking_pizzas(versao, filtro, n=5):
+    """As n pizzas mais vendidas em quantidade, da menor para a maior (pizza_name, quantity)."""
+    volume = _cubo(versao, filtro).groupby('pizza_name', observed=True)['quantity'].sum()
+    return volume.sort_values().tail(n).reset_index()
+
+
+@servico_dados.memorizar
+def pedidos_por_hora(versao, filtro, aproximado=False):
+    """Pedidos distintos por hora (hour_of_day, order_id)."""
+    fonte = fonte_pedidos(versao, filtro, aproximado)
+    if fonte == 'pedidos':
+        por_hora = _pedidos(versao, filtro).groupby('hour_of_day')['pedidos'].sum()
+    elif fonte == 'esbocos':
+        horas, registros = _esbocos_por_hora(versao, filtro)
+        por_hora = pd.Series(esbocos.estimar(registros).round().astype('int64'), index=pd.Index(horas, name='hour_of_day'))
+    else:
+        por_hora = _vendas(versao, filtro).groupby('hour_of_day')['order_id'].nunique()
+    return por_hora.rename('order_id').reset_index()
+
+
+@servico_dados.memorizar
+def volume_por_tamanho(versao, filtro):
+    """Pizzas vendidas por tamanho, do maior volume para o menor (pizza_size, quantity)."""
+    volume = _cubo(versao, filtro).groupby('pizza_size', observed=True)['quantity'].sum().reset_index()
+    return volume.sort_values('quantity', ascending=False)
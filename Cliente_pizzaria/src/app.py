@@ -1,25 +1,27 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import config as cfg
 import etl
+import instrumentacao
+import analise
+import graficos
+import tarefas
+import snapshots
 from datetime import date
 
-# --- DEFINIÇÃO DE CORES (Tema Dark / Cliente) ---
-CORES = {
-    'primary': '#E0211B',      # Vermelho Impulsa (Destaques)
-    'secondary': '#E5E5E5',    # Texto Claro (para fundo escuro)
-    'background': '#000000',   # Fundo Preto solicitado
-    'card_bg': '#1A1A1A',      # Fundo dos Cartões (Cinza Escuro)
-    'charts': ['#E0211B', '#F47C7C', '#FFB7B2', '#A31612', '#680E0B']
-}
+# --- DEFINIÇÃO DE CORES (Tema Dark / Cliente; as mesmas dos gráficos, ver graficos.py) ---
+CORES = graficos.CORES
 
 # --- FUNÇÃO AUXILIAR DE FORMATAÇÃO (BRL) ---
 def formatar_real(valor):
     """Formata float para string BRL (R$ 1.234,56) apenas para exibição"""
     return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
+# --- ABAS SOB DEMANDA ---
+def renderizar(aba):
+    """A aba deve calcular e desenhar: é a aberta (cfg.ABAS_SOB_DEMANDA) ou as abas não guardam estado."""
+    return aba.open is not False
+
 # --- 1. CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
     layout="wide", 
@@ -27,6 +29,9 @@ st.set_page_config(
     page_icon="🍕"
 )
 
+# Instrumentação (cfg.INSTRUMENTACAO): cada bloco abaixo é uma etapa do painel "Desempenho"
+instrumentacao.iniciar('dashboard', perfil=st.session_state.pop('perfil_dashboard', False))
+
 # --- 2. CSS AVANÇADO (DARK MODE) ---
 st.markdown(f"""
 <style>
@@ -87,34 +92,82 @@ st.markdown(f"""
 # --- 3. BARRA LATERAL (CONTROLO) ---
 st.sidebar.title("🍕 Painel de Controle")
 
+
+@st.fragment(run_every=1)
+def acompanhar_tarefa():
+    """Andamento do upload em segundo plano; ao terminar, recarrega o Dashboard com a base nova."""
+    status = tarefas.consultar(st.session_state['tarefa_etl'])
+    if status is None or status['status'] in tarefas.FINAIS:
+        del st.session_state['tarefa_etl']
+        if status is not None:
+            st.session_state['resultado_etl'] = (status['status'] == 'READY', status['mensagem'])
+        etl.invalidar_cache()
+        st.rerun()
+    st.progress(tarefas.fracao(status), text=f"⏳ {status['arquivo']}: {status['etapa'] or 'na fila'}...")
+
+
+instrumentacao.etapa('dashboard.gestao_dados')
 with st.sidebar.expander("⚙️ Gestão de Dados", expanded=False):
     up_file = st.file_uploader("Arquivo CSV", type=['csv'])
-    if up_file and st.button("Processar Base"):
-        with st.spinner("Processando..."):
-            ok, msg = etl.processar_dados(up_file)
+    modo_carga = st.radio("Modo", ["Substituir base", "Adicionar vendas"], horizontal=True,
+                          help="'Adicionar vendas' anexa só as linhas novas (ignora pedidos já carregados).")
+    if up_file and 'tarefa_etl' not in st.session_state and st.button("Processar Base"):
+        # O ETL roda num processo à parte (tarefas.py); a sessão segue respondendo
+        st.session_state['tarefa_etl'] = tarefas.enviar(
+            up_file, modo='incremental' if modo_carga == "Adicionar vendas" else None)
+    if 'tarefa_etl' in st.session_state:
+        acompanhar_tarefa()
+
+    # Versões publicadas (snapshots.py): restaurar uma é só trocar o ponteiro
+    versoes = snapshots.resumo_versoes()
+    if len(versoes) > 1:
+        rotulos = {v['versao']: f"{v['versao']} · {v.get('linhas') or '?'} linhas" + (" (atual)" if v['atual'] else "")
+                   for v in versoes}
+        atual = next((i for i, v in enumerate(versoes) if v['atual']), 0)
+        escolhida = st.selectbox("Versão da base", options=list(rotulos), index=atual, format_func=rotulos.get)
+        if escolhida != versoes[atual]['versao'] and st.button("Restaurar versão"):
+            st.session_state['resultado_etl'] = snapshots.reverter(escolhida)
+            etl.invalidar_cache()
+            st.rerun()
+
+    if 'resultado_etl' in st.session_state:
+        ok, msg = st.session_state.pop('resultado_etl')
         if ok:
             st.success(msg)
-            st.cache_data.clear()
-            if st.button("Recarregar"): st.rerun()
         else:
             st.error(msg)
 
 st.sidebar.divider()
 
 # --- 4. CARREGAMENTO ---
-df = etl.carregar_dados()
-
-if df is None:
+# O Dashboard responde pelo cubo pré-agregado (ver cubo.py); as linhas
+# originais só são lidas quando a contagem de pedidos exige (na contagem
+# aproximada, os esboços de pedidos no lugar delas).
+# As tabelas são uma cópia compartilhada por todas as sessões (servico_dados.py).
+# A versão da base é resolvida uma vez: cubo, pedidos e linhas saem da mesma.
+instrumentacao.etapa('dashboard.carga')
+versao = etl.versao_atual()
+df_cubo, df_pedidos = etl.carregar_agregados(sessao=st.session_state, versao=versao)
+
+if df_cubo is None:
     st.info("👋 Bem-vindo! Faça o upload dos dados para começar.")
     st.stop()
 
+cache_info = etl.estatisticas_cache()
+st.sidebar.caption(
+    f"⚡ Cache: {cache_info['hits']} hits / {cache_info['misses']} misses · "
+    f"carga {cache_info['ultima_carga_ms']:.1f} ms (leitura do disco: {cache_info['ultima_leitura_ms']:.0f} ms) · "
+    f"{cache_info['bases']} base(s) compartilhada(s), {cache_info['memoria_mb']:.0f} MB"
+)
+
 # --- 5. FILTROS ---
+instrumentacao.etapa('dashboard.filtros', len(df_cubo))
 st.sidebar.subheader("🎯 Filtros")
 
 # A. Data
 try:
-    min_date = df['order_date'].min()
-    max_date = df['order_date'].max()
+    min_date = df_cubo['order_date'].min()
+    max_date = df_cubo['order_date'].max()
     
     if pd.isna(min_date) or pd.isna(max_date):
         min_d, max_d = date.today(), date.today()
@@ -127,25 +180,31 @@ except:
     st.stop()
 
 # B. Categoria e Tamanho
-filtro_cat = st.sidebar.multiselect("Categoria", options=['Todas'] + sorted(list(df['pizza_category'].unique()))[1:], default=['Todas'], placeholder="Filtrar categorias...")
-filtro_tam = st.sidebar.multiselect("Tamanho", options=['Todos'] + sorted(list(df['pizza_size'].unique()))[1:], default=['Todos'], placeholder="Filtrar tamanhos...")
+filtro_cat = st.sidebar.multiselect("Categoria", options=['Todas'] + sorted(list(df_cubo['pizza_category'].unique()))[1:], default=['Todas'], placeholder="Filtrar categorias...")
+filtro_tam = st.sidebar.multiselect("Tamanho", options=['Todos'] + sorted(list(df_cubo['pizza_size'].unique()))[1:], default=['Todos'], placeholder="Filtrar tamanhos...")
+
+# C. Contagem de pedidos: aproximada pelos esboços HyperLogLog (cfg.CONTAGEM_PEDIDOS), exata para auditoria
+aproximado = False
+if cfg.CONTAGEM_PEDIDOS == 'aproximada':
+    aproximado = not st.sidebar.checkbox("Contagem exata de pedidos (auditoria)", value=False,
+                                         help="Conta pedidos nas linhas originais em vez de estimar pelos esboços (mais lento).")
 
 # --- 6. APLICAÇÃO DOS FILTROS (CORRIGIDO) ---
-if len(periodo) == 2:
-    mask_data = (df['order_date'].dt.date >= periodo[0]) & (df['order_date'].dt.date <= periodo[1])
-else:
-    mask_data = True
+inicio, fim = (periodo[0], periodo[1]) if len(periodo) == 2 else (None, None)
 
 # Lógica de Filtro: Se "Todas/os" estiver na lista OU a lista estiver vazia, não filtra nada.
-mask_cat = True
-if filtro_cat and 'Todas' not in filtro_cat:
-    mask_cat = df['pizza_category'].isin(filtro_cat)
+categorias = filtro_cat if filtro_cat and 'Todas' not in filtro_cat else None
+tamanhos = filtro_tam if filtro_tam and 'Todos' not in filtro_tam else None
 
-mask_tam = True
-if filtro_tam and 'Todos' not in filtro_tam:
-    mask_tam = df['pizza_size'].isin(filtro_tam)
+# KPIs e gráficos saem da camada de análise (analise.py), memoizados por (versão, filtro)
+filtro = analise.montar_filtro(inicio, fim, categorias, tamanhos)
+fonte_pedidos = analise.fonte_pedidos(versao, filtro, aproximado)
+if fonte_pedidos == 'linhas':
+    # A contagem de pedidos vai às linhas originais: a sessão registra o uso delas
+    etl.carregar_dados(cfg.COLUNAS_DASHBOARD, sessao=st.session_state, versao=versao)
+elif fonte_pedidos == 'esbocos':
+    etl.carregar_esbocos(sessao=st.session_state, versao=versao)
 
-df_filt = df[mask_data & mask_cat & mask_tam]
 
 # --- 7. DASHBOARD PRINCIPAL ---
 
@@ -157,140 +216,105 @@ with col_head1:
 
 st.divider()
 
-if df_filt.empty:
+if analise.vazio(versao, filtro):
     st.warning("⚠️ Nenhum dado encontrado com os filtros atuais.")
     st.stop()
 
 # --- NOVAS ABAS (MONETÁRIO vs OPERAÇÃO) ---
-tab_money, tab_prod = st.tabs(["💰 Setor Monetário", "📦 Produtos e Operação"])
+# Com cfg.ABAS_SOB_DEMANDA só a aba aberta roda; a outra fica vazia até ser
+# aberta (o que ela já calculou para estes filtros volta do cache)
+tab_money, tab_prod = st.tabs(["💰 Setor Monetário", "📦 Produtos e Operação"], key='aba_painel',
+                              on_change="rerun" if cfg.ABAS_SOB_DEMANDA else "ignore")
 
 # =========================================================
 # ABA 1: SETOR MONETÁRIO
 # =========================================================
-with tab_money:
-    # 1. CÁLCULO DOS KPIS FINANCEIROS
-    faturamento = df_filt['total_item_value'].sum()
-    qtd_pedidos = df_filt['order_id'].nunique()
-    qtd_dias = df_filt['order_date'].nunique()
-    
-    ticket_medio_pedido = faturamento / qtd_pedidos if qtd_pedidos > 0 else 0
-    ticket_medio_dia = faturamento / qtd_dias if qtd_dias > 0 else 0
-
-    # 2. CARTÕES
-    col_kpi1, col_kpi2, col_kpi3 = st.columns(3)
+if renderizar(tab_money):
+    with tab_money:
+        # 1. CÁLCULO DOS KPIS FINANCEIROS
+        instrumentacao.etapa('dashboard.kpis_financeiros')
+        kpis = analise.kpis_financeiros(versao, filtro, aproximado)
+
+        # 2. CARTÕES
+        col_kpi1, col_kpi2, col_kpi3 = st.columns(3)
     
-    col_kpi1.metric("Faturamento Total", formatar_real(faturamento))
-    col_kpi2.metric("Ticket Médio (Por Pedido)", formatar_real(ticket_medio_pedido))
-    col_kpi3.metric("Ticket Médio (Por Dia)", formatar_real(ticket_medio_dia))
+        col_kpi1.metric("Faturamento Total", formatar_real(kpis['faturamento']))
+        col_kpi2.metric("Ticket Médio (Por Pedido)",
+                        ("≈ " if kpis['pedidos_aproximados'] else "") + formatar_real(kpis['ticket_medio_pedido']))
+        col_kpi3.metric("Ticket Médio (Por Dia)", formatar_real(kpis['ticket_medio_dia']))
 
-    st.markdown("###") # Espaço
+        st.markdown("###") # Espaço
 
-    # 3. GRÁFICOS FINANCEIROS
-    c1, c2 = st.columns([2, 1])
+        # 3. GRÁFICOS FINANCEIROS
+        c1, c2 = st.columns([2, 1])
     
-    with c1:
-        st.subheader("Evolução do Faturamento")
-        evolucao = df_filt.groupby('order_date')['total_item_value'].sum().reset_index()
-        
-        fig_line = px.line(evolucao, x='order_date', y='total_item_value', markers=True)
-        fig_line.update_traces(line_color=CORES['primary'], line_width=3)
-        # Ajuste para Dark Mode
-        fig_line.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font_color="white",
-            xaxis_title=None, yaxis_title="Vendas (R$)",
-            xaxis=dict(showgrid=False), yaxis=dict(showgrid=True, gridcolor='#333333'),
-            hovermode="x unified"
-        )
-        st.plotly_chart(fig_line, use_container_width=True)
-
-    with c2:
-        st.subheader("Receita por Categoria")
-        mix = df_filt.groupby('pizza_category')['total_item_value'].sum().reset_index()
-        
-        fig_donut = px.pie(mix, values='total_item_value', names='pizza_category', 
-                           hole=0.6, color_discrete_sequence=CORES['charts'])
-        fig_donut.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            font_color="white",
-            showlegend=True,
-            legend=dict(orientation="h", y=-0.1)
-        )
-        fig_donut.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig_donut, use_container_width=True)
+        with c1:
+            instrumentacao.etapa('grafico.evolucao_faturamento')
+            st.subheader("Evolução do Faturamento")
+            evolucao = analise.evolucao_faturamento(versao, filtro)
+            st.plotly_chart(graficos.linha_evolucao(evolucao), use_container_width=True)
+
+        with c2:
+            instrumentacao.etapa('grafico.receita_categoria')
+            st.subheader("Receita por Categoria")
+            mix = analise.receita_por_categoria(versao, filtro)
+            st.plotly_chart(graficos.rosca_categorias(mix), use_container_width=True)
 
 # =========================================================
 # ABA 2: PRODUTOS E OPERAÇÃO
 # =========================================================
-with tab_prod:
-    # 1. CÁLCULO DOS KPIS OPERACIONAIS
-    total_pedidos = df_filt['order_id'].nunique()
-    total_pizzas = df_filt['quantity'].sum()
-
-    # 2. CARTÕES
-    col_op1, col_op2, col_vazia = st.columns([1, 1, 2]) # Usando colunas para alinhar à esquerda
+if renderizar(tab_prod):
+    with tab_prod:
+        # 1. CÁLCULO DOS KPIS OPERACIONAIS
+        instrumentacao.etapa('dashboard.kpis_operacionais')
+        kpis_op = analise.kpis_operacionais(versao, filtro, aproximado)
+
+        # 2. CARTÕES
+        col_op1, col_op2, col_vazia = st.columns([1, 1, 2]) # Usando colunas para alinhar à esquerda
     
-    col_op1.metric("Pedidos Realizados", f"{total_pedidos}")
-    col_op2.metric("Pizzas Vendidas", f"{total_pizzas}")
+        col_op1.metric("Pedidos Realizados", ("≈ " if kpis_op['pedidos_aproximados'] else "") + f"{kpis_op['pedidos']}")
+        col_op2.metric("Pizzas Vendidas", f"{kpis_op['pizzas']}")
+        if kpis_op['pedidos_aproximados']:
+            st.caption(f"≈ Pedidos estimados pelos esboços HyperLogLog (erro típico de "
+                       f"{1.04 / 2 ** (cfg.PRECISAO_HLL / 2):.1%}); marque a contagem exata na barra lateral para auditar.")
 
-    st.markdown("###")
+        st.markdown("###")
 
-    # 3. GRÁFICOS OPERACIONAIS
-    c_prod1, c_prod2 = st.columns(2)
-    
-    with c_prod1:
-        st.subheader("Ranking de Pizzas (Volume)")
-        top_vol = df_filt.groupby('pizza_name')['quantity'].sum().sort_values().tail(5).reset_index()
-        
-        fig_bar = px.bar(top_vol, x='quantity', y='pizza_name', orientation='h', text_auto=True)
-        fig_bar.update_traces(marker_color=CORES['primary'])
-        fig_bar.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font_color="white",
-            xaxis_title="Quantidade Vendida", yaxis_title=None,
-            xaxis=dict(showgrid=True, gridcolor='#333333')
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
-
-    with c_prod2:
-        st.subheader("Picos de Horário")
-        pico = df_filt.groupby('hour_of_day')['order_id'].nunique().reset_index()
-        
-        fig_hist = px.bar(pico, x='hour_of_day', y='order_id')
-        fig_hist.update_traces(marker_color='#444444') # Cinza médio
-        fig_hist.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font_color="white",
-            xaxis_title="Hora", yaxis_title="Pedidos",
-            bargap=0.2,
-            yaxis=dict(gridcolor='#333333')
-        )
-        st.plotly_chart(fig_hist, use_container_width=True)
-
-    st.markdown("---")
-    
-    # 4. NOVO GRÁFICO: VOLUME POR TAMANHO (SUBSTITUI O HEATMAP)
-    st.subheader("Volume de Vendas por Tamanho")
+        # 3. GRÁFICOS OPERACIONAIS
+        c_prod1, c_prod2 = st.columns(2)
     
-    # Agrupamento por tamanho
-    vol_tamanho = df_filt.groupby('pizza_size')['quantity'].sum().reset_index()
+        with c_prod1:
+            instrumentacao.etapa('grafico.ranking_pizzas')
+            st.subheader("Ranking de Pizzas (Volume)")
+            top_vol = analise.ranking_pizzas(versao, filtro)
+            st.plotly_chart(graficos.barras_ranking(top_vol), use_container_width=True)
+
+        with c_prod2:
+            instrumentacao.etapa('grafico.picos_horario')
+            st.subheader("Picos de Horário")
+            pico = analise.pedidos_por_hora(versao, filtro, aproximado)
+            st.plotly_chart(graficos.colunas_picos_horario(pico), use_container_width=True)
+
+        st.markdown("---")
     
-    # Ordem lógica de tamanho se possível (S, M, L, XL, XXL)
-    # Como não temos metadados de ordem, ordenamos por volume ou alfabético. Vamos por volume decrescente.
-    vol_tamanho = vol_tamanho.sort_values('quantity', ascending=False)
-
-    fig_col = px.bar(vol_tamanho, x='pizza_size', y='quantity', text_auto=True)
-    fig_col.update_traces(marker_color=CORES['primary'])
-    fig_col.update_layout(
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-        font_color="white",
-        xaxis_title="Tamanho da Pizza", yaxis_title="Quantidade Vendida",
-        xaxis=dict(showgrid=False),
-        yaxis=dict(showgrid=True, gridcolor='#333333')
-    )
+        # 4. NOVO GRÁFICO: VOLUME POR TAMANHO (SUBSTITUI O HEATMAP)
+        instrumentacao.etapa('grafico.volume_tamanho')
+        st.subheader("Volume de Vendas por Tamanho")
     
-    st.plotly_chart(fig_col, use_container_width=True)
\ No newline at end of file
+        # Ordem lógica de tamanho se possível (S, M, L, XL, XXL)
+        # Como não temos metadados de ordem, ordenamos por volume ou alfabético. Vamos por volume decrescente.
+        vol_tamanho = analise.volume_por_tamanho(versao, filtro)
+        st.plotly_chart(graficos.colunas_tamanho(vol_tamanho), use_container_width=True)
+
+# --- 8. PAINEL DE DESEMPENHO (cfg.INSTRUMENTACAO; ver instrumentacao.py) ---
+execucao = instrumentacao.finalizar()
+if execucao is not None:
+    with st.sidebar.expander("⏱️ Desempenho", expanded=False):
+        st.caption(f"Execução: {execucao.duracao * 1000:.0f} ms · log em {cfg.ARQUIVO_LOG_DESEMPENHO}")
+        st.dataframe(instrumentacao.tabela(execucao), hide_index=True, use_container_width=True)
+        if execucao.perfil:
+            st.caption(f"cProfile: {execucao.arquivo_perfil}")
+            st.code(execucao.perfil, language=None)
+        if st.button("Capturar perfil (cProfile)", help="Roda a próxima execução do Dashboard sob cProfile."):
+            st.session_state['perfil_dashboard'] = True
+            st.rerun()
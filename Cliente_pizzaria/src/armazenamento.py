@@ -0,0 +1,198 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import feather
+
+# ==============================================================================
+# ARMAZENAMENTO DA BASE PROCESSADA (CSV / PARQUET / FEATHER)
+# ==============================================================================
+# Parquet e Feather guardam os tipos (datas, categorias, inteiros) e permitem
+# ler só as colunas necessárias. Colunas de texto são gravadas como categorias
+# (dictionary encoding), o que reduz disco e memória na leitura.
+
+FORMATOS = ('csv', 'parquet', 'feather')
+
+
+def formato_do_caminho(caminho):
+    """Deduz o formato pela extensão do arquivo."""
+    ext = os.path.splitext(caminho)[1].lower().lstrip('.')
+    if ext not in FORMATOS:
+        raise ValueError(f"Formato de armazenamento não suportado: '{ext}'")
+    return ext
+
+
+def _codificar_textos(df):
+    """Converte colunas de texto (object) em categóricas para o dictionary encoding."""
+    colunas_texto = df.select_dtypes(include='object').columns
+    if len(colunas_texto) == 0:
+        return df
+    df = df.copy()
+    for col in colunas_texto:
+        df[col] = df[col].astype('category')
+    return df
+
+
+def compactar_tipos(df, plano):
+    """
+    Converte as colunas do plano (ex.: cfg.PLANO_DTYPES) para tipos compactos:
+    'category' para textos repetidos, inteiros e floats menores para números.
+    Um inteiro só é reduzido se todos os valores couberem no tipo novo; senão
+    (ou se a coluna tiver nulos) fica como está. Colunas ausentes são ignoradas.
+    """
+    df = df.copy(deep=False)
+    for col, dtype in plano.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        serie = df[col]
+        if dtype == 'category':
+            df[col] = serie.astype('category')
+        elif np.dtype(dtype).kind in 'iu':
+            if serie.dtype.kind not in 'iu':
+                continue
+            limites = np.iinfo(dtype)
+            if serie.empty or (limites.min <= serie.min() and serie.max() <= limites.max):
+                df[col] = serie.astype(dtype)
+        elif serie.dtype.kind == 'f':
+            df[col] = serie.astype(dtype)
+    return df
+
+
+def bytes_por_linha(df):
+    """Memória ocupada pelo DataFrame (textos incluídos) dividida pelo número de linhas."""
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+
+
+def _tabela_arrow(df, dicionario=True):
+    """
+    Converte um DataFrame (ou chunk) para Arrow com tipos estáveis entre partes:
+    textos viram dictionary<int32, string> (ou string simples com dicionario=False).
+    """
+    tabela = pa.Table.from_pandas(_codificar_textos(df), preserve_index=False)
+    campos = []
+    for campo in tabela.schema:
+        if pa.types.is_dictionary(campo.type):
+            tipo = pa.dictionary(pa.int32(), pa.string()) if dicionario else pa.string()
+            campo = campo.with_type(tipo)
+        campos.append(campo)
+    return tabela.cast(pa.schema(campos, metadata=tabela.schema.metadata))
+
+
+def salvar_tabela(df, caminho):
+    """
+    Grava o DataFrame no formato indicado pela extensão do caminho.
+    A escrita é feita num temporário e publicada com os.replace (atômico).
+    """
+    formato = formato_do_caminho(caminho)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_tmp = caminho + '.tmp'
+
+    if formato == 'csv':
+        df.to_csv(caminho_tmp, index=False, encoding='utf-8')
+    elif formato == 'parquet':
+        pq.write_table(_tabela_arrow(df), caminho_tmp)
+    else:
+        feather.write_feather(_tabela_arrow(df), caminho_tmp)
+
+    os.replace(caminho_tmp, caminho)
+
+
+def _ler_arrow(caminho, colunas):
+    if formato_do_caminho(caminho) == 'parquet':
+        return pq.read_table(caminho, columns=colunas)
+    return feather.read_table(caminho, columns=colunas)
+
+
+def ler_tabela(caminho, colunas=None):
+    """Lê a tabela; 'colunas' restringe a leitura às colunas pedidas."""
+    formato = formato_do_caminho(caminho)
+    colunas = list(colunas) if colunas is not None else None
+
+    if formato == 'csv':
+        return pd.read_csv(caminho, usecols=colunas)
+    return _ler_arrow(caminho, colunas).to_pandas()
+
+
+def ler_tabelas(caminhos, colunas=None):
+    """Lê e concatena várias tabelas do mesmo formato (ex.: partições), na ordem dada."""
+    if not caminhos:
+        return None
+    colunas = list(colunas) if colunas is not None else None
+
+    if formato_do_caminho(caminhos[0]) == 'csv':
+        return pd.concat([pd.read_csv(c, usecols=colunas) for c in caminhos], ignore_index=True)
+
+    # Em Arrow os dicionários de cada partição são unificados na conversão (categorias)
+    tabelas = [_ler_arrow(c, colunas) for c in caminhos]
+    return pa.concat_tables(tabelas, promote_options='permissive').to_pandas()
+
+
+def assinatura(caminho):
+    """
+    Identifica a versão de um arquivo, ou de uma pasta de partições, em disco:
+    (caminho, detalhes de mtime e tamanho).
+    """
+    caminho = os.path.abspath(caminho)
+    if os.path.isdir(caminho):
+        detalhes = []
+        for entrada in sorted(os.scandir(caminho), key=lambda e: e.name):
+            if entrada.is_file():
+                info = entrada.stat()
+                detalhes.append((entrada.name, info.st_mtime_ns, info.st_size))
+        return (caminho, tuple(detalhes))
+
+    info = os.stat(caminho)
+    return (caminho, (info.st_mtime_ns, info.st_size))
+
+
+class EscritorIncremental:
+    """
+    Grava a tabela em partes (chunks) num arquivo temporário.
+    Só substitui o arquivo final em concluir(); descartar() apaga o parcial.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.formato = formato_do_caminho(caminho)
+        self.caminho_tmp = caminho + '.tmp'
+        self.linhas = 0
+        self._writer = None
+        self._schema = None
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+    def escrever(self, df):
+        if df.empty:
+            return
+
+        if self.formato == 'csv':
+            df.to_csv(self.caminho_tmp, mode='a' if self.linhas else 'w', header=not self.linhas,
+                      index=False, encoding='utf-8')
+        else:
+            tabela = _tabela_arrow(df, dicionario=(self.formato == 'parquet'))
+            if self._writer is None:
+                self._schema = tabela.schema
+                if self.formato == 'parquet':
+                    self._writer = pq.ParquetWriter(self.caminho_tmp, self._schema)
+                else:
+                    opcoes = pa.ipc.IpcWriteOptions(compression='lz4')
+                    self._writer = pa.ipc.new_file(self.caminho_tmp, self._schema, options=opcoes)
+            else:
+                tabela = tabela.cast(self._schema)
+            self._writer.write_table(tabela)
+
+        self.linhas += len(df)
+
+    def _fechar(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def concluir(self):
+        self._fechar()
+        os.replace(self.caminho_tmp, self.caminho)
+
+    def descartar(self):
+        self._fechar()
+        if os.path.exists(self.caminho_tmp):
+            os.remove(self.caminho_tmp)
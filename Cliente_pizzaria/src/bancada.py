@@ -0,0 +1,206 @@
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import config as cfg
+
+try:
+    import resource
+except ImportError:
+    # Windows: sem getrusage
+    resource = None
+
+# ==============================================================================
+# BANCADA DE MEDIÇÃO DA SUITE DE BENCHMARKS (SEM STREAMLIT)
+# ==============================================================================
+# Mesmo código para a pizzaria e a imobiliária: cada benchmark.py define as
+# etapas (nome, preparar, executar) e o gerador do CSV sintético.
+#
+# Cada etapa roda num processo novo (spawn), para que o pico de memória de uma
+# não contamine a outra: preparar(csv, pasta) monta as entradas (fora da
+# medição) e executar(*entradas) é cronometrado. No Linux o pico de RSS é
+# zerado depois do preparo (/proc/self/clear_refs), então o acréscimo de RSS
+# é só da etapa; nos demais sistemas vale o pico do processo inteiro.
+#
+# Resultado: JSON com tempo, linhas/s e RSS por (etapa, linhas), que pode ser
+# guardado como baseline e comparado em execuções seguintes.
+
+TAMANHOS_PADRAO = [10_000, 1_000_000, 10_000_000]
+LINHAS_POR_BLOCO = 1_000_000
+TOLERANCIA_PADRAO = 0.20
+
+
+# --- MEMÓRIA DO PROCESSO ---
+
+def _status_kb(campo):
+    """Valor (kB) de um campo de /proc/self/status (ex.: VmRSS, VmHWM); None fora do Linux."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for linha in f:
+                if linha.startswith(campo + ':'):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _zerar_pico():
+    """Zera o pico de RSS (VmHWM) do processo. False se o sistema não permitir."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _pico_kb():
+    pico = _status_kb('VmHWM')
+    if pico is not None or resource is None:
+        return pico
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS informa bytes; Linux, kB
+    return maximo // 1024 if sys.platform == 'darwin' else maximo
+
+
+# --- GERAÇÃO DOS DADOS ---
+
+def gravar_csv(gerar, linhas, caminho):
+    """
+    Grava em 'caminho' o CSV sintético de 'linhas' linhas, em blocos de
+    LINHAS_POR_BLOCO (memória limitada mesmo para 10M linhas).
+    gerar(linhas, inicio) devolve os bytes de um bloco com cabeçalho;
+    'inicio' (nº da primeira linha) serve de semente e de deslocamento de IDs.
+    """
+    with open(caminho, 'wb') as f:
+        for inicio in range(0, linhas, LINHAS_POR_BLOCO):
+            bloco = gerar(min(LINHAS_POR_BLOCO, linhas - inicio), inicio)
+            if inicio > 0:
+                bloco = bloco[bloco.index(b'\n') + 1:]
+            f.write(bloco)
+    return os.path.getsize(caminho)
+
+
+# --- MEDIÇÃO (PROCESSO FILHO) ---
+
+def _medir(preparar, executar, caminho_csv, pasta, linhas, repeticoes):
+    entradas = preparar(caminho_csv, pasta)
+    gc.collect()
+    rss_antes = _status_kb('VmRSS')
+    isolado = _zerar_pico()
+
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        executar(*entradas)
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    pico = _pico_kb()
+    return {
+        'tempo_s': melhor,
+        'linhas_por_s': linhas / melhor if melhor > 0 else None,
+        'pico_rss_mb': pico / 1024 if pico is not None else None,
+        'acrescimo_rss_mb': (pico - rss_antes) / 1024 if isolado and rss_antes is not None else None,
+    }
+
+
+def medir_etapa(preparar, executar, caminho_csv, pasta, linhas, repeticoes=1):
+    """Mede uma etapa num processo novo; devolve o dict de medidas (ou 'erro')."""
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+        try:
+            return pool.submit(_medir, preparar, executar, caminho_csv, pasta, linhas, repeticoes).result()
+        except Exception as e:
+            return {'erro': f"{type(e).__name__}: {e}"}
+
+
+# --- SUITE ---
+
+def _cabecalho():
+    return {
+        'cliente': cfg.NOME_CLIENTE,
+        'gerado_em': datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'sistema': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def _formatar(medida):
+    if 'erro' in medida:
+        return f"ERRO ({medida['erro']})"
+    acrescimo = medida['acrescimo_rss_mb']
+    texto = f"{medida['tempo_s'] * 1000:11.1f} ms  {medida['linhas_por_s'] or 0:13,.0f} linhas/s"
+    if medida['pico_rss_mb'] is not None:
+        texto += f"  pico {medida['pico_rss_mb']:7.0f} MB"
+    if acrescimo is not None:
+        texto += f"  (+{acrescimo:.0f} MB)"
+    return texto
+
+
+def executar_suite(etapas, gerar, tamanhos=None, selecionadas=None, repeticoes=1, pasta=None):
+    """
+    Roda cada etapa (nome, preparar, executar) em cada tamanho e devolve o
+    relatório (dict serializável em JSON). 'selecionadas' restringe as etapas
+    por nome; 'pasta' guarda CSVs e bases (padrão: um diretório temporário).
+    """
+    tamanhos = tamanhos or TAMANHOS_PADRAO
+    relatorio = {**_cabecalho(), 'resultados': []}
+    with tempfile.TemporaryDirectory(dir=pasta) as raiz:
+        for linhas in tamanhos:
+            pasta_tamanho = os.path.join(raiz, str(linhas))
+            os.makedirs(pasta_tamanho)
+            caminho_csv = os.path.join(pasta_tamanho, 'entrada.csv')
+            tamanho_csv = gravar_csv(gerar, linhas, caminho_csv)
+            print(f"\n{cfg.NOME_CLIENTE}: {linhas:,} linhas ({tamanho_csv / 1e6:.1f} MB de CSV)")
+
+            for nome, preparar, executar in etapas:
+                if selecionadas and nome not in selecionadas:
+                    continue
+                medida = medir_etapa(preparar, executar, caminho_csv, pasta_tamanho, linhas, repeticoes)
+                print(f"  {nome:<38} {_formatar(medida)}")
+                relatorio['resultados'].append({'etapa': nome, 'linhas': linhas, **medida})
+    return relatorio
+
+
+def salvar_relatorio(relatorio, caminho):
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+
+def comparar(relatorio, caminho_baseline, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Compara tempo e pico de RSS com a baseline (mesma etapa e nº de linhas).
+    Regressão: valor acima de baseline × (1 + tolerancia). Retorna a lista de regressões.
+    """
+    with open(caminho_baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    anteriores = {(r['etapa'], r['linhas']): r for r in baseline['resultados'] if 'erro' not in r}
+
+    print(f"\nComparação com {caminho_baseline} (gerada em {baseline.get('gerado_em')}, "
+          f"tolerância {tolerancia:.0%})")
+    regressoes = []
+    for atual in relatorio['resultados']:
+        anterior = anteriores.get((atual['etapa'], atual['linhas']))
+        if anterior is None or 'erro' in atual:
+            continue
+        razoes = {medida: atual[medida] / anterior[medida]
+                  for medida in ('tempo_s', 'pico_rss_mb') if atual[medida] and anterior[medida]}
+        piores = [medida for medida, razao in razoes.items() if razao > 1 + tolerancia]
+        marca = "REGRESSÃO" if piores else "ok"
+        print(f"  {atual['etapa']:<38} {atual['linhas']:>12,}  tempo {razoes.get('tempo_s', 1):5.2f}x"
+              f"  pico {razoes.get('pico_rss_mb', 1):5.2f}x  {marca}")
+        if piores:
+            regressoes.append((atual['etapa'], atual['linhas'], piores))
+    return regressoes
@@ -0,0 +1,480 @@
+"""
+Benchmarks do ETL da pizzaria (rodam sem Streamlit).
+
+Uso:
+    python benchmark.py datas --linhas 1000000
+    python benchmark.py motores --linhas 1000000
+    python benchmark.py memoria --linhas 1000000
+    python benchmark.py pedidos --linhas 1000000
+    python benchmark.py graficos --linhas 1000000
+    python benchmark.py periodo --linhas 1000000
+    python benchmark.py suite --tamanhos 10000 1000000 --salvar baseline.json
+    python benchmark.py suite --comparar baseline.json
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import config as cfg
+import analise
+import cubo
+import armazenamento
+import bancada
+import datas
+import etl
+import graficos
+import guardiao
+import servico_dados
+import snapshots
+
+
+def cronometrar(funcao, *args, repeticoes=3):
+    """Melhor tempo (s) entre as repetições e o último resultado."""
+    melhor, resultado = float('inf'), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+# --- DATAS: estratégia híbrida antiga x normalização com detecção de formato ---
+
+def _datas_hibrido_legado(serie):
+    """Versão anterior do ETL: duas conversões completas + fillna."""
+    iso_dates = pd.to_datetime(serie, format='%Y-%m-%d', errors='coerce')
+    br_dates = pd.to_datetime(serie, format='%d/%m/%Y', errors='coerce')
+    return iso_dates.fillna(br_dates)
+
+
+def gerar_datas_mistas(linhas, pct_br=0.10, anos=3, seed=42):
+    """Coluna de datas em texto: maioria ISO, uma fração em dd/mm/aaaa."""
+    rng = np.random.default_rng(seed)
+    dias = pd.date_range('2015-01-01', periods=365 * anos, freq='D')
+    sorteio = dias[np.sort(rng.integers(0, len(dias), linhas))]
+    texto = pd.Series(sorteio.strftime('%Y-%m-%d'), dtype='object')
+    br = rng.random(linhas) < pct_br
+    texto[br] = sorteio[br].strftime('%d/%m/%Y')
+    return texto
+
+
+def bench_datas(linhas):
+    serie = gerar_datas_mistas(linhas)
+    t_legado, r_legado = cronometrar(_datas_hibrido_legado, serie)
+    t_novo, r_novo = cronometrar(datas.normalizar_datas, serie)
+
+    iguais = r_legado.equals(r_novo)
+    print(f"Datas mistas ({linhas:,} linhas, 10% dd/mm/aaaa)")
+    print(f"  híbrido (2 passadas): {t_legado * 1000:9.1f} ms")
+    print(f"  normalizar_datas    : {t_novo * 1000:9.1f} ms  ({t_legado / t_novo:.1f}x)")
+    print(f"  resultados idênticos: {iguais}")
+
+
+# --- MOTORES: etl.processar_dados com pandas x polars (mesmo arquivo) ---
+
+def gerar_vendas_csv(linhas, pct_br=0.10, seed=42, primeiro_pedido=0):
+    """CSV de vendas no schema oficial (datas entre aspas, uma fração em dd/mm/aaaa)."""
+    rng = np.random.default_rng(seed)
+    pedidos = max(1, linhas // 2)
+    order_id = np.sort(rng.integers(1, pedidos + 1, linhas))
+    segundos = np.sort(rng.integers(0, 365 * 24 * 3600, pedidos + 1))
+    momento = pd.Timestamp('2015-01-01') + pd.to_timedelta(segundos[order_id], unit='s')
+
+    pizzas = np.array(['The Hawaiian Pizza', 'The Classic Deluxe Pizza', 'The Five Cheese Pizza',
+                       'The Italian Supreme Pizza', 'The Thai Chicken Pizza'])
+    categorias = np.array(['Classic', 'Classic', 'Veggie', 'Supreme', 'Chicken'])
+    sorteio = rng.integers(0, len(pizzas), linhas)
+    preco = np.round(rng.uniform(9, 35, linhas), 2)
+    quantidade = rng.integers(1, 4, linhas)
+
+    order_date = pd.Series(momento.strftime('%Y-%m-%d'), dtype='object')
+    br = rng.random(linhas) < pct_br
+    order_date[br] = momento[br].strftime('%d/%m/%Y')
+
+    df = pd.DataFrame({
+        'order_id': order_id + primeiro_pedido,
+        'order_date': '"' + order_date + '"',
+        'order_time': momento.strftime('%H:%M:%S'),
+        'order_datetime': momento.strftime('%Y-%m-%d %H:%M:%S'),
+        'day_of_week': momento.day_name(),
+        'hour_of_day': momento.hour,
+        'month_name': momento.month_name(),
+        'pizza_name': pizzas[sorteio],
+        'pizza_category': categorias[sorteio],
+        'pizza_size': np.array(['S', 'M', 'L', 'XL', 'XXL'])[rng.integers(0, 5, linhas)],
+        'pizza_price': preco,
+        'quantity': quantidade,
+        'total_item_value': np.round(preco * quantidade, 2),
+    })
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def _arquivo(conteudo):
+    arquivo = io.BytesIO(conteudo)
+    arquivo.name = 'vendas.csv'
+    return arquivo
+
+
+def _isolar(pasta):
+    """Aponta bases, cache e flags para 'pasta' (os dados do cliente não são tocados)."""
+    cfg.PASTA_VERSOES = os.path.join(pasta, 'pizzaria_versoes')
+    cfg.PASTA_PROCESSADA_LEGADA = os.path.join(pasta, 'pizzaria_sales')
+    cfg.ARQUIVOS_LEGADOS = []
+    cfg.DIRS = {'TRUSTED': os.path.join(pasta, 'trusted'), 'FLAGS': os.path.join(pasta, 'flags')}
+    cfg.PASTA_CACHE_DADOS = os.path.join(pasta, 'cache')
+
+
+def _executar_motor(motor, conteudo, pasta):
+    """Carga completa com o motor dado numa base isolada em 'pasta'."""
+    cfg.MOTOR_ETL = motor
+    _isolar(os.path.join(pasta, motor))
+    sucesso, msg = etl.processar_dados(_arquivo(conteudo), modo='completo')
+    if not sucesso:
+        raise RuntimeError(f"{motor}: {msg}")
+    return etl.carregar_dados(cfg.COLUNAS_DASHBOARD)
+
+
+def bench_motores(linhas):
+    import ingestor
+
+    conteudo = gerar_vendas_csv(linhas)
+
+    # Só leitura + validação + tipagem (sem gravar nada)
+    t_prep_pandas, _ = cronometrar(lambda: etl._preparar_upload(_arquivo(conteudo)), repeticoes=1)
+    t_prep_polars, _ = cronometrar(lambda: ingestor.IngestionAgent.processar(_arquivo(conteudo)), repeticoes=1)
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for motor in ('pandas', 'polars'):
+            # Uma repetição: cada execução regrava a base inteira
+            resultados[motor] = cronometrar(_executar_motor, motor, conteudo, pasta, repeticoes=1)
+
+    (t_pandas, r_pandas), (t_polars, r_polars) = resultados['pandas'], resultados['polars']
+    print(f"Carga completa ({linhas:,} linhas, {len(conteudo) / 1e6:.1f} MB de CSV)")
+    print("  leitura + validação + tipagem")
+    print(f"    pandas (etl.py)     : {t_prep_pandas * 1000:9.1f} ms")
+    print(f"    polars (ingestor.py): {t_prep_polars * 1000:9.1f} ms  ({t_prep_pandas / t_prep_polars:.1f}x)")
+    print("  carga completa (inclui partições, cubo e, no polars, o parquet trusted)")
+    print(f"    pandas (etl.py)     : {t_pandas * 1000:9.1f} ms")
+    print(f"    polars (ingestor.py): {t_polars * 1000:9.1f} ms  ({t_pandas / t_polars:.1f}x)")
+    print(f"  bases idênticas     : {r_pandas.equals(r_polars)}")
+
+
+
+# --- MEMÓRIA: tipos da conversão (int64, textos object) x cfg.PLANO_DTYPES ---
+
+def _relatorio_memoria(titulo, antes, depois):
+    print(f"  {titulo}")
+    print(f"    sem plano de tipos : {armazenamento.bytes_por_linha(antes):7.1f} bytes/linha")
+    print(f"    cfg.PLANO_DTYPES   : {armazenamento.bytes_por_linha(depois):7.1f} bytes/linha"
+          f"  ({armazenamento.bytes_por_linha(antes) / armazenamento.bytes_por_linha(depois):.1f}x menos)")
+
+
+def _mesmos_valores(antes, depois):
+    """Só os tipos mudam: textos e inteiros iguais, floats iguais na precisão do float32."""
+    for col in antes.columns:
+        if antes[col].dtype.kind == 'f':
+            if not np.allclose(antes[col], depois[col].astype('float64'), rtol=1e-6, equal_nan=True):
+                return False
+        elif not antes[col].astype(object).equals(depois[col].astype(object)):
+            return False
+    return True
+
+
+def bench_memoria(linhas):
+    conteudo = gerar_vendas_csv(linhas)
+
+    plano = cfg.PLANO_DTYPES
+    try:
+        cfg.PLANO_DTYPES = {}
+        antes, _, _ = etl._preparar_upload(_arquivo(conteudo))
+    finally:
+        cfg.PLANO_DTYPES = plano
+    depois, _, _ = etl._preparar_upload(_arquivo(conteudo))
+
+    iguais = _mesmos_valores(antes, depois)
+    print(f"Memória por linha ({linhas:,} vendas)")
+    _relatorio_memoria("base processada (ETL)", antes, depois)
+    _relatorio_memoria("colunas do Dashboard", antes[cfg.COLUNAS_DASHBOARD], depois[cfg.COLUNAS_DASHBOARD])
+    print(f"  valores preservados : {iguais}")
+
+
+# --- PEDIDOS: nunique(order_id) nas linhas x esboços HyperLogLog (cfg.CONTAGEM_PEDIDOS) ---
+
+def _contar_pedidos(versao, filtro, aproximado):
+    """Pedidos no filtro e por hora, com caches vazios (seleções inclusive)."""
+    servico_dados.RESULTADOS.invalidar()
+    analise._SELECOES.invalidar()
+    total = analise.kpis_financeiros(versao, filtro, aproximado)['pedidos']
+    return total, analise.pedidos_por_hora(versao, filtro, aproximado)['order_id'].to_numpy()
+
+
+def _erro_relativo(estimado, exato):
+    return np.abs(np.asarray(estimado, dtype='float64') - exato) / np.maximum(exato, 1)
+
+
+def bench_pedidos(linhas):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_csv = os.path.join(pasta, 'entrada.csv')
+        bancada.gravar_csv(_gerar_bloco, linhas, caminho_csv)
+        _garantir_base(caminho_csv, pasta)
+        versao = etl.versao_atual()
+        mb_linhas = armazenamento.bytes_por_linha(etl.carregar_dados(cfg.COLUNAS_DASHBOARD)) * linhas / 1e6
+        tabela = etl.carregar_esbocos()
+        mb_esbocos = tabela.memory_usage(deep=True, index=False).sum() / 1e6
+
+        print(f"Pedidos distintos com filtro de categoria ({linhas:,} vendas, "
+              f"{len(tabela):,} linhas de esboço, PRECISAO_HLL = {cfg.PRECISAO_HLL})")
+        print(f"  memória: linhas {mb_linhas:.1f} MB  x  esboços {mb_esbocos:.1f} MB")
+        for categorias in (['Classic'], ['Classic', 'Veggie', 'Supreme']):
+            filtro = analise.montar_filtro(categorias=categorias)
+            t_exato, (total, por_hora) = cronometrar(_contar_pedidos, versao, filtro, False)
+            t_aprox, (estimado, estimado_hora) = cronometrar(_contar_pedidos, versao, filtro, True)
+            print(f"  {', '.join(categorias)} ({total:,} pedidos)")
+            print(f"    exata (nunique)   : {t_exato * 1000:10.1f} ms")
+            print(f"    esboços (HLL)     : {t_aprox * 1000:10.1f} ms  ({t_exato / t_aprox:.1f}x)")
+            print(f"    erro: total {_erro_relativo(estimado, total)[()]:.2%}, "
+                  f"por hora até {_erro_relativo(estimado_hora, por_hora).max():.2%}")
+
+
+# --- GRÁFICOS: figuras montadas a cada execução x graficos.py (cache por conteúdo) ---
+
+# (gráfico, tabela da análise) das duas abas, na ordem do Dashboard
+FIGURAS_DASHBOARD = [
+    (graficos.linha_evolucao, analise.evolucao_faturamento),
+    (graficos.rosca_categorias, analise.receita_por_categoria),
+    (graficos.barras_ranking, analise.ranking_pizzas),
+    (graficos.colunas_picos_horario, analise.pedidos_por_hora),
+    (graficos.colunas_tamanho, analise.volume_por_tamanho),
+]
+
+
+def _figuras_montadas(tabelas):
+    return [grafico.__wrapped__(tabela).update_layout(**graficos.TEMA_ESCURO)
+            for (grafico, _), tabela in zip(FIGURAS_DASHBOARD, tabelas)]
+
+
+def _figuras_cache(tabelas):
+    return [grafico(tabela) for (grafico, _), tabela in zip(FIGURAS_DASHBOARD, tabelas)]
+
+
+def _payload_kb(figuras):
+    """Tamanho do JSON das figuras (o que o st.plotly_chart envia ao navegador)."""
+    return sum(len(pio.to_json(figura, validate=False)) for figura in figuras) / 1024
+
+
+def bench_graficos(linhas):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_csv = os.path.join(pasta, 'entrada.csv')
+        bancada.gravar_csv(_gerar_bloco, linhas, caminho_csv)
+        _garantir_base(caminho_csv, pasta)
+        versao = etl.versao_atual()
+
+        print(f"Gráficos do Dashboard ({linhas:,} vendas)")
+        for titulo, filtro in [("sem filtros", analise.montar_filtro()),
+                               ("categoria Classic", analise.montar_filtro(categorias=['Classic']))]:
+            tabelas = [tabela(versao, filtro) for _, tabela in FIGURAS_DASHBOARD]
+            graficos.FIGURAS.invalidar()
+            t_montadas, _ = cronometrar(_figuras_montadas, tabelas)
+            t_cache, figuras = cronometrar(_figuras_cache, tabelas)
+            print(f"  {titulo}")
+            print(f"    {len(tabelas)} figuras, montadas : {t_montadas * 1000:8.1f} ms  {_payload_kb(figuras):9.1f} KB")
+            print(f"    {len(tabelas)} figuras, em cache : {t_cache * 1000:8.1f} ms  ({t_montadas / t_cache:.0f}x)")
+
+
+# --- PERÍODO: máscara na tabela inteira x busca binária na tabela ordenada por data ---
+
+def _periodo_mascara_legado(tabela, inicio, fim, categorias):
+    """Versão anterior do cubo.aplicar_filtros: compara todas as linhas."""
+    mask = pd.Series(True, index=tabela.index)
+    mask &= tabela['order_date'] >= pd.Timestamp(inicio)
+    mask &= tabela['order_date'] < pd.Timestamp(fim) + pd.Timedelta(days=1)
+    mask &= tabela['pizza_category'].isin(categorias)
+    return tabela[mask]
+
+
+def gerar_historico(linhas_por_ano, anos, seed=42):
+    """Linhas de venda (só as colunas do filtro), ordenadas por data, em 'anos' de histórico."""
+    rng = np.random.default_rng(seed)
+    linhas = linhas_por_ano * anos
+    dias = pd.date_range('2015-01-01', periods=365 * anos, freq='D')
+    return pd.DataFrame({
+        'order_date': dias[np.sort(rng.integers(0, len(dias), linhas))],
+        'pizza_category': pd.Categorical.from_codes(rng.integers(0, 4, linhas),
+                                                    ['Chicken', 'Classic', 'Supreme', 'Veggie']),
+        'total_item_value': np.round(rng.uniform(9, 105, linhas), 2),
+    })
+
+
+def bench_periodo(linhas):
+    inicio, fim, categorias = '2015-03-01', '2015-03-31', ['Classic']
+    print(f"Filtro de um mês + categoria ({linhas:,} vendas por ano de histórico)")
+    for anos in (1, 4, 16):
+        tabela = gerar_historico(linhas, anos)
+        t_legado, r_legado = cronometrar(_periodo_mascara_legado, tabela, inicio, fim, categorias)
+        t_novo, r_novo = cronometrar(cubo.aplicar_filtros, tabela, inicio, fim, categorias)
+        print(f"  {anos:2d} ano(s) ({len(tabela):,} linhas)")
+        print(f"    máscara (tabela inteira): {t_legado * 1000:8.1f} ms")
+        print(f"    busca binária + fatia   : {t_novo * 1000:8.1f} ms  ({t_legado / t_novo:.0f}x)"
+              f"  idênticos: {r_legado.equals(r_novo)}")
+
+
+# --- SUITE: etapas do ETL e do Dashboard em 10k / 1M / 10M linhas (ver bancada.py) ---
+# preparar(csv, pasta) roda fora da medição; executar(*entradas) é cronometrado.
+
+def _gerar_bloco(linhas, inicio):
+    return gerar_vendas_csv(linhas, seed=42 + inicio, primeiro_pedido=inicio // 2)
+
+
+def _ler_csv(caminho_csv):
+    with open(caminho_csv, 'rb') as f:
+        return _arquivo(f.read())
+
+
+def _garantir_base(caminho_csv, pasta):
+    """Base publicada do CSV em 'pasta' (processada uma vez) e cache vazio (carga a frio)."""
+    _isolar(pasta)
+    if snapshots.versao_atual() is None:
+        sucesso, msg = etl.processar_dados(_ler_csv(caminho_csv), modo='completo')
+        if not sucesso:
+            raise RuntimeError(msg)
+    shutil.rmtree(cfg.PASTA_CACHE_DADOS, ignore_errors=True)
+
+
+def _preparar_validacao(caminho_csv, pasta):
+    return (pd.read_csv(caminho_csv),)
+
+
+def _preparar_completo(caminho_csv, pasta):
+    _isolar(pasta)
+    return _ler_csv(caminho_csv), 'completo'
+
+
+def _preparar_streaming(caminho_csv, pasta):
+    _isolar(pasta)
+    return _ler_csv(caminho_csv), 'streaming'
+
+
+def _processar(arquivo, modo):
+    arquivo.seek(0)
+    sucesso, msg = etl.processar_dados(arquivo, modo=modo)
+    if not sucesso:
+        raise RuntimeError(msg)
+
+
+def _preparar_carga(caminho_csv, pasta):
+    _garantir_base(caminho_csv, pasta)
+    return (cfg.COLUNAS_DASHBOARD,)
+
+
+def _carregar(colunas):
+    etl.invalidar_cache()
+    if etl.carregar_dados(colunas) is None:
+        raise RuntimeError("Base não encontrada")
+
+
+def _preparar_enriquecimento(caminho_csv, pasta):
+    import ingestor
+
+    df_pl, _, msg = ingestor.IngestionAgent.processar(_ler_csv(caminho_csv))
+    if df_pl is None:
+        raise RuntimeError(msg)
+    return (df_pl,)
+
+
+def _enriquecer_polars(df_pl):
+    import ingestor
+
+    return ingestor.TypeAgent.converter_e_enriquecer(df_pl)
+
+
+def _agregacoes_dashboard(versao, filtro, aproximado=False):
+    """KPIs e gráficos das duas abas (analise.py), calculados do zero (cache de resultados vazio)."""
+    servico_dados.RESULTADOS.invalidar()
+    analise.vazio(versao, filtro)
+    analise.kpis_financeiros(versao, filtro, aproximado)
+    analise.evolucao_faturamento(versao, filtro)
+    analise.receita_por_categoria(versao, filtro)
+    analise.kpis_operacionais(versao, filtro, aproximado)
+    analise.ranking_pizzas(versao, filtro)
+    analise.pedidos_por_hora(versao, filtro, aproximado)
+    analise.volume_por_tamanho(versao, filtro)
+
+
+def _preparar_agregacoes(caminho_csv, pasta, categorias=None):
+    # Bases já em memória: a etapa mede só os cálculos
+    _garantir_base(caminho_csv, pasta)
+    etl.carregar_agregados()
+    etl.carregar_dados(cfg.COLUNAS_DASHBOARD)
+    return etl.versao_atual(), analise.montar_filtro(categorias=categorias)
+
+
+def _preparar_agregacoes_categoria(caminho_csv, pasta):
+    # Filtro de categoria: a contagem de pedidos vai às linhas originais
+    return _preparar_agregacoes(caminho_csv, pasta, categorias=['Classic'])
+
+
+def _preparar_agregacoes_aproximada(caminho_csv, pasta):
+    # Mesmo filtro, com a contagem de pedidos pelos esboços (as linhas não são lidas)
+    _garantir_base(caminho_csv, pasta)
+    etl.carregar_agregados()
+    etl.carregar_esbocos()
+    return etl.versao_atual(), analise.montar_filtro(categorias=['Classic']), True
+
+
+ETAPAS_SUITE = [
+    ('guardiao.validar_arquivo', _preparar_validacao, guardiao.validar_arquivo),
+    ('etl.processar_dados (completo)', _preparar_completo, _processar),
+    ('etl.processar_dados (streaming)', _preparar_streaming, _processar),
+    ('etl.carregar_dados', _preparar_carga, _carregar),
+    ('TypeAgent.converter_e_enriquecer', _preparar_enriquecimento, _enriquecer_polars),
+    ('agregações do Dashboard', _preparar_agregacoes, _agregacoes_dashboard),
+    ('agregações do Dashboard (categoria)', _preparar_agregacoes_categoria, _agregacoes_dashboard),
+    ('agregações do Dashboard (categoria, HLL)', _preparar_agregacoes_aproximada, _agregacoes_dashboard),
+]
+
+
+def bench_suite(args):
+    relatorio = bancada.executar_suite(ETAPAS_SUITE, _gerar_bloco, args.tamanhos, args.etapas, args.repeticoes)
+    if args.salvar:
+        bancada.salvar_relatorio(relatorio, args.salvar)
+        print(f"\nBaseline salva em {args.salvar}")
+    if args.comparar:
+        regressoes = bancada.comparar(relatorio, args.comparar, args.tolerancia)
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('alvo', choices=['datas', 'motores', 'memoria', 'pedidos', 'graficos', 'periodo', 'suite'])
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    # Opções da suite
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=bancada.TAMANHOS_PADRAO)
+    parser.add_argument('--etapas', nargs='+', help="Nomes das etapas (padrão: todas)")
+    parser.add_argument('--repeticoes', type=int, default=1)
+    parser.add_argument('--salvar', help="Grava o resultado (JSON) para servir de baseline")
+    parser.add_argument('--comparar', help="Baseline (JSON) para comparar; sai com código 1 se houver regressão")
+    parser.add_argument('--tolerancia', type=float, default=bancada.TOLERANCIA_PADRAO)
+    args = parser.parse_args()
+
+    if args.alvo == 'datas':
+        bench_datas(args.linhas)
+    elif args.alvo == 'motores':
+        bench_motores(args.linhas)
+    elif args.alvo == 'memoria':
+        bench_memoria(args.linhas)
+    elif args.alvo == 'pedidos':
+        bench_pedidos(args.linhas)
+    elif args.alvo == 'graficos':
+        bench_graficos(args.linhas)
+    elif args.alvo == 'periodo':
+        bench_periodo(args.linhas)
+    elif args.alvo == 'suite':
+        bench_suite(args)
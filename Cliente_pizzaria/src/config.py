@@ -11,7 +11,101 @@ MOEDA = "R$"
 # --- CAMINHOS ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INPUT_DIR = os.path.join(BASE_DIR, 'dados', 'input')
-ARQUIVO_PROCESSADO = os.path.join(INPUT_DIR, 'pizzaria_sales_processed.csv')
+
+# Saídas do motor Polars (ingestor.py): parquet enriquecido e flags de pronto
+# (as tarefas de ETL em segundo plano, tarefas.py, também publicam o status em FLAGS)
+DIRS = {
+    'TRUSTED': os.path.join(BASE_DIR, 'dados', 'trusted'),
+    'FLAGS': os.path.join(BASE_DIR, 'dados', 'flags'),
+}
+
+# --- ARMAZENAMENTO ---
+# 'parquet' (colunar e tipado, padrão), 'feather' ou 'csv'
+FORMATO_ARMAZENAMENTO = 'parquet'
+
+# Base processada particionada por data (vendas, cubo, pedidos e esboços; ver particoes.py),
+# publicada em versões (ver snapshots.py): cada carga grava uma pasta nova em
+# PASTA_VERSOES e troca o ponteiro ATUAL.json de uma vez
+PASTA_VERSOES = os.path.join(INPUT_DIR, 'pizzaria_versoes')
+# Versões mantidas para rollback (a atual nunca é apagada)
+VERSOES_RETIDAS = 5
+# 'M' = uma partição por mês, 'D' = por dia
+GRANULARIDADE_PARTICAO = 'M'
+
+# Bases das versões anteriores do sistema (migradas automaticamente):
+# a pasta particionada sem versões e os arquivos únicos
+PASTA_PROCESSADA_LEGADA = os.path.join(INPUT_DIR, 'pizzaria_sales')
+ARQUIVOS_LEGADOS = [
+    os.path.join(INPUT_DIR, f'pizzaria_sales_processed.{ext}') for ext in ('parquet', 'feather', 'csv')
+]
+
+# --- INGESTÃO ---
+# 'completo' lê o upload inteiro; 'streaming' processa em chunks de TAMANHO_CHUNK linhas
+# (memória constante para históricos grandes); 'incremental' anexa só as vendas novas
+MODO_INGESTAO = 'completo'
+TAMANHO_CHUNK = 100_000
+
+# Motor da carga completa: 'pandas' (etl.py) ou 'polars' (ingestor.py, plano lazy).
+# Com 'polars', linhas com qualquer campo nulo são descartadas na ingestão.
+# O pacote polars é opcional (fora do requirements.txt): instale-o para usar este motor.
+# Streaming e incremental sempre usam o motor pandas.
+MOTOR_ETL = 'pandas'
+
+# Identidade de uma linha de venda (deduplicação na carga incremental)
+CHAVE_LINHA = ['order_id', 'pizza_name', 'pizza_size']
+# Coluna usada como watermark da última venda ingerida
+COLUNA_WATERMARK = 'order_datetime'
+
+# --- SERVIÇO DE DADOS (servico_dados.py) ---
+# Uma cópia de cada base por processo, compartilhada pelas sessões do Dashboard.
+# Base sem sessões usando e sem acesso há TEMPO_OCIOSO_DADOS segundos é descarregada.
+TEMPO_OCIOSO_DADOS = 300
+# Lê as bases por memory map (Arrow IPC em PASTA_CACHE_DADOS): sem cópia e com
+# as páginas compartilhadas entre processos do mesmo host
+DADOS_MMAP = True
+PASTA_CACHE_DADOS = os.path.join(INPUT_DIR, 'cache')
+# KPIs e dados de gráfico memoizados por (versão, filtro) (analise.py), em LRU
+MAX_RESULTADOS = 256
+
+# --- CONTAGEM DE PEDIDOS (esbocos.py) ---
+# Com filtro de categoria/tamanho os pedidos distintos não saem da tabela de
+# pedidos: 'exata' conta nas linhas originais (nunique); 'aproximada' junta os
+# esboços HyperLogLog gravados no ETL por data × hora × categoria × tamanho,
+# sem ler as linhas. No modo aproximado o Dashboard oferece a contagem exata
+# (auditoria) na barra lateral.
+CONTAGEM_PEDIDOS = 'exata'
+# 2^PRECISAO_HLL registradores por esboço (até 15): erro típico 1,04/√(2^p),
+# ~1,6% com 12. Mudar exige reprocessar a base.
+PRECISAO_HLL = 12
+
+# --- DASHBOARD ---
+# Abas sob demanda: só a aba aberta calcula os KPIs e monta os gráficos; trocar
+# de aba roda o script de novo (st.tabs com on_change="rerun"). Desligado, as
+# duas abas rodam a cada interação e a troca de aba fica só no navegador.
+ABAS_SOB_DEMANDA = True
+
+# --- TAREFAS DE ETL EM SEGUNDO PLANO (tarefas.py) ---
+# Processos que executam os uploads. Tarefas do mesmo cliente gravam a mesma
+# base, então 1 = fila (uma por vez, na ordem de envio).
+MAX_TAREFAS_ETL = 1
+
+# --- INSTRUMENTAÇÃO (instrumentacao.py) ---
+# Tempo, linhas e variação de memória por etapa do ETL e por bloco do Dashboard:
+# painel "Desempenho" na barra lateral e uma linha JSON por trecho em
+# ARQUIVO_LOG_DESEMPENHO. Desligada, cada marcação custa uma chamada de função.
+INSTRUMENTACAO = False
+# Cada execução medida roda sob cProfile (.prof em PASTA_LOGS); no Dashboard
+# também pode ser ligado pelo painel, só para a próxima execução
+PERFIL_CPROFILE = False
+PASTA_LOGS = os.path.join(BASE_DIR, 'dados', 'logs')
+ARQUIVO_LOG_DESEMPENHO = os.path.join(PASTA_LOGS, 'desempenho.jsonl')
+
+# --- VALIDAÇÃO (GUARDIÃO) ---
+# % mínimo de linhas sem nenhum campo nulo para aceitar um arquivo
+INTEGRIDADE_MINIMA = 80.0
+# Mínimo do motor Polars (MOTOR_ETL = 'polars'), mais tolerante: ele descarta
+# na ingestão as linhas com nulos
+INTEGRIDADE_MINIMA_POLARS = 70.0
 
 # --- DEFINIÇÃO DO SCHEMA ---
 COLUNAS_OFICIAIS = [
@@ -25,6 +119,10 @@ COLUNAS_OFICIAIS = [
 # Colunas de Data
 COLUNAS_DATA = ['order_date', 'order_datetime']
 
+# Formatos aceitos nas colunas de data (detectados por amostragem; em caso de empate, vale a ordem)
+FORMATOS_DATA = ['%Y-%m-%d', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y %H:%M:%S']
+TAMANHO_AMOSTRA_DATAS = 1000
+
 # Colunas Numéricas
 COLUNAS_NUMERICAS = {
     'order_id': 'int64',
@@ -32,4 +130,30 @@ COLUNAS_NUMERICAS = {
     'quantity': 'int64',
     'pizza_price': 'float64',
     'total_item_value': 'float64'
-}
\ No newline at end of file
+}
+
+# Tipos compactos em memória e em disco (aplicados no ETL e na carga do Dashboard).
+# COLUNAS_NUMERICAS segue sendo o tipo da conversão; aqui fica o tipo final.
+# Inteiros só encolhem se os valores couberem; valores somados no Dashboard
+# (total_item_value) ficam em float64 para não perder centavos nos totais.
+PLANO_DTYPES = {
+    'order_id': 'int32',
+    'hour_of_day': 'int8',
+    'quantity': 'int16',
+    'pizza_price': 'float32',
+    'pizza_name': 'category',
+    'pizza_category': 'category',
+    'pizza_size': 'category',
+    'month_name': 'category',
+    'day_of_week': 'category',
+}
+
+# Colunas usadas pelo Dashboard (o resto não é lido do disco)
+COLUNAS_DASHBOARD = [
+    'order_id', 'order_date', 'hour_of_day',
+    'pizza_name', 'pizza_category', 'pizza_size',
+    'quantity', 'total_item_value'
+]
+
+# Dimensões do cubo de vendas (data × categoria × tamanho × hora × pizza)
+DIMENSOES_CUBO = ['order_date', 'pizza_category', 'pizza_size', 'hour_of_day', 'pizza_name']
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import config as cfg
+
+# ==============================================================================
+# CUBO DE VENDAS (PRÉ-AGREGADO PARA O DASHBOARD)
+# ==============================================================================
+# cubo:    soma de valor e quantidade por data × categoria × tamanho × hora × pizza.
+#          Responde a todos os totais e gráficos de soma, com qualquer filtro.
+# pedidos: pedidos distintos por data × hora. Como cada pedido pertence a um
+#          único dia e hora, as contagens podem ser somadas entre células e
+#          respondem a nunique(order_id) quando só o período está filtrado.
+#          Com filtro de categoria/tamanho um pedido pode cair em várias células,
+#          então o Dashboard volta às linhas originais para contar pedidos
+#          (ou, na contagem aproximada, aos esboços de esbocos.py).
+#
+# Todas as tabelas do Dashboard (linhas, cubo, pedidos, esboços) chegam
+# ordenadas por order_date (ver particoes.py e ordenar_por_data): o período é
+# uma fatia contígua, achada por busca binária, e só as linhas dela passam
+# pelos filtros de categoria e tamanho. O custo acompanha o período
+# selecionado, não o tamanho do histórico.
+
+METRICAS_CUBO = {
+    'total_item_value': ('total_item_value', 'sum'),
+    'quantity': ('quantity', 'sum'),
+    'linhas': ('order_id', 'size'),
+}
+
+
+def construir_cubo(df):
+    """Agrega as linhas de venda nas dimensões de cfg.DIMENSOES_CUBO."""
+    return (
+        df.groupby(cfg.DIMENSOES_CUBO, observed=True, sort=True)
+        .agg(**METRICAS_CUBO)
+        .reset_index()
+    )
+
+
+def combinar_cubos(partes):
+    """Junta cubos parciais (ex.: um por chunk) somando as métricas."""
+    cubo = pd.concat(partes, ignore_index=True)
+    return (
+        cubo.groupby(cfg.DIMENSOES_CUBO, observed=True, sort=True)
+        [list(METRICAS_CUBO)].sum()
+        .reset_index()
+    )
+
+
+def pedidos_distintos(df):
+    """Pares únicos (data, hora, pedido): base da contagem exata de pedidos."""
+    return df[['order_date', 'hour_of_day', 'order_id']].drop_duplicates()
+
+
+def construir_pedidos(pares):
+    """
+    Conta pedidos distintos por data × hora a partir de pedidos_distintos().
+    Retorna None se algum pedido aparecer em mais de uma célula (contagens não somáveis).
+    """
+    pares = pares.drop_duplicates()
+    if pares['order_id'].duplicated().any():
+        return None
+    return (
+        pares.groupby(['order_date', 'hour_of_day'], sort=True)
+        .size()
+        .reset_index(name='pedidos')
+    )
+
+
+# --- PERÍODO (TABELAS ORDENADAS POR DATA) ---
+
+def ordenar_por_data(tabela):
+    """A tabela ordenada por order_date (estável); já ordenada, volta sem cópia."""
+    if tabela['order_date'].is_monotonic_increasing:
+        return tabela
+    return tabela.sort_values('order_date', kind='stable', ignore_index=True)
+
+
+def periodo(tabela, inicio=None, fim=None):
+    """Posições [primeira, última) das linhas no período (datas inclusivas), por busca binária."""
+    datas = tabela['order_date']
+    primeira = int(datas.searchsorted(pd.Timestamp(inicio), side='left')) if inicio is not None else 0
+    ultima = len(tabela)
+    if fim is not None:
+        ultima = int(datas.searchsorted(pd.Timestamp(fim) + pd.Timedelta(days=1), side='left'))
+    return primeira, max(primeira, ultima)
+
+
+def fatiar(tabela, inicio=None, fim=None):
+    """Linhas do período, sem varrer a tabela (fatia de uma tabela ordenada por data)."""
+    primeira, ultima = periodo(tabela, inicio, fim)
+    return tabela.iloc[primeira:ultima]
+
+
+# --- FILTROS ---
+
+def aplicar_filtros(tabela, inicio=None, fim=None, categorias=None, tamanhos=None):
+    """
+    Filtra linhas, cubo ou tabela de pedidos (ordenados por data) pelo período
+    (datas inclusivas) e, se informados e a coluna existir, por categoria e tamanho.
+    """
+    fatia = fatiar(tabela, inicio, fim)
+    if not categorias and not tamanhos:
+        return fatia
+    return fatia[mascara(fatia, categorias=categorias, tamanhos=tamanhos)]
+
+
+def mascara(tabela, inicio=None, fim=None, categorias=None, tamanhos=None):
+    """Máscara booleana (Series) das linhas de 'tabela' (ordenada por data) que passam em aplicar_filtros."""
+    primeira, ultima = periodo(tabela, inicio, fim)
+    marcadas = np.zeros(len(tabela), dtype=bool)
+    marcadas[primeira:ultima] = True
+    mask = pd.Series(marcadas, index=tabela.index)
+    if categorias and 'pizza_category' in tabela.columns:
+        mask &= tabela['pizza_category'].isin(categorias)
+    if tamanhos and 'pizza_size' in tabela.columns:
+        mask &= tabela['pizza_size'].isin(tamanhos)
+    return mask
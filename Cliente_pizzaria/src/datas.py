@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import config as cfg
+
+# ==============================================================================
+# NORMALIZAÇÃO DE DATAS (DETECÇÃO DE FORMATO + PASSADA ÚNICA)
+# ==============================================================================
+# 1. Cada valor distinto é convertido uma única vez (datas se repetem muito
+#    em vendas: milhares de linhas por dia).
+# 2. O formato dominante é detectado numa amostra e aplicado a todos os valores.
+# 3. Só o que falhar é reprocessado com os formatos alternativos.
+
+
+def detectar_formatos(valores, formatos=None, tamanho_amostra=None):
+    """
+    Ordena os formatos candidatos pelo número de acertos numa amostra.
+    Retorna apenas os formatos que reconheceram algum valor (o melhor primeiro).
+    """
+    formatos = formatos or cfg.FORMATOS_DATA
+    tamanho_amostra = tamanho_amostra or cfg.TAMANHO_AMOSTRA_DATAS
+
+    valores = pd.Series(valores).dropna()
+    if len(valores) > tamanho_amostra:
+        passo = len(valores) // tamanho_amostra
+        valores = valores.iloc[::passo]
+
+    acertos = []
+    for posicao, fmt in enumerate(formatos):
+        qtd = pd.to_datetime(valores, format=fmt, errors='coerce').notna().sum()
+        if qtd > 0:
+            # Empate: vale a ordem definida no config
+            acertos.append((-qtd, posicao, fmt))
+
+    return [fmt for _, _, fmt in sorted(acertos)]
+
+
+def normalizar_datas(serie, formatos=None):
+    """
+    Converte uma coluna de texto em datetime64. Valores que nenhum formato
+    reconhece viram NaT (mesmo comportamento de errors='coerce').
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+
+    # Cache dos valores já convertidos: cada texto distinto é processado uma vez
+    codigos, unicos = pd.factorize(serie)
+    if len(unicos) == 0:
+        return pd.Series(pd.NaT, index=serie.index, name=serie.name, dtype='datetime64[ns]')
+    unicos = pd.Series(unicos, dtype='object')
+
+    ordem = detectar_formatos(unicos, formatos)
+    convertidos = pd.Series(pd.NaT, index=unicos.index, dtype='datetime64[ns]')
+
+    pendentes = unicos.index
+    for fmt in ordem:
+        parcial = pd.to_datetime(unicos.loc[pendentes], format=fmt, errors='coerce')
+        convertidos.loc[pendentes] = parcial
+        pendentes = parcial.index[parcial.isna()]
+        if len(pendentes) == 0:
+            break
+
+    valores = convertidos.to_numpy()
+    resultado = valores.take(codigos)
+    resultado[codigos < 0] = np.datetime64('NaT')
+    return pd.Series(resultado, index=serie.index, name=serie.name)
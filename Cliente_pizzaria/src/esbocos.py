@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import config as cfg
+
+# ==============================================================================
+# ESBOÇOS HYPERLOGLOG DE PEDIDOS DISTINTOS (CONTAGEM APROXIMADA)
+# ==============================================================================
+# Com filtro de categoria/tamanho, um pedido pode estar em várias células do
+# cubo e as contagens da tabela de pedidos não somam: a contagem exata precisa
+# de nunique(order_id) nas linhas originais. Com cfg.CONTAGEM_PEDIDOS =
+# 'aproximada', ela sai destes esboços, gravados no ETL junto do cubo.
+#
+# HyperLogLog com m = 2^cfg.PRECISAO_HLL registradores: o hash de cada pedido
+# escolhe um registrador (os primeiros PRECISAO bits) e o registrador guarda o
+# maior "posto" visto (zeros à esquerda do resto do hash + 1). Esboços se
+# juntam pelo máximo de cada registrador, então a contagem de qualquer
+# conjunto de células (período, categorias, tamanhos, hora) é o esboço das
+# células selecionadas, sem reler pedidos. Erro típico: 1,04 / √m.
+#
+# Formato esparso: uma linha por (data, hora, categoria, tamanho, registrador)
+# com o maior posto. Célula com poucos pedidos ocupa poucas linhas; nenhuma
+# passa de m linhas, qualquer que seja o volume do dia.
+#
+# Mudar cfg.PRECISAO_HLL exige reprocessar a base (os registradores mudam).
+
+DIMENSOES_ESBOCO = ['order_date', 'hour_of_day', 'pizza_category', 'pizza_size']
+
+_BITS = 64
+
+
+def _hash64(valores):
+    """Hash de 64 bits (finalizador do splitmix64) de inteiros, vetorizado."""
+    h = valores.astype(np.uint64)
+    with np.errstate(over='ignore'):
+        h = h + np.uint64(0x9E3779B97F4A7C15)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def _bits_significativos(valores):
+    """Nº de bits de cada uint64 (0 para 0); frexp é exato em cada metade de 32 bits."""
+    alto = (valores >> np.uint64(32)).astype(np.float64)
+    baixo = (valores & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(alto > 0, 32 + np.frexp(alto)[1], np.frexp(baixo)[1])
+
+
+def registradores(ids, precisao=None):
+    """(registrador, posto) de cada id no HyperLogLog de 2^precisao registradores."""
+    precisao = precisao or cfg.PRECISAO_HLL
+    h = _hash64(np.asarray(ids))
+    registrador = (h >> np.uint64(_BITS - precisao)).astype(np.int16)
+    resto = h << np.uint64(precisao)
+    # Zeros à esquerda do resto + 1; resto zerado vale o posto máximo
+    posto = np.minimum(_BITS - _bits_significativos(resto) + 1, _BITS - precisao + 1).astype(np.int8)
+    return registrador, posto
+
+
+# --- CONSTRUÇÃO (ETL) ---
+
+def construir_esbocos(df):
+    """Esboço esparso dos pedidos de cada célula (DIMENSOES_ESBOCO) das linhas de venda."""
+    registrador, posto = registradores(df['order_id'].to_numpy())
+    return _maximo(df[DIMENSOES_ESBOCO].assign(registrador=registrador, posto=posto))
+
+
+def combinar_esbocos(partes):
+    """Junta esboços (ex.: um por chunk) pelo máximo de cada registrador."""
+    if len(partes) == 1:
+        return partes[0]
+    return _maximo(pd.concat(partes, ignore_index=True))
+
+
+def _maximo(tabela):
+    return (
+        tabela.groupby(DIMENSOES_ESBOCO + ['registrador'], observed=True, sort=True)['posto']
+        .max()
+        .reset_index()
+    )
+
+
+# --- ESTIMATIVA (DASHBOARD) ---
+
+def juntar(tabela, coluna=None, selecao=None):
+    """
+    Junta os esboços das linhas de 'tabela' (só as marcadas na máscara 'selecao')
+    em registradores densos, um esboço por valor de 'coluna' (ex.: hour_of_day;
+    None = um só). Retorna (valores, matriz valores × m de postos).
+    """
+    m = 2 ** cfg.PRECISAO_HLL
+    registrador = tabela['registrador'].to_numpy(np.int64)
+    posto = tabela['posto'].to_numpy()
+    chaves = tabela[coluna].to_numpy() if coluna is not None else np.zeros(len(tabela), dtype=np.int8)
+    if selecao is not None:
+        selecao = np.asarray(selecao)
+        registrador, posto, chaves = registrador[selecao], posto[selecao], chaves[selecao]
+
+    grupos, valores = pd.factorize(chaves, sort=True)
+    registros = np.zeros((len(valores), m), dtype=np.int8)
+    np.maximum.at(registros, (grupos, registrador), posto)
+    return valores, registros
+
+
+def estimar(registros):
+    """Estimativa HyperLogLog (float) de cada linha da matriz de registradores."""
+    m = registros.shape[1]
+    alfa = 0.7213 / (1 + 1.079 / m)
+    bruta = alfa * m * m / np.exp2(-registros.astype(np.float64)).sum(axis=1)
+    # Poucos pedidos (registradores zerados): contagem linear, bem mais precisa
+    vazios = (registros == 0).sum(axis=1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(vazios, 1))
+    return np.where((bruta <= 2.5 * m) & (vazios > 0), linear, bruta)
+
+
+def estimar_total(registros):
+    """Pedidos distintos (aproximados) da união das linhas da matriz de registradores."""
+    if len(registros) == 0:
+        return 0
+    return int(round(estimar(registros.max(axis=0, keepdims=True))[0]))
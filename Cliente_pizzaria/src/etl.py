@@ -2,98 +2,447 @@ import pandas as pd
 import os
 import config as cfg
 import guardiao
+import instrumentacao
+import armazenamento
+import datas
+import cubo
+import esbocos
+import particoes
+import servico_dados
+import snapshots
 
-def processar_dados(uploaded_file):
-    """
-    Lê o arquivo, limpa aspas, aplica tipagem ISO (YYYY-MM-DD) e salva.
-    """
+# --- CACHE DE CARGA (serviço de dados do processo, compartilhado pelas sessões) ---
+# Chave: subpasta lida (vendas, cubo, pedidos, esbocos) + colunas pedidas; versão: nome
+# da versão publicada da base (snapshots.py), que não muda depois de publicada.
+# processar_dados ainda limpa o registro. Ver servico_dados.py (referências por
+# sessão e memory map).
+
+def invalidar_cache():
+    """Descarta os dados carregados em memória (as sessões abertas mantêm os seus até recarregar)."""
+    servico_dados.SERVICO.invalidar()
+    servico_dados.RESULTADOS.invalidar()
+
+
+def estatisticas_cache():
+    """Contadores de hits, misses e tempos de carga, mais bases e empréstimos em memória."""
+    return servico_dados.SERVICO.estatisticas()
+
+
+def _rebobinar(arquivo):
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+
+
+def _limpar_e_tipar(df):
+    """Etapa 3 do ETL: remove aspas, converte datas e numéricos e compacta os tipos (DataFrame ou chunk)."""
+    # A. Limpeza de caracteres indesejados (Aspas que vêm no CSV)
+    # O CSV enviado tem aspas em torno das datas: "2015-01-01"
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].astype(str).str.replace('"', '', regex=False).str.strip()
+
+    # B. Datas (formato detectado por amostragem; só as falhas tentam os demais formatos)
+    with instrumentacao.medir('etl.datas', len(df)):
+        for col in cfg.COLUNAS_DATA:
+            if col in df.columns:
+                df[col] = datas.normalizar_datas(df[col])
+
+    # C. Numéricos
+    for col, dtype in cfg.COLUNAS_NUMERICAS.items():
+        if col in df.columns:
+            if df[col].dtype == 'object':
+                 df[col] = df[col].astype(str).str.replace(',', '.', regex=False)
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+            
+            if 'int' in dtype:
+                df[col] = df[col].fillna(0).astype(dtype)
+
+    # D. Tipos compactos (categorias, inteiros e floats menores; ver cfg.PLANO_DTYPES)
+    return armazenamento.compactar_tipos(df, cfg.PLANO_DTYPES)
+
+
+def _mensagem_sucesso(linhas, perda):
+    msg_sucesso = f"Sucesso! {linhas} linhas processadas."
+    if perda > 0:
+        msg_sucesso += f" (Aviso: {perda} linhas removidas por data inválida)"
+    return msg_sucesso
+
+
+MSG_SEM_DATAS = "❌ Erro Crítico: Nenhuma data válida identificada. Verifique o formato YYYY-MM-DD."
+
+
+def _avisar(progresso, etapa, linhas=None):
+    """Informa a etapa atual (ver tarefas.ETAPAS) a quem acompanha o processamento e à instrumentação."""
+    instrumentacao.etapa(f"etl.{etapa}", linhas)
+    if progresso is not None:
+        progresso(etapa, linhas)
+
+
+def _ler_upload(uploaded_file):
+    """1. LEITURA ROBUSTA: detecta separador e encoding."""
     try:
-        # 1. LEITURA ROBUSTA
-        try:
-            df = pd.read_csv(uploaded_file, encoding='utf-8', sep=',')
-            # Se separou errado (tudo numa coluna só), tenta ponto e vírgula
-            if len(df.columns) < 2: 
-                uploaded_file.seek(0)
-                df = pd.read_csv(uploaded_file, encoding='utf-8', sep=';')
-        except UnicodeDecodeError:
+        df = pd.read_csv(uploaded_file, encoding='utf-8', sep=',')
+        # Se separou errado (tudo numa coluna só), tenta ponto e vírgula
+        if len(df.columns) < 2: 
             uploaded_file.seek(0)
-            df = pd.read_csv(uploaded_file, encoding='latin1', sep=';')
+            df = pd.read_csv(uploaded_file, encoding='utf-8', sep=';')
+    except UnicodeDecodeError:
+        uploaded_file.seek(0)
+        df = pd.read_csv(uploaded_file, encoding='latin1', sep=';')
+    return df
 
+
+def _preparar_upload(uploaded_file, progresso=None):
+    """
+    Etapas 1 a 4 com o arquivo inteiro em memória.
+    Retorna (df_limpo, linhas_perdidas, None) ou (None, 0, mensagem_de_erro).
+    """
+    _avisar(progresso, 'leitura')
+    try:
+        df = _ler_upload(uploaded_file)
     except Exception as e:
-        return False, f"Erro ao ler arquivo: {e}"
+        return None, 0, f"Erro ao ler arquivo: {e}"
 
     # 2. VALIDAÇÃO (GUARDIÃO)
+    _avisar(progresso, 'validacao', len(df))
     sucesso, msg = guardiao.validar_arquivo(df)
     if not sucesso:
-        return False, msg
+        return None, 0, msg
 
     # 3. DEFINIÇÃO DE TIPOS E LIMPEZA
+    _avisar(progresso, 'tipagem', len(df))
+    df = _limpar_e_tipar(df)
+
+    # 4. VERIFICAÇÃO FINAL
+    linhas_antes = len(df)
+    df_clean = df.dropna(subset=['order_date'])
+    perda = linhas_antes - len(df_clean)
+
+    if df_clean.empty:
+        return None, 0, MSG_SEM_DATAS
+    return df_clean, perda, None
+
+
+@instrumentacao.medido('etl.processar_dados')
+def processar_dados(uploaded_file, modo=None, progresso=None):
+    """
+    Lê o arquivo, limpa aspas, tipa datas (formato detectado) e números e salva.
+    modo (se omitido, usa cfg.MODO_INGESTAO):
+      'completo'    substitui a base; arquivo inteiro em memória
+      'streaming'   substitui a base; arquivo lido em chunks
+      'incremental' anexa só as vendas novas à base existente
+    Na carga completa, cfg.MOTOR_ETL = 'polars' usa o ingestor.py no lugar do pandas.
+    progresso(etapa, linhas), se informado, é chamado a cada etapa (ver tarefas.py).
+    """
+    modo = modo or cfg.MODO_INGESTAO
+    if modo == 'streaming':
+        return _processar_streaming(uploaded_file, progresso)
+    if modo == 'completo' and cfg.MOTOR_ETL == 'polars':
+        return _processar_polars(uploaded_file, progresso)
+
     try:
-        # A. Limpeza de caracteres indesejados (Aspas que vêm no CSV)
-        # O CSV enviado tem aspas em torno das datas: "2015-01-01"
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                df[col] = df[col].astype(str).str.replace('"', '', regex=False).str.strip()
+        df_clean, perda, erro = _preparar_upload(uploaded_file, progresso)
+        if erro:
+            return False, erro
 
-        # B. Datas (Estratégia Híbrida: Prioridade ISO YYYY-MM-DD)
-        for col in cfg.COLUNAS_DATA:
-            if col in df.columns:
-                # Tenta formato ISO primeiro (2015-01-01) - Padrão do seu arquivo
-                iso_dates = pd.to_datetime(df[col], format='%Y-%m-%d', errors='coerce')
-                
-                # Tenta formato BR depois (01/01/2015) para o que falhou
-                br_dates = pd.to_datetime(df[col], format='%d/%m/%Y', errors='coerce')
-                
-                # Combina: Usa ISO, preenche falhas com BR
-                df[col] = iso_dates.fillna(br_dates)
-
-        # C. Numéricos
-        for col, dtype in cfg.COLUNAS_NUMERICAS.items():
-            if col in df.columns:
-                if df[col].dtype == 'object':
-                     df[col] = df[col].astype(str).str.replace(',', '.', regex=False)
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                if 'int' in dtype:
-                    df[col] = df[col].fillna(0).astype(dtype)
-
-        # 4. VERIFICAÇÃO FINAL
-        linhas_antes = len(df)
-        df_clean = df.dropna(subset=['order_date'])
-        linhas_depois = len(df_clean)
-        
-        perda = linhas_antes - linhas_depois
-        
-        if df_clean.empty:
-            return False, "❌ Erro Crítico: Nenhuma data válida identificada. Verifique o formato YYYY-MM-DD."
-
-        # 5. SALVAMENTO
-        os.makedirs(cfg.INPUT_DIR, exist_ok=True)
-        df_clean.to_csv(cfg.ARQUIVO_PROCESSADO, index=False, encoding='utf-8')
-        
-        msg_sucesso = f"Sucesso! {linhas_depois} linhas processadas."
-        if perda > 0:
-            msg_sucesso += f" (Aviso: {perda} linhas removidas por data inválida)"
+        if modo == 'incremental' and versao_atual() is not None:
+            _avisar(progresso, 'gravacao', len(df_clean))
+            return _processar_incremental(df_clean, perda)
+
+        # 5. SALVAMENTO (partições + cubo pré-agregado, publicados de uma vez no fim)
+        escritor = particoes.EscritorParticionado()
+        try:
+            _avisar(progresso, 'enriquecimento', len(df_clean))
+            escritor.escrever(df_clean)
+            _avisar(progresso, 'gravacao', len(df_clean))
+            escritor.concluir()
+        except BaseException:
+            escritor.descartar()
+            raise
+        invalidar_cache()
             
-        return True, msg_sucesso
+        return True, _mensagem_sucesso(len(df_clean), perda)
+
+    except Exception as e:
+        return False, f"Erro no processamento: {e}"
+
+
+# --- MOTOR POLARS (cfg.MOTOR_ETL = 'polars') ---
+
+def _processar_polars(uploaded_file, progresso=None):
+    """
+    Carga completa pelo ingestor.py; publica na mesma base particionada do Dashboard.
+    O plano lazy faz leitura, validação e tipagem de uma vez: só 'leitura' é informada.
+    """
+    try:
+        # Polars só é exigido quando este motor é escolhido
+        import ingestor
+    except ImportError:
+        return False, "Motor 'polars' indisponível: instale o pacote polars."
+
+    try:
+        _avisar(progresso, 'leitura')
+        sucesso, msg, _ = ingestor.salvar_pipeline(uploaded_file)
+    except Exception as e:
+        return False, f"Erro no processamento: {e}"
+    if sucesso:
+        invalidar_cache()
+    return sucesso, msg
+
+
+# --- INGESTÃO EM STREAMING (CHUNKS) ---
+# Cada chunk passa por validação, limpeza e tipagem e é anexado às partições
+# da base nova (publicada só no fim). Só um chunk fica em memória por vez.
+
+def _detectar_leitura(arquivo):
+    """Descobre encoding e separador lendo apenas o cabeçalho."""
+    try:
+        cabecalho = pd.read_csv(arquivo, encoding='utf-8', sep=',', nrows=0)
+        return 'utf-8', (',' if len(cabecalho.columns) >= 2 else ';')
+    except UnicodeDecodeError:
+        return 'latin1', ';'
+    finally:
+        _rebobinar(arquivo)
+
+
+def _ingerir_chunks(arquivo, encoding, sep, progresso=None):
+    _avisar(progresso, 'leitura')
+    escritor = particoes.EscritorParticionado()
+    # Limite superior de linhas (quebras de linha): permite reprovar sem ler o resto
+    integridade = guardiao.Integridade(total_previsto=guardiao.limite_linhas(arquivo))
+
+    try:
+        # O schema do primeiro chunk gravado vale para os demais (ver EscritorIncremental)
+        leitor = pd.read_csv(arquivo, encoding=encoding, sep=sep, chunksize=cfg.TAMANHO_CHUNK)
+        for i, chunk in enumerate(leitor):
+            # 2. VALIDAÇÃO (GUARDIÃO): colunas no primeiro chunk, nulos somados em todos
+            if i == 0:
+                _avisar(progresso, 'validacao')
+                sucesso, msg = guardiao.verificar_colunas(chunk.columns)
+                if not sucesso:
+                    escritor.descartar()
+                    return False, msg
+            integridade.adicionar(chunk)
+            if integridade.inviavel():
+                # Nem com o resto do arquivo sem nulos o mínimo seria atingido
+                integridade.interrompida = True
+                break
+
+            # 3. TIPAGEM E 4. FILTRO DE DATAS
+            _avisar(progresso, 'tipagem', integridade.linhas)
+            chunk = _limpar_e_tipar(chunk).dropna(subset=['order_date'])
+
+            # 5. SALVAMENTO (anexa às partições em montagem)
+            escritor.escrever(chunk)
+    except BaseException:
+        escritor.descartar()
+        raise
 
+    sucesso, msg = integridade.avaliar()
+    if not sucesso:
+        escritor.descartar()
+        return False, msg
+
+    if escritor.linhas == 0:
+        escritor.descartar()
+        return False, MSG_SEM_DATAS
+
+    try:
+        _avisar(progresso, 'gravacao', escritor.linhas)
+        escritor.concluir()
+    except BaseException:
+        escritor.descartar()
+        raise
+    invalidar_cache()
+    return True, _mensagem_sucesso(escritor.linhas, integridade.linhas - escritor.linhas)
+
+
+def _processar_streaming(uploaded_file, progresso=None):
+    try:
+        encoding, sep = _detectar_leitura(uploaded_file)
+        try:
+            return _ingerir_chunks(uploaded_file, encoding, sep, progresso)
+        except UnicodeDecodeError:
+            # Mesmo fallback da leitura completa: latin1 com ponto e vírgula
+            if encoding == 'latin1':
+                raise
+            _rebobinar(uploaded_file)
+            return _ingerir_chunks(uploaded_file, 'latin1', ';', progresso)
     except Exception as e:
         return False, f"Erro no processamento: {e}"
 
 
-def carregar_dados():
-    """Lê o arquivo processado para o Dashboard"""
-    if not os.path.exists(cfg.ARQUIVO_PROCESSADO):
+# --- INGESTÃO INCREMENTAL ---
+
+def _processar_incremental(df_clean, perda):
+    """5. SALVAMENTO incremental: só as partições tocadas pelo lote são regravadas."""
+    novas, duplicadas, afetadas = particoes.mesclar_delta(df_clean)
+    invalidar_cache()
+
+    msg_sucesso = f"Sucesso! {novas} linhas novas em {len(afetadas)} partição(ões)."
+    if duplicadas > 0:
+        msg_sucesso += f" {duplicadas} linhas já existentes foram ignoradas."
+    if perda > 0:
+        msg_sucesso += f" (Aviso: {perda} linhas removidas por data inválida)"
+    return True, msg_sucesso
+
+
+# --- CARGA PARA O DASHBOARD ---
+
+def _tipar_datas(df):
+    """Garante datetime nas colunas de data (o CSV perde a tipagem)."""
+    for col in cfg.COLUNAS_DATA:
+        if col in df.columns:
+            df[col] = datas.normalizar_datas(df[col])
+    return df
+
+
+def _tipar(df):
+    """Datas e tipos compactos (cfg.PLANO_DTYPES) de uma tabela lida do disco."""
+    return armazenamento.compactar_tipos(_tipar_datas(df), cfg.PLANO_DTYPES)
+
+
+def _atualizar_agregados(raiz):
+    """Recalcula cubo/pedidos/esboços das partições de vendas sem eles ou com cubo mais antigo."""
+    for chave in particoes.listar_particoes('vendas', raiz):
+        caminho_cubo = particoes.caminho_particao('cubo', chave, raiz)
+        caminho_vendas = particoes.caminho_particao('vendas', chave, raiz)
+        if os.path.exists(caminho_cubo) and os.path.getmtime(caminho_cubo) >= os.path.getmtime(caminho_vendas) \
+                and os.path.exists(particoes.caminho_particao('esbocos', chave, raiz)):
+            continue
+        df = _tipar_datas(armazenamento.ler_tabela(caminho_vendas, cfg.COLUNAS_DASHBOARD))
+        particoes.gravar_agregados(cubo.construir_cubo(df), cubo.pedidos_distintos(df),
+                                   esbocos.construir_esbocos(df), chave, raiz)
+
+
+def _migrar_pasta_legada():
+    """A pasta particionada sem versões vira a primeira versão (hard links; cubos que faltarem são montados)."""
+    nova = snapshots.NovaVersao(cfg.PASTA_PROCESSADA_LEGADA)
+    try:
+        _atualizar_agregados(nova.raiz)
+        watermark = particoes.ler_watermark(nova.raiz) or {}
+        nova.publicar(linhas=watermark.get('linhas'), carga='migracao')
+    except BaseException:
+        nova.descartar()
+        raise
+
+
+def migrar_processado_legado():
+    """
+    Migração única: as bases das versões anteriores (pasta particionada sem
+    versões, cfg.PASTA_PROCESSADA_LEGADA, ou arquivo único, cfg.ARQUIVOS_LEGADOS)
+    viram a primeira versão da base (snapshots.py).
+    """
+    if snapshots.versao_atual() is not None:
+        return False
+
+    if particoes.existe_base(cfg.PASTA_PROCESSADA_LEGADA):
+        _migrar_pasta_legada()
+        invalidar_cache()
+        return True
+
+    legados = [caminho for caminho in cfg.ARQUIVOS_LEGADOS if os.path.exists(caminho)]
+    if not legados:
+        return False
+
+    df = _tipar(armazenamento.ler_tabela(legados[0]))
+    escritor = particoes.EscritorParticionado()
+    try:
+        escritor.escrever(df.dropna(subset=['order_date']))
+        escritor.concluir()
+    except BaseException:
+        escritor.descartar()
+        raise
+    invalidar_cache()
+    return True
+
+
+def _ler_com_cache(subpasta, colunas, versao, sessao=None):
+    """
+    Partições de 'subpasta' da 'versao', lidas uma vez e compartilhadas entre as sessões.
+    Com 'sessao' (st.session_state) a sessão mantém a base em memória enquanto a usar.
+    """
+    # Ordenada por data (cubo.fatiar); 'por_data' separa do cache em disco as cópias de antes da ordenação
+    chave = (cfg.PASTA_VERSOES, subpasta, tuple(colunas) if colunas is not None else None, 'por_data')
+    raiz = snapshots.pasta_versao(versao)
+    return servico_dados.SERVICO.obter(
+        chave, versao, lambda: cubo.ordenar_por_data(_tipar(particoes.ler(subpasta, colunas, raiz=raiz))), sessao)
+
+
+def versao_atual():
+    """
+    Versão publicada da base (migrando a legada, se for o caso); None se não houver.
+    O Dashboard a resolve uma vez por execução e a passa às cargas (versão fixada).
+    """
+    try:
+        migrar_processado_legado()
+    except Exception as e:
+        print(f"Erro ao migrar base legada: {e}")
+    return snapshots.versao_atual()
+
+
+@instrumentacao.medido('etl.carregar_dados')
+def carregar_dados(colunas=None, sessao=None, versao=None):
+    """
+    Lê a base processada para o Dashboard.
+    'colunas' limita a leitura às colunas usadas (ex.: cfg.COLUNAS_DASHBOARD).
+    O DataFrame retornado é compartilhado entre as sessões: é somente leitura.
+    'sessao' (st.session_state) registra o uso da base pela sessão.
+    'versao' fixa a versão lida (padrão: a atual).
+    """
+    versao = versao or versao_atual()
+    if versao is None or not particoes.existe_base(snapshots.pasta_versao(versao)):
         return None
-    
+
     try:
-        df = pd.read_csv(cfg.ARQUIVO_PROCESSADO)
-        
-        for col in cfg.COLUNAS_DATA:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col])
-        
-        return df
+        return _ler_com_cache('vendas', colunas, versao, sessao)
     except Exception as e:
         print(f"Erro ao carregar dados processados: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+# --- AGREGADOS (CUBO) ---
+
+@instrumentacao.medido('etl.carregar_agregados')
+def carregar_agregados(sessao=None, versao=None):
+    """
+    Retorna (cubo, pedidos) para o Dashboard; pedidos é None quando a contagem
+    por data × hora não pode ser somada em alguma partição.
+    'sessao' (st.session_state) registra o uso das tabelas pela sessão.
+    'versao' fixa a versão lida (padrão: a atual).
+    """
+    versao = versao or versao_atual()
+    raiz = snapshots.pasta_versao(versao) if versao else None
+    if raiz is None or not particoes.existe_base(raiz):
+        return None, None
+
+    try:
+        tabela_cubo = _ler_com_cache('cubo', None, versao, sessao)
+
+        pedidos = None
+        if particoes.listar_particoes('pedidos', raiz) == particoes.listar_particoes('vendas', raiz):
+            pedidos = _ler_com_cache('pedidos', None, versao, sessao)
+
+        return tabela_cubo, pedidos
+    except Exception as e:
+        print(f"Erro ao carregar agregados: {e}")
+        return None, None
+
+
+@instrumentacao.medido('etl.carregar_esbocos')
+def carregar_esbocos(sessao=None, versao=None):
+    """
+    Esboços HyperLogLog dos pedidos (esbocos.py) para a contagem aproximada;
+    None se alguma partição não tiver esboço (versões gravadas antes deles).
+    'sessao' e 'versao' como em carregar_agregados.
+    """
+    versao = versao or versao_atual()
+    raiz = snapshots.pasta_versao(versao) if versao else None
+    if raiz is None or particoes.listar_particoes('esbocos', raiz) != particoes.listar_particoes('vendas', raiz):
+        return None
+
+    try:
+        return _ler_com_cache('esbocos', None, versao, sessao)
+    except Exception as e:
+        print(f"Erro ao carregar esboços: {e}")
+        return None
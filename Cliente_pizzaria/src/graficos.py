@@ -0,0 +1,117 @@
+import hashlib
+from functools import wraps
+import pandas as pd
+import plotly.express as px
+import servico_dados
+
+# ==============================================================================
+# CAMADA DE GRÁFICOS (FIGURAS PLOTLY DAS TABELAS DA ANÁLISE, SEM STREAMLIT)
+# ==============================================================================
+# Cada função recebe a tabela pequena, já agregada, de um gráfico (analise.py)
+# e devolve a figura. O plotly express leva dezenas de ms por figura mesmo com
+# poucas linhas de dados, e cada execução do Dashboard montava todas de novo:
+# as figuras ficam em FIGURAS, com a chave (gráfico, hash do conteúdo da
+# tabela). Mesma tabela, mesma figura, qualquer que seja a sessão ou o filtro
+# que a gerou. As figuras são compartilhadas: somente leitura (o
+# st.plotly_chart não as altera).
+#
+# O tema escuro (TEMA_ESCURO) é aplicado num lugar só, no decorador figura().
+# Fica no layout da figura e não num template do plotly: com o tema
+# "streamlit", o navegador sobrescreve o layout do template (fundo, fonte,
+# grade) com as cores do Streamlit, e o layout da figura é o que prevalece.
+
+# --- DEFINIÇÃO DE CORES (Tema Dark / Cliente) ---
+CORES = {
+    'primary': '#E0211B',      # Vermelho Impulsa (Destaques)
+    'secondary': '#E5E5E5',    # Texto Claro (para fundo escuro)
+    'background': '#000000',   # Fundo Preto solicitado
+    'card_bg': '#1A1A1A',      # Fundo dos Cartões (Cinza Escuro)
+    'charts': ['#E0211B', '#F47C7C', '#FFB7B2', '#A31612', '#680E0B']
+}
+COR_GRADE = '#333333'
+
+TEMA_ESCURO = dict(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="white")
+
+FIGURAS_RETIDAS = 64
+
+FIGURAS = servico_dados.CacheResultados(limite=FIGURAS_RETIDAS)
+
+
+def assinatura(tabela):
+    """Hash do conteúdo de uma tabela (valores, índice e nomes das colunas)."""
+    h = hashlib.sha1(pd.util.hash_pandas_object(tabela, index=True).to_numpy().tobytes())
+    h.update(repr(list(tabela.columns)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def figura(construir):
+    """
+    Decorador: construir(tabela) passa a devolver a figura guardada em FIGURAS
+    para o mesmo conteúdo de tabela, já com o TEMA_ESCURO.
+    A função original fica em .__wrapped__ (figura sem cache nem tema).
+    """
+    @wraps(construir)
+    def memorizada(tabela):
+        chave = (construir.__qualname__, assinatura(tabela))
+        return FIGURAS.obter(chave, lambda: construir(tabela).update_layout(**TEMA_ESCURO))
+    return memorizada
+
+
+# --- SETOR MONETÁRIO ---
+
+@figura
+def linha_evolucao(tabela):
+    """Linha do faturamento por dia (analise.evolucao_faturamento)."""
+    fig = px.line(tabela, x='order_date', y='total_item_value', markers=True)
+    fig.update_traces(line_color=CORES['primary'], line_width=3)
+    return fig.update_layout(
+        xaxis_title=None, yaxis_title="Vendas (R$)",
+        xaxis=dict(showgrid=False), yaxis=dict(showgrid=True, gridcolor=COR_GRADE),
+        hovermode="x unified"
+    )
+
+
+@figura
+def rosca_categorias(tabela):
+    """Rosca da receita por categoria (analise.receita_por_categoria)."""
+    fig = px.pie(tabela, values='total_item_value', names='pizza_category',
+                 hole=0.6, color_discrete_sequence=CORES['charts'])
+    fig.update_layout(showlegend=True, legend=dict(orientation="h", y=-0.1))
+    return fig.update_traces(textposition='inside', textinfo='percent+label')
+
+
+# --- PRODUTOS E OPERAÇÃO ---
+
+@figura
+def barras_ranking(tabela):
+    """Barras horizontais das pizzas mais vendidas (analise.ranking_pizzas)."""
+    fig = px.bar(tabela, x='quantity', y='pizza_name', orientation='h', text_auto=True)
+    fig.update_traces(marker_color=CORES['primary'])
+    return fig.update_layout(
+        xaxis_title="Quantidade Vendida", yaxis_title=None,
+        xaxis=dict(showgrid=True, gridcolor=COR_GRADE)
+    )
+
+
+@figura
+def colunas_picos_horario(tabela):
+    """Colunas dos pedidos por hora (analise.pedidos_por_hora)."""
+    fig = px.bar(tabela, x='hour_of_day', y='order_id')
+    fig.update_traces(marker_color='#444444') # Cinza médio
+    return fig.update_layout(
+        xaxis_title="Hora", yaxis_title="Pedidos",
+        bargap=0.2,
+        yaxis=dict(gridcolor=COR_GRADE)
+    )
+
+
+@figura
+def colunas_tamanho(tabela):
+    """Colunas das pizzas vendidas por tamanho (analise.volume_por_tamanho)."""
+    fig = px.bar(tabela, x='pizza_size', y='quantity', text_auto=True)
+    fig.update_traces(marker_color=CORES['primary'])
+    return fig.update_layout(
+        xaxis_title="Tamanho da Pizza", yaxis_title="Quantidade Vendida",
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=True, gridcolor=COR_GRADE)
+    )
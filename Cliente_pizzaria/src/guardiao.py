@@ -1,31 +1,166 @@
+import numpy as np
 import pandas as pd
 import config as cfg
 
-def validar_arquivo(df):
-    """
-    1. Verifica Padronização (Colunas).
-    2. Verifica Integridade (>80% linhas preenchidas).
-    Retorna: (Sucesso: bool, Mensagem: str)
-    """
-    
-    # 1. VERIFICAÇÃO DE COLUNAS (PADRONIZAÇÃO)
-    cols_arquivo = set(df.columns)
+# ==============================================================================
+# GUARDIÃO: PADRONIZAÇÃO E INTEGRIDADE
+# ==============================================================================
+# Mesmo código para a pizzaria e a imobiliária (muda só o config).
+# A integridade é medida coluna a coluna: a única máscara em memória é a das
+# linhas do bloco (1 booleano por linha), nunca uma matriz linhas × colunas.
+# Arquivos grandes são validados em blocos (chunks) somando as contagens, e a
+# validação para assim que o mínimo (cfg.INTEGRIDADE_MINIMA) não puder mais
+# ser atingido, se o total de linhas (ou um limite superior) for conhecido.
+
+TAMANHO_BLOCO_LEITURA = 64 * 1024 * 1024
+MAX_AMOSTRA_FALHAS = 5
+
+
+def verificar_colunas(colunas):
+    """Confere se todas as colunas oficiais estão presentes."""
+    cols_arquivo = set(colunas)
     cols_esperadas = set(cfg.COLUNAS_OFICIAIS)
-    
+
     if not cols_esperadas.issubset(cols_arquivo):
         faltantes = cols_esperadas - cols_arquivo
         return False, f"❌ Erro de Padronização: Faltam as colunas {faltantes}"
+    return True, ""
+
 
-    # 2. VERIFICAÇÃO DE INTEGRIDADE (REGRA 80%)
-    total_linhas = len(df)
+def _pct(total_linhas, linhas_com_nulos):
+    return ((total_linhas - linhas_com_nulos) / total_linhas) * 100
+
+
+def avaliar_integridade(total_linhas, linhas_com_nulos, minimo=None):
+    """Aplica a regra do mínimo (padrão cfg.INTEGRIDADE_MINIMA, em %) sobre as contagens."""
+    minimo = cfg.INTEGRIDADE_MINIMA if minimo is None else minimo
     if total_linhas == 0:
         return False, "❌ Arquivo vazio."
 
-    # Conta linhas com nulos
-    nulos = df.isnull().any(axis=1).sum()
-    pct_integridade = ((total_linhas - nulos) / total_linhas) * 100
+    pct_integridade = _pct(total_linhas, linhas_com_nulos)
+
+    if pct_integridade < minimo:
+        return False, f"❌ REPROVADO: Integridade crítica ({pct_integridade:.2f}%). Mínimo aceitável: {minimo:g}%."
+
+    return True, f"✅ Aprovado: Integridade de {pct_integridade:.2f}%."
+
+
+def limite_linhas(arquivo):
+    """
+    Limite superior de linhas de dados de um CSV: número de quebras de linha.
+    Lê o arquivo em blocos (memória constante) e volta ao início.
+    """
+    total = 0
+    while True:
+        bloco = arquivo.read(TAMANHO_BLOCO_LEITURA)
+        if not bloco:
+            break
+        total += bloco.count(b'\n' if isinstance(bloco, bytes) else '\n')
+    arquivo.seek(0)
+    return total
+
+
+class Integridade:
+    """
+    Contagens de integridade acumuladas (arquivo inteiro ou soma de chunks):
+    linhas, linhas com pelo menos um nulo, nulos por coluna e as primeiras
+    linhas reprovadas. 'total_previsto' (limite superior do número de linhas)
+    permite parar cedo com inviavel(); quem parar de ler marca 'interrompida'.
+    """
+
+    def __init__(self, minimo=None, total_previsto=None):
+        self.minimo = cfg.INTEGRIDADE_MINIMA if minimo is None else minimo
+        self.total_previsto = total_previsto
+        self.linhas = 0
+        self.linhas_com_nulos = 0
+        self.nulos_por_coluna = {}
+        self.amostra_falhas = []
+        self.interrompida = False
+
+    def somar(self, linhas, linhas_com_nulos, nulos_por_coluna=None):
+        """Soma contagens já calculadas (ex.: pelo motor Polars)."""
+        self.linhas += linhas
+        self.linhas_com_nulos += linhas_com_nulos
+        for col, qtd in (nulos_por_coluna or {}).items():
+            self.nulos_por_coluna[col] = self.nulos_por_coluna.get(col, 0) + int(qtd)
+
+    def adicionar(self, df):
+        """
+        Soma um DataFrame ou chunk, coluna a coluna. Para antes da última
+        coluna (e marca 'interrompida') se o mínimo ficar inatingível.
+        """
+        falhas = np.zeros(len(df), dtype=bool)
+        ultima = len(df.columns) - 1
+        for i, col in enumerate(df.columns):
+            nulos = df[col].isna().to_numpy()
+            qtd = int(nulos.sum())
+            self.nulos_por_coluna[col] = self.nulos_por_coluna.get(col, 0) + qtd
+            if qtd:
+                falhas |= nulos
+                if i < ultima and self._inviavel(self.linhas_com_nulos + int(falhas.sum())):
+                    self.interrompida = True
+                    break
+
+        if len(self.amostra_falhas) < MAX_AMOSTRA_FALHAS:
+            faltam = MAX_AMOSTRA_FALHAS - len(self.amostra_falhas)
+            # Número da linha de dados (1 = primeira linha após o cabeçalho)
+            self.amostra_falhas += (np.flatnonzero(falhas)[:faltam] + self.linhas + 1).tolist()
+
+        self.linhas += len(df)
+        self.linhas_com_nulos += int(falhas.sum())
+
+    def _inviavel(self, linhas_com_nulos):
+        if not self.total_previsto:
+            return False
+        # Melhor caso: todas as linhas ainda não lidas sem nulos
+        return _pct(self.total_previsto, linhas_com_nulos) < self.minimo
+
+    def inviavel(self):
+        """True quando, mesmo sem novos nulos, o mínimo não pode mais ser atingido."""
+        return self._inviavel(self.linhas_com_nulos)
+
+    def taxas_nulos(self):
+        """% de nulos por coluna (sobre as linhas contadas), da maior para a menor."""
+        if self.linhas == 0:
+            return {}
+        taxas = {col: qtd / self.linhas * 100 for col, qtd in self.nulos_por_coluna.items()}
+        return dict(sorted(taxas.items(), key=lambda item: -item[1]))
+
+    def _detalhes(self):
+        piores = [f"{col} ({taxa:.1f}%)" for col, taxa in self.taxas_nulos().items() if taxa > 0][:3]
+        detalhes = ""
+        if piores:
+            detalhes += f" Colunas com mais nulos: {', '.join(piores)}."
+        if self.amostra_falhas:
+            detalhes += f" Primeiras linhas com nulos: {', '.join(map(str, self.amostra_falhas))}."
+        return detalhes
 
-    if pct_integridade < 80.0:
-        return False, f"❌ REPROVADO: Integridade crítica ({pct_integridade:.2f}%). Mínimo aceitável: 80%."
+    def avaliar(self):
+        """(sucesso, mensagem) da regra do mínimo, com as colunas mais nulas se reprovar."""
+        if self.interrompida:
+            pct_maximo = _pct(self.total_previsto, self.linhas_com_nulos)
+            return False, (f"❌ REPROVADO: Integridade crítica (no máximo {pct_maximo:.2f}%; validação "
+                           f"interrompida). Mínimo aceitável: {self.minimo:g}%." + self._detalhes())
+
+        sucesso, msg = avaliar_integridade(self.linhas, self.linhas_com_nulos, self.minimo)
+        if not sucesso and self.linhas > 0:
+            msg += self._detalhes()
+        return sucesso, msg
+
+
+def validar_arquivo(df):
+    """
+    1. Verifica Padronização (Colunas).
+    2. Verifica Integridade (mínimo de cfg.INTEGRIDADE_MINIMA % de linhas preenchidas).
+    Retorna: (Sucesso: bool, Mensagem: str)
+    """
+
+    # 1. VERIFICAÇÃO DE COLUNAS (PADRONIZAÇÃO)
+    sucesso, msg = verificar_colunas(df.columns)
+    if not sucesso:
+        return False, msg
 
-    return True, f"✅ Aprovado: Integridade de {pct_integridade:.2f}%."
\ No newline at end of file
+    # 2. VERIFICAÇÃO DE INTEGRIDADE (coluna a coluna; para quando o mínimo fica inatingível)
+    integridade = Integridade(total_previsto=len(df))
+    integridade.adicionar(df)
+    return integridade.avaliar()
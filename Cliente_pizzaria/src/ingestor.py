@@ -4,146 +4,256 @@ import json
 import tempfile
 from datetime import datetime
 import config as cfg
+import guardiao
+import armazenamento
+import particoes
+
+# ==============================================================================
+# MOTOR POLARS (cfg.MOTOR_ETL = 'polars')
+# ==============================================================================
+# Contagem, filtro de nulos e tipagem ficam num único plano lazy: o arquivo é
+# lido uma vez e estatísticas e linhas limpas saem do mesmo collect_all.
+# A tipagem segue o config (COLUNAS_DATA, FORMATOS_DATA, COLUNAS_NUMERICAS),
+# como no etl.py; a heurística do TypeAgent só atua nas demais colunas de texto.
+
+NULOS = ["", " ", "null", "nan", "NaN", "NA", "None"]
+
+
+# --- TIPAGEM PELO CONFIG (EXPRESSÕES DO PLANO) ---
+
+def _expr_data(col, tipo):
+    """Primeiro formato de cfg.FORMATOS_DATA que reconhecer o valor (datetime[ns])."""
+    if tipo != pl.String:
+        return pl.col(col).cast(pl.Datetime('ns'), strict=False)
+    # cache=True: cada texto distinto é convertido uma vez
+    return pl.coalesce([
+        pl.col(col).str.strptime(pl.Datetime('ns'), fmt, strict=False, cache=True)
+        for fmt in cfg.FORMATOS_DATA
+    ])
+
+
+def _expr_numero(col, tipo, dtype):
+    """Mesmo resultado do to_numeric(errors='coerce') do etl.py; inteiros nulos viram 0."""
+    expr = pl.col(col)
+    if tipo == pl.String:
+        expr = expr.str.replace(',', '.', literal=True)
+    expr = expr.cast(pl.Float64, strict=False)
+    if 'int' in dtype:
+        expr = expr.fill_null(0).cast(pl.Int64)
+    return expr
+
+
+def _plano_tipagem(schema):
+    """Expressões que tipam as colunas conhecidas; as demais seguem como estão."""
+    exprs = []
+    for col, tipo in schema.items():
+        if col in cfg.COLUNAS_DATA:
+            exprs.append(_expr_data(col, tipo).alias(col))
+        elif col in cfg.COLUNAS_NUMERICAS:
+            exprs.append(_expr_numero(col, tipo, cfg.COLUNAS_NUMERICAS[col]).alias(col))
+    return exprs
 
-# Usa o dicionário definido no config
-DIRS = cfg.DIRS
 
 # =========================================================
 # ⚡ AGENTE 1: INGESTÃO
 # =========================================================
 class IngestionAgent:
+    @staticmethod
+    def _ler_lazy(caminho, nome):
+        if nome.endswith('.csv'):
+            with open(caminho, 'r', encoding='utf-8', errors='ignore') as f:
+                sep = ';' if ';' in f.readline() else ','
+            # Tudo como texto: a tipagem é decidida pelo config, não pela inferência
+            return pl.scan_csv(caminho, separator=sep, null_values=NULOS, infer_schema=False)
+        if nome.endswith('.xlsx'):
+            return pl.read_excel(caminho).lazy()
+        if nome.endswith('.json'):
+            return pl.read_json(caminho).lazy()
+        return None
+
     @staticmethod
     def processar(uploaded_file):
         nome = uploaded_file.name.lower()
         suffix = os.path.splitext(nome)[1]
-        
+
+        conteudo = uploaded_file.getvalue()
+        if suffix == '.csv':
+            try:
+                conteudo.decode('utf-8')
+            except UnicodeDecodeError:
+                # Mesmo fallback do etl.py: o Polars só lê UTF-8, então converte de latin1
+                conteudo = conteudo.decode('latin1').encode('utf-8')
+
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(uploaded_file.getvalue())
+            tmp.write(conteudo)
             tmp_path = tmp.name
 
         try:
-            nulls = ["", " ", "null", "nan", "NaN", "NA", "None"]
-            if nome.endswith('.csv'):
-                with open(tmp_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    sep = ';' if ';' in f.readline() else ','
-                lf = pl.scan_csv(tmp_path, separator=sep, null_values=nulls, ignore_errors=True, infer_schema_length=10000)
-            elif nome.endswith('.xlsx'):
-                lf = pl.read_excel(tmp_path).lazy()
-            elif nome.endswith('.json'):
-                lf = pl.read_json(tmp_path).lazy()
-            else: 
-                os.unlink(tmp_path)
+            lf = IngestionAgent._ler_lazy(tmp_path, nome)
+            if lf is None:
                 return None, None, "Formato desconhecido"
 
-            total = lf.select(pl.len()).collect().item()
-            lf = lf.with_columns(pl.sum_horizontal(pl.all().is_null()).alias("nulos_row"))
-            lf_clean = lf.filter(pl.col("nulos_row") == 0).drop("nulos_row")
-            
-            boas = lf_clean.select(pl.len()).collect().item()
-            integridade = boas / total if total > 0 else 0
-            stats = {"total": total, "ruins": total - boas, "boas": boas, "pct": round(integridade * 100, 2)}
-
-            if integridade < 0.70:
-                os.unlink(tmp_path)
-                return None, stats, "REPROVADO"
-            
-            df_final = lf_clean.collect()
-            os.unlink(tmp_path)
+            schema = lf.collect_schema()
+            sucesso, msg = guardiao.verificar_colunas(schema.names())
+            if not sucesso:
+                return None, None, msg
+
+            # Nulos contados no valor original (antes da limpeza e da tipagem, que zeram
+            # inteiros vazios e anulam datas inválidas), como no Guardião
+            colunas = schema.names()
+            nulos_cols = [f"_nulo_{i}" for i in range(len(colunas))]
+            lf = lf.with_columns(
+                (~pl.any_horizontal(pl.all().is_null())).alias("_completa"),
+                *[pl.col(col).is_null().alias(nome) for col, nome in zip(colunas, nulos_cols)],
+            )
+            textos = [col for col, tipo in schema.items() if tipo == pl.String]
+            lf = lf.with_columns(pl.col(textos).str.replace_all('"', '', literal=True).str.strip_chars())
+            lf = lf.with_columns(_plano_tipagem(schema))
+            lf = lf.with_columns((pl.col("_completa") & pl.col("order_date").is_not_null()).alias("_valida"))
+
+            lf_stats = lf.select(
+                pl.len().alias("total"),
+                pl.col("_completa").sum().alias("boas"),
+                pl.col("_valida").sum().alias("validas"),
+                *[pl.col(nome).sum() for nome in nulos_cols],
+            )
+            lf_clean = lf.filter(pl.col("_valida")).drop("_completa", "_valida", *nulos_cols)
+
+            # Um único collect: o trecho comum (leitura + tipagem) é executado uma vez
+            df_stats, df_final = pl.collect_all([lf_stats, lf_clean])
+
+            total, boas, validas, *nulos = df_stats.row(0)
+            # Mesma regra e mesmo relatório (nulos por coluna) do Guardião
+            integridade = guardiao.Integridade(minimo=cfg.INTEGRIDADE_MINIMA_POLARS)
+            integridade.somar(total, total - boas, dict(zip(colunas, nulos)))
+            aprovado, msg = integridade.avaliar()
+            pct = boas / total * 100 if total > 0 else 0
+            stats = {"total": total, "ruins": total - boas, "boas": boas, "pct": round(pct, 2),
+                     "sem_data": boas - validas, "nulos_por_coluna": integridade.taxas_nulos()}
+
+            if not aprovado:
+                return None, stats, msg
+            if df_final.is_empty():
+                return None, stats, "❌ Erro Crítico: Nenhuma data válida identificada. Verifique o formato YYYY-MM-DD."
             return df_final, stats, "APROVADO"
 
         except Exception as e:
-            if os.path.exists(tmp_path): os.unlink(tmp_path)
             return None, None, str(e)
+        finally:
+            if os.path.exists(tmp_path): os.unlink(tmp_path)
 
 # =========================================================
 # 🧠 AGENTE 2: ENGENHARIA DE RECURSOS (TEXTO-TEXTO FIX)
 # =========================================================
 class TypeAgent:
+    @staticmethod
+    def _converter_texto(serie: pl.Series):
+        """Tipa uma coluna de texto pela primeira amostra. None se nada for reconhecido."""
+        amostra = serie.drop_nulls().head(1)
+        if amostra.is_empty():
+            return None
+        val_str = str(amostra[0])
+
+        if ":" in val_str and len(val_str) <= 8 and not ("/" in val_str or "-" in val_str):
+            return None
+        elif "/" in val_str or "-" in val_str:
+            has_time = ":" in val_str
+            tipo = pl.Datetime if has_time else pl.Date
+            formatos = ["%d/%m/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S"] if has_time else ["%d/%m/%Y", "%Y-%m-%d"]
+            for fmt in formatos:
+                convertida = serie.str.strptime(tipo, fmt, strict=False)
+                if convertida.null_count() < serie.len():
+                    return convertida
+            return None
+        elif any(c.isdigit() for c in val_str):
+            # "R$ 1.234,56" -> 1234.56; ponto só é milhar quando há vírgula decimal
+            limpa = pl.col(serie.name).str.replace_all(r"R\$|\s", "")
+            limpa = (pl.when(limpa.str.contains(",", literal=True))
+                     .then(limpa.str.replace_all(".", "", literal=True).str.replace(",", ".", literal=True))
+                     .otherwise(limpa))
+            convertida = serie.to_frame().select(limpa.cast(pl.Float64, strict=False)).to_series()
+            if convertida.null_count() < serie.len():
+                return convertida.fill_null(0)
+        return None
+
     @staticmethod
     def converter_e_enriquecer(df: pl.DataFrame):
         df_novo = df.clone()
-        
-        # --- PASSO A: CONVERSÃO DE TIPOS ---
-        for col in df.columns:
-            amostra = df_novo[col].drop_nulls().head(1)
-            if amostra.is_empty(): continue
-            val_str = str(amostra[0])
-            
-            if ":" in val_str and len(val_str) <= 8 and not ("/" in val_str or "-" in val_str):
+
+        # --- PASSO A: CONVERSÃO DE TIPOS (só colunas ainda em texto) ---
+        for col, tipo in df.schema.items():
+            if tipo != pl.String:
                 continue
-            elif "/" in val_str or "-" in val_str:
-                try:
-                    has_time = ":" in val_str
-                    if has_time:
-                        df_novo = df_novo.with_columns(
-                            pl.col(col).str.strptime(pl.Datetime, "%d/%m/%Y %H:%M:%S", strict=False).alias(col)
-                        )
-                        if df_novo[col].null_count() == df_novo.height:
-                             df_novo = df_novo.with_columns(
-                                pl.col(col).str.strptime(pl.Datetime, "%Y-%m-%d %H:%M:%S", strict=False).alias(col)
-                            )
-                    else:
-                        df_novo = df_novo.with_columns(
-                            pl.col(col).str.strptime(pl.Date, "%d/%m/%Y", strict=False).alias(col)
-                        )
-                        if df_novo[col].null_count() == df_novo.height:
-                             df_novo = df_novo.with_columns(
-                                pl.col(col).str.strptime(pl.Date, "%Y-%m-%d", strict=False).alias(col)
-                            )
-                except: pass
-            elif any(c.isdigit() for c in val_str):
-                try:
-                    df_novo = df_novo.with_columns(
-                        pl.col(col).cast(pl.Utf8).str.replace_all("R$| |\\.", "").str.replace(",", ".").cast(pl.Float64, strict=False).fill_null(0)
-                    )
-                except: pass
+            convertida = TypeAgent._converter_texto(df_novo[col])
+            if convertida is not None:
+                df_novo = df_novo.with_columns(convertida.alias(col))
 
         # --- PASSO B: CRIAÇÃO DE NOVAS COLUNAS (FIXO) ---
         cols_temporais = [c for c, t in df_novo.schema.items() if t in (pl.Date, pl.Datetime)]
-        
+
         mapa_dias = {"1": "Segunda", "2": "Terça", "3": "Quarta", "4": "Quinta", "5": "Sexta", "6": "Sábado", "7": "Domingo"}
         mapa_meses = {"1": "01-Jan", "2": "02-Fev", "3": "03-Mar", "4": "04-Abr", "5": "05-Mai", "6": "06-Jun", "7": "07-Jul", "8": "08-Ago", "9": "09-Set", "10": "10-Out", "11": "11-Nov", "12": "12-Dez"}
 
+        exprs = []
         for col in cols_temporais:
-            exprs = [
+            exprs += [
                 pl.col(col).dt.weekday().cast(pl.Utf8).replace(mapa_dias).alias(f"{col}_dia_sem"),
                 pl.col(col).dt.month().cast(pl.Utf8).replace(mapa_meses).alias(f"{col}_mes"),
                 pl.col(col).dt.year().alias(f"{col}_ano"),
                 (pl.lit("Q") + pl.col(col).dt.quarter().cast(pl.Utf8)).alias(f"{col}_trimestre")
             ]
-            
+
             if df_novo.schema[col] == pl.Datetime:
                 exprs.append(pl.col(col).dt.hour().alias(f"{col}_hora"))
-            
-            df_novo = df_novo.with_columns(exprs)
-            
-        return df_novo
+
+        return df_novo.with_columns(exprs) if exprs else df_novo
 
 # =========================================================
 # 💾 AGENTE 3: STORAGE
 # =========================================================
+def publicar_no_dashboard(df):
+    """Substitui a base particionada lida pelo Dashboard (mesmo layout do etl.py)."""
+    escritor = particoes.EscritorParticionado()
+    try:
+        escritor.escrever(armazenamento.compactar_tipos(df.to_pandas(), cfg.PLANO_DTYPES))
+        escritor.concluir()
+    except BaseException:
+        escritor.descartar()
+        raise
+    return escritor.linhas
+
+
 def salvar_e_notificar(df, filename_orig, stats):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     name_clean = os.path.splitext(filename_orig)[0]
     parquet_name = f"{name_clean}_{timestamp}.parquet"
-    
-    os.makedirs(DIRS['TRUSTED'], exist_ok=True)
-    
-    path_parquet = os.path.join(DIRS['TRUSTED'], parquet_name)
+
+    os.makedirs(cfg.DIRS['TRUSTED'], exist_ok=True)
+    os.makedirs(cfg.DIRS['FLAGS'], exist_ok=True)
+
+    path_parquet = os.path.join(cfg.DIRS['TRUSTED'], parquet_name)
     df.write_parquet(path_parquet)
-    
-    flag_data = {"status": "READY", "file_path": path_parquet, "rows": stats['boas'], "generated_at": timestamp}
-    path_flag = os.path.join(DIRS['FLAGS'], f"{name_clean}_{timestamp}.json")
-    with open(path_flag, 'w') as f: json.dump(flag_data, f)
+
+    # A flag só aparece completa (escrita em temporário + rename)
+    flag_data = {"status": "READY", "file_path": path_parquet, "rows": stats['validas'], "generated_at": timestamp}
+    path_flag = os.path.join(cfg.DIRS['FLAGS'], f"{name_clean}_{timestamp}.json")
+    with open(path_flag + '.tmp', 'w') as f: json.dump(flag_data, f)
+    os.replace(path_flag + '.tmp', path_flag)
     return path_parquet, path_flag
 
 # --- WRAPPER PARA O STREAMLIT ---
 def salvar_pipeline(uploaded_file):
     df_pl, stats, msg = IngestionAgent.processar(uploaded_file)
     if df_pl is None:
-        return False, msg, None
-    
+        return False, msg, stats
+    stats['validas'] = df_pl.height
+
+    # O Dashboard lê as colunas tipadas; o parquet trusted leva também as derivadas
+    publicar_no_dashboard(df_pl)
     df_enriched = TypeAgent.converter_e_enriquecer(df_pl)
     salvar_e_notificar(df_enriched, uploaded_file.name, stats)
-    
-    return True, f"Processado com sucesso! {stats['pct']}% de integridade.", stats
\ No newline at end of file
+
+    msg_sucesso = f"Processado com sucesso! {df_pl.height} linhas, {stats['pct']}% de integridade."
+    if stats['sem_data'] > 0:
+        msg_sucesso += f" (Aviso: {stats['sem_data']} linhas removidas por data inválida)"
+    return True, msg_sucesso, stats
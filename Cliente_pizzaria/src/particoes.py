@@ -0,0 +1,306 @@
+import os
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import config as cfg
+import armazenamento
+import cubo
+import esbocos
+import snapshots
+
+# ==============================================================================
+# BASE PROCESSADA PARTICIONADA POR DATA
+# ==============================================================================
+# PASTA_VERSOES/<versão>/ (ver snapshots.py)
+#   vendas/2015-01.parquet    linhas de venda tipadas (uma partição por mês ou dia)
+#   cubo/2015-01.parquet      cubo de vendas da partição (ver cubo.py)
+#   pedidos/2015-01.parquet   pedidos distintos por data × hora da partição
+#   esbocos/2015-01.parquet   esboços HyperLogLog dos pedidos por célula (ver esbocos.py)
+#   watermark.json            maior order_datetime já ingerido
+#
+# Toda carga monta uma versão nova e a publica no fim; as funções de leitura
+# usam a versão atual, ou a pasta 'raiz' de uma versão fixada pelo leitor.
+# Carga completa: a versão nova começa vazia.
+# Carga incremental: a versão nova começa como cópia (hard links) da atual e
+# só as partições tocadas pelo delta são regravadas.
+#
+# As linhas de cada partição ficam ordenadas por data e, no mesmo dia, por
+# order_datetime (ordenar()); como as partições são lidas em ordem
+# cronológica, a base inteira sai ordenada e o Dashboard recorta o período
+# por busca binária (cubo.fatiar). Cubo, pedidos e esboços já saem do
+# groupby ordenados por data.
+
+SUBPASTAS = ('vendas', 'cubo', 'pedidos', 'esbocos')
+ARQUIVO_WATERMARK = 'watermark.json'
+
+
+# --- LAYOUT ---
+
+def pasta(subpasta, raiz=None):
+    return os.path.join(raiz or snapshots.pasta_atual(), subpasta)
+
+
+def caminho_particao(subpasta, chave, raiz=None):
+    return os.path.join(pasta(subpasta, raiz), f"{chave}.{cfg.FORMATO_ARMAZENAMENTO}")
+
+
+def listar_particoes(subpasta='vendas', raiz=None):
+    """Chaves das partições existentes, em ordem cronológica."""
+    raiz = raiz or snapshots.pasta_atual()
+    if raiz is None:
+        return []
+    diretorio = pasta(subpasta, raiz)
+    if not os.path.isdir(diretorio):
+        return []
+    sufixo = f".{cfg.FORMATO_ARMAZENAMENTO}"
+    return sorted(nome[:-len(sufixo)] for nome in os.listdir(diretorio) if nome.endswith(sufixo))
+
+
+def existe_base(raiz=None):
+    return len(listar_particoes(raiz=raiz)) > 0
+
+
+def chaves_particao(datas):
+    """Chave de partição ('2015-01' ou '2015-01-31') de cada linha, conforme a granularidade."""
+    if cfg.GRANULARIDADE_PARTICAO == 'D':
+        codigos = datas.dt.year * 10000 + datas.dt.month * 100 + datas.dt.day
+        formatar = lambda c: f"{c // 10000:04d}-{c // 100 % 100:02d}-{c % 100:02d}"
+    else:
+        codigos = datas.dt.year * 100 + datas.dt.month
+        formatar = lambda c: f"{c // 100:04d}-{c % 100:02d}"
+
+    # Formata só os códigos distintos (poucos) em vez de cada linha
+    return codigos.map({c: formatar(int(c)) for c in codigos.unique()})
+
+
+def momento(df):
+    """order_datetime de cada linha (order_date, se o horário não foi reconhecido)."""
+    if cfg.COLUNA_WATERMARK not in df.columns:
+        return df['order_date']
+    return df[cfg.COLUNA_WATERMARK].fillna(df['order_date'])
+
+
+def ordenar(df):
+    """
+    Linhas por data e, no mesmo dia, por momento(): a ordem em que as partições
+    são gravadas. Sem datas tipadas (CSV legado) a tabela volta como está.
+    """
+    horario = momento(df)
+    if df.empty or not all(pd.api.types.is_datetime64_any_dtype(s) for s in (df['order_date'], horario)):
+        return df
+    ordem = np.lexsort((horario.to_numpy(), df['order_date'].to_numpy()))
+    if (ordem[1:] > ordem[:-1]).all():
+        return df
+    return df.iloc[ordem]
+
+
+def _limite(parte):
+    """(data, momento) da primeira e da última linha de uma parte já ordenada."""
+    horario = momento(parte)
+    return (parte['order_date'].iat[0], horario.iat[0]), (parte['order_date'].iat[-1], horario.iat[-1])
+
+
+# --- LEITURA ---
+
+def ler(subpasta='vendas', colunas=None, chaves=None, raiz=None):
+    """Lê e concatena as partições (todas ou só 'chaves'). None se não houver nenhuma."""
+    raiz = raiz or snapshots.pasta_atual()
+    chaves = listar_particoes(subpasta, raiz) if chaves is None else chaves
+    caminhos = [caminho_particao(subpasta, chave, raiz) for chave in chaves]
+    return armazenamento.ler_tabelas(caminhos, colunas)
+
+
+# --- WATERMARK ---
+
+def calcular_watermark(df):
+    """Maior order_datetime (ou order_date, se o horário não foi reconhecido)."""
+    valor = df[cfg.COLUNA_WATERMARK].max() if cfg.COLUNA_WATERMARK in df.columns else pd.NaT
+    if pd.isna(valor):
+        valor = df['order_date'].max()
+    return valor
+
+
+def ler_watermark(raiz=None):
+    raiz = raiz or snapshots.pasta_atual()
+    if raiz is None:
+        return None
+    caminho = os.path.join(raiz, ARQUIVO_WATERMARK)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def gravar_watermark(valor, linhas, raiz):
+    dados = {
+        cfg.COLUNA_WATERMARK: pd.Timestamp(valor).isoformat(sep=' '),
+        'linhas': int(linhas),
+        'particoes': len(listar_particoes(raiz=raiz)),
+        'atualizado_em': datetime.now().strftime("%Y%m%d_%H%M%S"),
+    }
+    caminho = os.path.join(raiz, ARQUIVO_WATERMARK)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+    os.replace(caminho + '.tmp', caminho)
+    return dados
+
+
+# --- ESCRITA ---
+
+def gravar_agregados(tabela_cubo, pares_pedidos, tabela_esbocos, chave, raiz):
+    """Grava cubo, pedidos e esboços de uma partição (pedidos é removido se não for somável)."""
+    armazenamento.salvar_tabela(tabela_cubo, caminho_particao('cubo', chave, raiz))
+    armazenamento.salvar_tabela(tabela_esbocos, caminho_particao('esbocos', chave, raiz))
+
+    pedidos = cubo.construir_pedidos(pares_pedidos)
+    caminho_pedidos = caminho_particao('pedidos', chave, raiz)
+    if pedidos is not None:
+        armazenamento.salvar_tabela(pedidos, caminho_pedidos)
+    elif os.path.exists(caminho_pedidos):
+        # Contagens não somáveis: o Dashboard conta pedidos nas linhas originais
+        os.remove(caminho_pedidos)
+
+
+def gravar_particao(df, chave, raiz):
+    """Regrava uma partição de vendas completa (ordenada) e recalcula seus agregados."""
+    df = ordenar(df)
+    armazenamento.salvar_tabela(df, caminho_particao('vendas', chave, raiz))
+    gravar_agregados(cubo.construir_cubo(df), cubo.pedidos_distintos(df), esbocos.construir_esbocos(df), chave, raiz)
+
+
+class EscritorParticionado:
+    """
+    Monta uma versão nova da base (carga completa) ao lado da atual, recebendo
+    as linhas em uma ou mais partes (chunks). concluir() grava os agregados, o
+    watermark e publica a versão; descartar() apaga o que foi montado.
+    Cada parte é gravada ordenada; a partição que recebeu partes fora de ordem
+    (chunks não cronológicos) é reordenada uma vez em concluir().
+    """
+
+    def __init__(self):
+        self.versao = snapshots.NovaVersao()
+        self.raiz = self.versao.raiz
+        for subpasta in SUBPASTAS:
+            os.makedirs(pasta(subpasta, self.raiz), exist_ok=True)
+        self.linhas = 0
+        self._escritores = {}
+        self._cubos = {}
+        self._pares = {}
+        self._esbocos = {}
+        self._ultimos = {}
+        self._fora_de_ordem = set()
+        self._watermark = None
+
+    def escrever(self, df):
+        if df.empty:
+            return
+
+        df = ordenar(df)
+        for chave, parte in df.groupby(chaves_particao(df['order_date']), sort=False):
+            if pd.api.types.is_datetime64_any_dtype(parte['order_date']):
+                primeiro, ultimo = _limite(parte)
+                if chave in self._ultimos and primeiro < self._ultimos[chave]:
+                    self._fora_de_ordem.add(chave)
+                self._ultimos[chave] = max(ultimo, self._ultimos.get(chave, ultimo))
+            if chave not in self._escritores:
+                caminho = caminho_particao('vendas', chave, self.raiz)
+                self._escritores[chave] = armazenamento.EscritorIncremental(caminho)
+                self._cubos[chave], self._pares[chave], self._esbocos[chave] = [], [], []
+            self._escritores[chave].escrever(parte)
+            self._cubos[chave].append(cubo.construir_cubo(parte))
+            self._pares[chave].append(cubo.pedidos_distintos(parte))
+            self._esbocos[chave].append(esbocos.construir_esbocos(parte))
+
+        maximo = calcular_watermark(df)
+        if self._watermark is None or maximo > self._watermark:
+            self._watermark = maximo
+        self.linhas += len(df)
+
+    def concluir(self):
+        for chave, escritor in self._escritores.items():
+            escritor.concluir()
+            if chave in self._fora_de_ordem:
+                caminho = caminho_particao('vendas', chave, self.raiz)
+                armazenamento.salvar_tabela(ordenar(armazenamento.ler_tabela(caminho)), caminho)
+            pares = pd.concat(self._pares[chave], ignore_index=True)
+            gravar_agregados(cubo.combinar_cubos(self._cubos[chave]), pares,
+                             esbocos.combinar_esbocos(self._esbocos[chave]), chave, self.raiz)
+        gravar_watermark(self._watermark, self.linhas, self.raiz)
+        return self.versao.publicar(linhas=self.linhas, carga='completa')
+
+    def descartar(self):
+        for escritor in self._escritores.values():
+            escritor.descartar()
+        self.versao.descartar()
+
+
+# --- CARGA INCREMENTAL ---
+
+def _chaves_existentes(candidatos, existente):
+    """Marca as linhas de 'candidatos' cuja identidade (CHAVE_LINHA) já está em 'existente'."""
+    chave = cfg.CHAVE_LINHA
+    idx_candidatos = pd.MultiIndex.from_frame(candidatos[chave].astype('object'))
+    idx_existente = pd.MultiIndex.from_frame(existente[chave].astype('object'))
+    return idx_candidatos.isin(idx_existente)
+
+
+def mesclar_delta(delta):
+    """
+    Anexa um lote de vendas já tipado à base particionada, numa versão nova
+    (cópia da atual) publicada só se alguma partição mudar.
+    Ignora linhas repetidas (mesma CHAVE_LINHA) no próprio lote e na base.
+    Linhas posteriores ao watermark são novas por definição e não são comparadas.
+    Retorna (linhas_novas, linhas_duplicadas, partições_afetadas).
+    """
+    total = len(delta)
+    delta = delta.drop_duplicates(subset=cfg.CHAVE_LINHA, keep='last')
+
+    # Leituras na versão atual (fixada), escritas na cópia
+    origem = snapshots.pasta_atual()
+    nova = snapshots.NovaVersao(origem)
+    try:
+        novas, afetadas = _mesclar_em(delta, origem, nova.raiz)
+    except BaseException:
+        nova.descartar()
+        raise
+
+    if afetadas:
+        nova.publicar(linhas=ler_watermark(nova.raiz)['linhas'], carga='incremental')
+    else:
+        nova.descartar()
+    return novas, total - novas, afetadas
+
+
+def _mesclar_em(delta, origem, raiz):
+    watermark = ler_watermark(origem)
+    limite = pd.Timestamp(watermark[cfg.COLUNA_WATERMARK]) if watermark else None
+    existentes = set(listar_particoes(raiz=origem))
+
+    novas, afetadas, maximo = 0, [], None
+    for chave, parte in delta.groupby(chaves_particao(delta['order_date']), sort=True):
+        if chave in existentes:
+            base_particao = ler(chaves=[chave], raiz=origem)
+            tardias = momento(parte) <= limite if limite is not None else pd.Series(True, index=parte.index)
+            if tardias.any():
+                repetidas = pd.Series(False, index=parte.index)
+                repetidas[tardias] = _chaves_existentes(parte[tardias], base_particao)
+                parte = parte[~repetidas]
+            if parte.empty:
+                continue
+            parte = pd.concat([base_particao, parte], ignore_index=True)
+            novas += len(parte) - len(base_particao)
+        else:
+            novas += len(parte)
+
+        gravar_particao(parte, chave, raiz)
+        afetadas.append(chave)
+
+    if afetadas:
+        maximo = calcular_watermark(delta)
+        if limite is not None and limite > maximo:
+            maximo = limite
+        linhas = (watermark or {}).get('linhas', 0) + novas
+        gravar_watermark(maximo, linhas, raiz)
+
+    return novas, afetadas
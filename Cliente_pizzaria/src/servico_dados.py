@@ -0,0 +1,318 @@
+import hashlib
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import wraps
+import pandas as pd
+import pyarrow as pa
+from pyarrow import ipc
+import config as cfg
+
+# ==============================================================================
+# SERVIÇO DE DADOS COMPARTILHADO (UMA CÓPIA DE CADA BASE POR PROCESSO)
+# ==============================================================================
+# Todas as sessões do Streamlit rodam no mesmo processo: em vez de cada uma
+# carregar a sua cópia, as bases ficam aqui, uma vez por (base, versão em disco),
+# e as sessões recebem a mesma cópia, que é somente leitura.
+#
+# Contagem de referências: a sessão guarda no st.session_state um Emprestimo da
+# versão que está usando. Ao trocar de versão ou quando a sessão termina (o
+# session_state é coletado), a referência é devolvida. Uma base sem referências
+# e sem uso há cfg.TEMPO_OCIOSO_DADOS segundos é descarregada.
+#
+# Com cfg.DADOS_MMAP, cada DataFrame carregado é gravado uma vez como Arrow IPC
+# sem compressão em cfg.PASTA_CACHE_DADOS e lido por memory map: as colunas
+# (números, datas e códigos das categorias) apontam para as páginas do arquivo,
+# sem cópia, e o sistema operacional as compartilha também entre processos
+# (vários dashboards na mesma máquina).
+
+
+def _resumo_hash(valor):
+    return hashlib.sha1(repr(valor).encode('utf-8')).hexdigest()[:12]
+
+
+def _caminho_mmap(chave, versao):
+    return os.path.join(cfg.PASTA_CACHE_DADOS, f"{_resumo_hash(chave)}-{_resumo_hash(versao)}.arrow")
+
+
+def _gravar_ipc(df, caminho):
+    """Grava o DataFrame em Arrow IPC sem compressão (temporário + rename) e apaga versões antigas."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+    with ipc.new_file(caminho_tmp, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    os.replace(caminho_tmp, caminho)
+
+    # Versões anteriores da mesma base (quem ainda as mapeia segue lendo normalmente)
+    prefixo = os.path.basename(caminho).split('-')[0] + '-'
+    for nome in os.listdir(os.path.dirname(caminho)):
+        if nome.startswith(prefixo) and nome.endswith('.arrow') and nome != os.path.basename(caminho):
+            try:
+                os.remove(os.path.join(os.path.dirname(caminho), nome))
+            except OSError:
+                pass
+
+
+def _ler_ipc(caminho):
+    """DataFrame cujas colunas são visões (somente leitura) do arquivo mapeado em memória."""
+    tabela = ipc.open_file(pa.memory_map(caminho)).read_all()
+    return tabela.to_pandas(split_blocks=True)
+
+
+def _tamanho(valor):
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True, index=False).sum())
+    return 0
+
+
+class _Base:
+    def __init__(self, versao, valor):
+        self.versao = versao
+        self.valor = valor
+        self.tamanho = _tamanho(valor)
+        self.refs = 0
+        self.ultimo_uso = time.monotonic()
+
+
+class Emprestimo:
+    """Uso de uma base por uma sessão; devolver() (ou a coleta do objeto) libera a referência."""
+
+    def __init__(self, servico, chave, base):
+        self.chave = chave
+        self.versao = base.versao
+        self.dados = base.valor
+        self._devolucao = weakref.finalize(self, servico._devolver, chave, base)
+
+    @property
+    def ativo(self):
+        return self._devolucao.alive
+
+    def devolver(self):
+        self._devolucao()
+
+    def __enter__(self):
+        return self.dados
+
+    def __exit__(self, *erro):
+        self.devolver()
+
+
+class ServicoDados:
+    def __init__(self):
+        # RLock: a devolução pode rodar na coleta de lixo, dentro de um trecho já travado
+        self._lock = threading.RLock()
+        self._bases = {}
+        # Thread única que despeja as bases ociosas sem esperar o próximo acesso
+        self._varredor = None
+        self._estatisticas = {'hits': 0, 'misses': 0, 'despejos': 0,
+                              'ultima_carga_ms': 0.0, 'ultima_leitura_ms': 0.0}
+
+    # --- EMPRÉSTIMOS ---
+
+    def emprestar(self, chave, versao, carregar, mapear=True):
+        """
+        Empréstimo da base 'chave' na 'versao' (ex.: assinatura do arquivo).
+        carregar() só roda se essa versão não estiver em memória; com mapear e
+        cfg.DADOS_MMAP, um DataFrame carregado passa a ser lido por memory map.
+        Retorna None (sem empréstimo) se carregar() devolver None.
+        """
+        inicio = time.perf_counter()
+        with self._lock:
+            self._despejar_ociosas()
+            base = self._bases.get(chave)
+            if base is not None and base.versao == versao:
+                self._estatisticas['hits'] += 1
+                self._estatisticas['ultima_carga_ms'] = (time.perf_counter() - inicio) * 1000
+                return self._emprestimo(chave, base)
+
+        valor = self._carregar(chave, versao, carregar, mapear)
+        if valor is None:
+            return None
+
+        with self._lock:
+            base = self._bases.get(chave)
+            if base is None or base.versao != versao:
+                # A versão anterior sai do registro; quem ainda a usa fica com a sua até devolver
+                base = _Base(versao, valor)
+                self._bases[chave] = base
+            self._estatisticas['misses'] += 1
+            tempo_ms = (time.perf_counter() - inicio) * 1000
+            self._estatisticas['ultima_carga_ms'] = tempo_ms
+            self._estatisticas['ultima_leitura_ms'] = tempo_ms
+            return self._emprestimo(chave, base)
+
+    def obter(self, chave, versao, carregar, sessao=None, mapear=True):
+        """
+        Os dados da base. Com 'sessao' (ex.: st.session_state) o empréstimo fica
+        guardado nela até a sessão trocar de versão ou terminar; sem sessão ele é
+        devolvido na hora (a base fica em memória até ficar ociosa).
+        """
+        nome = f"servico_dados:{_resumo_hash(chave)}"
+        atual = sessao.get(nome) if sessao is not None else None
+        if atual is not None and atual.ativo and atual.versao == versao:
+            with self._lock:
+                self._estatisticas['hits'] += 1
+                self._estatisticas['ultima_carga_ms'] = 0.0
+            return atual.dados
+
+        emprestimo = self.emprestar(chave, versao, carregar, mapear)
+        if emprestimo is None:
+            return None
+        dados = emprestimo.dados
+        if sessao is None:
+            emprestimo.devolver()
+            return dados
+
+        sessao[nome] = emprestimo
+        if atual is not None:
+            atual.devolver()
+        return dados
+
+    def _emprestimo(self, chave, base):
+        base.refs += 1
+        base.ultimo_uso = time.monotonic()
+        return Emprestimo(self, chave, base)
+
+    def _devolver(self, chave, base):
+        with self._lock:
+            base.refs -= 1
+            base.ultimo_uso = time.monotonic()
+            self._despejar_ociosas()
+            if base.refs == 0 and self._bases.get(chave) is base:
+                # Sem novos acessos, a base ainda é descarregada quando ficar ociosa
+                self._agendar_despejo()
+
+    def _carregar(self, chave, versao, carregar, mapear):
+        if not (mapear and cfg.DADOS_MMAP):
+            return carregar()
+
+        caminho = _caminho_mmap(chave, versao)
+        if not os.path.exists(caminho):
+            valor = carregar()
+            if not isinstance(valor, pd.DataFrame):
+                return valor
+            _gravar_ipc(valor, caminho)
+            # A cópia lida do disco é descartada: devolve ao sistema a memória do Arrow
+            del valor
+            pa.default_memory_pool().release_unused()
+        return _ler_ipc(caminho)
+
+    # --- DESPEJO ---
+
+    def _despejar_ociosas(self):
+        agora = time.monotonic()
+        for chave, base in list(self._bases.items()):
+            if base.refs <= 0 and agora - base.ultimo_uso >= cfg.TEMPO_OCIOSO_DADOS:
+                if self._bases.get(chave) is base:
+                    del self._bases[chave]
+                    self._estatisticas['despejos'] += 1
+
+    def _agendar_despejo(self):
+        """Liga o varredor, se ainda não estiver rodando (chamado com a trava)."""
+        if self._varredor is None:
+            self._varredor = threading.Thread(target=self._varrer, name='servico_dados.despejo', daemon=True)
+            self._varredor.start()
+
+    def _varrer(self):
+        """
+        Dorme até a próxima base sem empréstimos completar cfg.TEMPO_OCIOSO_DADOS
+        e a despeja; termina quando não sobrar base sem empréstimos.
+        """
+        while True:
+            with self._lock:
+                self._despejar_ociosas()
+                prazos = [base.ultimo_uso + cfg.TEMPO_OCIOSO_DADOS
+                          for base in self._bases.values() if base.refs <= 0]
+                if not prazos:
+                    self._varredor = None
+                    return
+                espera = max(min(prazos) - time.monotonic(), 0.0)
+            time.sleep(espera)
+
+    def despejar_ociosas(self):
+        """Descarrega as bases sem empréstimos e sem uso há cfg.TEMPO_OCIOSO_DADOS segundos."""
+        with self._lock:
+            self._despejar_ociosas()
+
+    def invalidar(self):
+        """Tira todas as bases do registro (as sessões mantêm as suas até devolver)."""
+        with self._lock:
+            self._bases.clear()
+
+    # --- ESTATÍSTICAS ---
+
+    def estatisticas(self):
+        """Cópia dos contadores, mais bases em memória, empréstimos ativos e MB ocupados."""
+        with self._lock:
+            resumo = dict(self._estatisticas)
+            resumo['bases'] = len(self._bases)
+            resumo['emprestimos'] = sum(base.refs for base in self._bases.values())
+            resumo['memoria_mb'] = sum(base.tamanho for base in self._bases.values()) / 1e6
+        return resumo
+
+
+# Instância única do processo (compartilhada por todas as sessões)
+SERVICO = ServicoDados()
+
+
+# ==============================================================================
+# RESULTADOS DERIVADOS (KPIs E DADOS DOS GRÁFICOS)
+# ==============================================================================
+# Funções puras da camada de análise (analise.py) recebem a versão da base e
+# a especificação do filtro e devolvem KPIs e dados de gráfico. Como a versão
+# publicada não muda, (função, versão, filtro) identifica o resultado: o
+# mesmo estado de filtros em qualquer sessão sai daqui, sem recalcular.
+# Os resultados são compartilhados: quem os recebe não deve alterá-los.
+
+class CacheResultados:
+    """LRU de resultados com até 'limite' entradas (padrão: cfg.MAX_RESULTADOS), comum a todas as sessões."""
+
+    def __init__(self, limite=None):
+        self.limite = limite
+        self._lock = threading.Lock()
+        self._resultados = OrderedDict()
+        self._estatisticas = {'hits': 0, 'misses': 0}
+
+    def obter(self, chave, calcular):
+        """Resultado de 'chave'; calcular() só roda se ele não estiver guardado."""
+        with self._lock:
+            if chave in self._resultados:
+                self._resultados.move_to_end(chave)
+                self._estatisticas['hits'] += 1
+                return self._resultados[chave]
+
+        # Fora da trava: sessões com filtros diferentes calculam em paralelo
+        resultado = calcular()
+        with self._lock:
+            self._estatisticas['misses'] += 1
+            self._resultados[chave] = resultado
+            while len(self._resultados) > (self.limite or cfg.MAX_RESULTADOS):
+                self._resultados.popitem(last=False)
+        return resultado
+
+    def invalidar(self):
+        with self._lock:
+            self._resultados.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {**self._estatisticas, 'resultados': len(self._resultados)}
+
+
+RESULTADOS = CacheResultados()
+
+
+def memorizar(funcao):
+    """
+    Decorador: memoiza funcao(versao, filtro, ...) em RESULTADOS. Os argumentos
+    formam a chave (precisam ser hasheáveis), junto com cfg.PASTA_VERSOES.
+    A função original fica em .__wrapped__ (cálculo sem cache).
+    """
+    @wraps(funcao)
+    def memorizada(*args, **kwargs):
+        chave = (funcao.__module__, funcao.__qualname__, cfg.PASTA_VERSOES, args, tuple(sorted(kwargs.items())))
+        return RESULTADOS.obter(chave, lambda: funcao(*args, **kwargs))
+    return memorizada
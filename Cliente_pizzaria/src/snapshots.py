@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+from datetime import datetime
+import config as cfg
+
+# ==============================================================================
+# VERSÕES DA BASE PROCESSADA (SNAPSHOTS)
+# ==============================================================================
+# PASTA_VERSOES/
+#   20261017_202331_482913/   uma pasta por carga publicada (não muda depois)
+#     VERSAO.json             quando foi criada, linhas e versão de origem
+#   20261017_211502_090417/
+#   ATUAL.json                ponteiro para a versão lida pelo Dashboard
+#
+# Publicação: a carga monta a pasta em '<versão>.nova', renomeia para
+# '<versão>' e só então troca o ponteiro (temporário + rename). Quem lê vê a
+# versão anterior inteira ou a nova inteira, e uma carga que falha não toca na
+# atual. Rollback é só trocar o ponteiro. Ficam as cfg.VERSOES_RETIDAS mais
+# recentes (e a atual, se for mais antiga que elas).
+#
+# Como uma versão não muda depois de publicada, o nome dela identifica os dados
+# (chave de cache, sem varrer mtimes) e o leitor pode fixá-la: resolve o
+# ponteiro uma vez e lê tudo da mesma pasta, mesmo se outra for publicada.
+
+ARQUIVO_PONTEIRO = 'ATUAL.json'
+ARQUIVO_METADADOS = 'VERSAO.json'
+SUFIXO_NOVA = '.nova'
+
+
+def _agora():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def _gravar_json(dados, caminho):
+    """Grava o JSON num temporário e publica com os.replace (atômico)."""
+    caminho_tmp = f"{caminho}.{os.getpid()}.tmp"
+    with open(caminho_tmp, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(caminho_tmp, caminho)
+
+
+def _ler_json(caminho):
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# --- LEITURA ---
+
+def pasta_versao(versao):
+    return os.path.join(cfg.PASTA_VERSOES, versao)
+
+
+def listar_versoes():
+    """Versões publicadas, da mais antiga para a mais recente (o nome começa pela data)."""
+    if not os.path.isdir(cfg.PASTA_VERSOES):
+        return []
+    return sorted(entrada.name for entrada in os.scandir(cfg.PASTA_VERSOES)
+                  if entrada.is_dir() and not entrada.name.endswith(SUFIXO_NOVA))
+
+
+def versao_atual():
+    """Nome da versão apontada por ATUAL.json; None se não houver (ou se ela sumiu)."""
+    ponteiro = _ler_json(os.path.join(cfg.PASTA_VERSOES, ARQUIVO_PONTEIRO))
+    if ponteiro is None or not os.path.isdir(pasta_versao(ponteiro['versao'])):
+        return None
+    return ponteiro['versao']
+
+
+def pasta_atual():
+    """Pasta da versão atual; None se ainda não houver versão publicada."""
+    versao = versao_atual()
+    return pasta_versao(versao) if versao else None
+
+
+def metadados(versao):
+    """Conteúdo do VERSAO.json da versão (dict vazio se faltar)."""
+    return _ler_json(os.path.join(pasta_versao(versao), ARQUIVO_METADADOS)) or {}
+
+
+def resumo_versoes():
+    """Metadados de cada versão, da mais recente para a mais antiga, com a chave 'atual'."""
+    atual = versao_atual()
+    return [{**metadados(versao), 'versao': versao, 'atual': versao == atual}
+            for versao in reversed(listar_versoes())]
+
+
+# --- PUBLICAÇÃO ---
+
+def _clonar(origem, destino):
+    """
+    Copia a pasta 'origem' para 'destino' com hard links (sem copiar dados).
+    Seguro porque toda escrita da base troca o arquivo (temporário + os.replace)
+    em vez de alterá-lo: a versão de origem nunca é modificada.
+    """
+    def vincular(src, dst):
+        try:
+            os.link(src, dst)
+        except OSError:
+            # Sistema de arquivos sem hard links: copia
+            shutil.copy2(src, dst)
+    shutil.copytree(origem, destino, copy_function=vincular)
+
+
+class NovaVersao:
+    """
+    Pasta de uma versão em montagem. Com 'origem' (pasta de uma versão), começa
+    como cópia dela, para cargas que regravam só parte da base. publicar() a
+    torna a versão atual; descartar() apaga o que foi montado.
+    """
+
+    def __init__(self, origem=None):
+        # Data com microssegundos: a ordem dos nomes é a ordem de criação
+        self.versao = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.raiz = pasta_versao(self.versao) + SUFIXO_NOVA
+        self.origem = os.path.basename(origem) if origem else None
+        os.makedirs(cfg.PASTA_VERSOES, exist_ok=True)
+        if origem:
+            _clonar(origem, self.raiz)
+        else:
+            os.makedirs(self.raiz)
+
+    def publicar(self, **info):
+        """Fecha a versão (VERSAO.json + rename), troca o ponteiro e aplica a retenção."""
+        dados = {'criada_em': _agora(), 'origem': self.origem, **info}
+        _gravar_json(dados, os.path.join(self.raiz, ARQUIVO_METADADOS))
+        os.rename(self.raiz, pasta_versao(self.versao))
+        ativar(self.versao)
+        aplicar_retencao()
+        return self.versao
+
+    def descartar(self):
+        shutil.rmtree(self.raiz, ignore_errors=True)
+
+
+def ativar(versao):
+    """Aponta ATUAL.json para uma versão existente."""
+    if not os.path.isdir(pasta_versao(versao)):
+        raise FileNotFoundError(f"Versão inexistente: {versao}")
+    _gravar_json({'versao': versao, 'ativada_em': _agora()},
+                 os.path.join(cfg.PASTA_VERSOES, ARQUIVO_PONTEIRO))
+
+
+def reverter(versao=None):
+    """
+    Rollback: volta para 'versao' ou, se omitida, para a versão anterior à atual.
+    Retorna (sucesso, mensagem).
+    """
+    versoes = listar_versoes()
+    atual = versao_atual()
+    if versao is None:
+        anteriores = [v for v in versoes if atual is None or v < atual]
+        if not anteriores:
+            return False, "❌ Não há versão anterior à atual."
+        versao = anteriores[-1]
+    if versao not in versoes:
+        return False, f"❌ Versão inexistente: {versao}"
+    ativar(versao)
+    return True, f"Base restaurada para a versão {versao}."
+
+
+def aplicar_retencao():
+    """Apaga as versões além das cfg.VERSOES_RETIDAS mais recentes (a atual nunca é apagada)."""
+    versoes = listar_versoes()
+    atual = versao_atual()
+    apagadas = []
+    for versao in versoes[:-cfg.VERSOES_RETIDAS] if cfg.VERSOES_RETIDAS > 0 else versoes:
+        if versao != atual:
+            shutil.rmtree(pasta_versao(versao), ignore_errors=True)
+            apagadas.append(versao)
+    return apagadas
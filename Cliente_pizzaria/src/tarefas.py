@@ -0,0 +1,173 @@
+import io
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import config as cfg
+import snapshots
+
+# ==============================================================================
+# TAREFAS DE ETL EM SEGUNDO PLANO
+# ==============================================================================
+# O botão de upload só enfileira os bytes do arquivo e recebe o id da tarefa;
+# etl.processar_dados roda num processo à parte (cfg.MAX_TAREFAS_ETL), sem
+# prender a sessão nem a thread do script do Streamlit. Operações sobre a base
+# atual, sem arquivo (ex.: etl.rebalancear_quartis), usam a mesma fila.
+#
+# O andamento fica em cfg.DIRS['FLAGS']/tarefa_<id>.json, no mesmo formato das
+# flags do ingestor.py (status, file_path, rows, generated_at; escrita atômica),
+# mais a etapa atual e a mensagem final:
+#   QUEUED -> RUNNING (leitura, validacao, tipagem, enriquecimento, gravacao) -> READY | ERROR
+# A base nova é publicada pelo próprio ETL como uma versão nova (snapshots.py),
+# então as sessões só veem a versão anterior ou a nova, nunca uma parcial.
+
+ETAPAS = ['leitura', 'validacao', 'tipagem', 'enriquecimento', 'gravacao']
+FINAIS = ('READY', 'ERROR')
+
+_POOL = None
+_FUTUROS = {}
+_LOCK = threading.Lock()
+
+
+def _agora():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def _destino():
+    """Pasta da versão publicada pelo ETL deste cliente (ver snapshots.py)."""
+    return snapshots.pasta_atual()
+
+
+def _caminho_status(id_tarefa):
+    return os.path.join(cfg.DIRS['FLAGS'], f"tarefa_{id_tarefa}.json")
+
+
+def _gravar_status(dados):
+    """Grava o status da tarefa (temporário + rename: quem lê nunca vê um JSON pela metade)."""
+    os.makedirs(cfg.DIRS['FLAGS'], exist_ok=True)
+    caminho = _caminho_status(dados['id'])
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(caminho + '.tmp', caminho)
+
+
+# --- LADO DO PROCESSO DE ETL ---
+
+def _executar(status, conteudo, modo):
+    """Roda no processo da fila: processa o upload e publica cada etapa no status."""
+    import etl
+
+    def progresso(etapa, linhas=None):
+        status['etapa'] = etapa
+        if linhas is not None:
+            status['rows'] = int(linhas)
+        _gravar_status(status)
+
+    status['status'] = 'RUNNING'
+    _gravar_status(status)
+
+    try:
+        if conteudo is None:
+            sucesso, msg = getattr(etl, status['operacao'])(progresso=progresso)
+        else:
+            arquivo = io.BytesIO(conteudo)
+            arquivo.name = status['arquivo']
+            opcoes = {'modo': modo} if modo else {}
+            sucesso, msg = etl.processar_dados(arquivo, progresso=progresso, **opcoes)
+    except Exception as e:
+        sucesso, msg = False, f"Erro no processamento: {e}"
+
+    status.update(status='READY' if sucesso else 'ERROR', mensagem=msg, generated_at=_agora(),
+                  file_path=_destino() if sucesso else None)
+    _gravar_status(status)
+    return sucesso, msg
+
+
+# --- LADO DO DASHBOARD ---
+
+def _pool():
+    global _POOL
+    if _POOL is None:
+        # spawn: o servidor do Streamlit tem várias threads, e fork copiaria travas em uso
+        _POOL = ProcessPoolExecutor(max_workers=cfg.MAX_TAREFAS_ETL,
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _POOL
+
+
+def _submeter(arquivo, operacao, conteudo, modo):
+    """Grava o status QUEUED, entrega a tarefa à fila e retorna o id."""
+    id_tarefa = f"{_agora()}_{uuid.uuid4().hex[:6]}"
+    status = {'id': id_tarefa, 'status': 'QUEUED', 'arquivo': arquivo, 'operacao': operacao, 'modo': modo,
+              'etapa': None, 'mensagem': None, 'file_path': None, 'rows': 0, 'generated_at': _agora()}
+    _gravar_status(status)
+
+    global _POOL
+    with _LOCK:
+        try:
+            futuro = _pool().submit(_executar, status, conteudo, modo)
+        except BrokenProcessPool:
+            # Um processo da fila morreu (ex.: falta de memória): recria a fila
+            _POOL = None
+            futuro = _pool().submit(_executar, status, conteudo, modo)
+        _FUTUROS[id_tarefa] = futuro
+    return id_tarefa
+
+
+def enviar(uploaded_file, modo=None):
+    """Enfileira o processamento do upload (UploadedFile ou arquivo com .name) e retorna o id da tarefa."""
+    return _submeter(uploaded_file.name, 'processar_dados', uploaded_file.getvalue(), modo)
+
+
+def enviar_operacao(operacao, descricao):
+    """
+    Enfileira etl.<operacao>(progresso=...), que trabalha sobre a base atual e
+    retorna (sucesso, mensagem); 'descricao' ocupa o lugar do nome do arquivo
+    no status. Retorna o id da tarefa.
+    """
+    return _submeter(descricao, operacao, None, None)
+
+
+def consultar(id_tarefa):
+    """Status atual da tarefa (dict do JSON); None se não existir."""
+    caminho = _caminho_status(id_tarefa)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        status = json.load(f)
+
+    # Processo que morreu sem gravar o status final
+    with _LOCK:
+        futuro = _FUTUROS.get(id_tarefa)
+    if status['status'] not in FINAIS and futuro is not None and futuro.done() and futuro.exception():
+        status.update(status='ERROR', mensagem=f"Erro no processamento: {futuro.exception()!r}",
+                      generated_at=_agora())
+        _gravar_status(status)
+    if status['status'] in FINAIS:
+        with _LOCK:
+            _FUTUROS.pop(id_tarefa, None)
+    return status
+
+
+def fracao(status):
+    """Andamento de 0 a 1 pela etapa atual (para a barra de progresso)."""
+    if status['status'] in FINAIS:
+        return 1.0
+    if status.get('etapa') not in ETAPAS:
+        return 0.0
+    return ETAPAS.index(status['etapa']) / len(ETAPAS)
+
+
+def aguardar(id_tarefa, timeout=None):
+    """Bloqueia até a tarefa terminar (scripts e benchmarks) e retorna o status final."""
+    with _LOCK:
+        futuro = _FUTUROS.get(id_tarefa)
+    if futuro is not None:
+        try:
+            futuro.result(timeout=timeout)
+        except Exception:
+            pass
+    return consultar(id_tarefa)
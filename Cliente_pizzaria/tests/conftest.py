@@ -0,0 +1,48 @@
+import io
+import pandas as pd
+import pytest
+import config as cfg
+import etl
+import analise
+import benchmark
+
+# ==============================================================================
+# BASE ISOLADA PARA OS TESTES
+# ==============================================================================
+# Cada teste grava versões, cache e flags numa pasta temporária (os dados do
+# cliente não são tocados) e começa com os caches do processo vazios.
+
+
+@pytest.fixture
+def base_isolada(tmp_path, monkeypatch):
+    monkeypatch.setattr(cfg, 'PASTA_VERSOES', str(tmp_path / 'pizzaria_versoes'))
+    monkeypatch.setattr(cfg, 'PASTA_PROCESSADA_LEGADA', str(tmp_path / 'pizzaria_sales'))
+    monkeypatch.setattr(cfg, 'ARQUIVOS_LEGADOS', [])
+    monkeypatch.setattr(cfg, 'DIRS', {'TRUSTED': str(tmp_path / 'trusted'), 'FLAGS': str(tmp_path / 'flags')})
+    monkeypatch.setattr(cfg, 'PASTA_CACHE_DADOS', str(tmp_path / 'cache'))
+    monkeypatch.setattr(cfg, 'MOTOR_ETL', 'pandas')
+    monkeypatch.setattr(cfg, 'MODO_INGESTAO', 'completo')
+    etl.invalidar_cache()
+    analise._SELECOES.invalidar()
+    yield tmp_path
+    etl.invalidar_cache()
+    analise._SELECOES.invalidar()
+
+
+@pytest.fixture
+def vendas():
+    """Vendas sintéticas (benchmark.gerar_vendas_csv), uma linha por CHAVE_LINHA."""
+    df = pd.read_csv(io.BytesIO(benchmark.gerar_vendas_csv(4_000, seed=7)))
+    return df.drop_duplicates(subset=cfg.CHAVE_LINHA).reset_index(drop=True)
+
+
+@pytest.fixture
+def enviar(base_isolada):
+    """enviar(df, modo) processa o DataFrame como um upload CSV; falha o teste se o ETL recusar."""
+    def enviar(df, modo='completo'):
+        arquivo = io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+        arquivo.name = 'vendas.csv'
+        sucesso, msg = etl.processar_dados(arquivo, modo=modo)
+        assert sucesso, msg
+        return msg
+    return enviar
@@ -0,0 +1,25 @@
+import config as cfg
+import etl
+import servico_dados
+
+
+def test_base_reaproveitada_entre_execucoes(enviar, vendas):
+    enviar(vendas)
+    versao = etl.versao_atual()
+    primeira = etl.carregar_dados(cfg.COLUNAS_DASHBOARD, versao=versao)
+    hits = servico_dados.SERVICO.estatisticas()['hits']
+
+    # Outra execução do script (ou outra sessão) recebe a mesma cópia, sem reler o disco
+    assert etl.carregar_dados(cfg.COLUNAS_DASHBOARD, versao=versao) is primeira
+    assert servico_dados.SERVICO.estatisticas()['hits'] == hits + 1
+    assert len(primeira) == len(vendas)
+
+
+def test_versao_nova_recarrega(enviar, vendas):
+    enviar(vendas.iloc[:1000])
+    antes = etl.carregar_dados(cfg.COLUNAS_DASHBOARD)
+
+    enviar(vendas)
+    depois = etl.carregar_dados(cfg.COLUNAS_DASHBOARD)
+    assert depois is not antes
+    assert len(antes) == 1000 and len(depois) == len(vendas)
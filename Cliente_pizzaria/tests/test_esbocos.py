@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+import config as cfg
+import esbocos
+import etl
+import analise
+
+# Erro típico do HyperLogLog: 1,04 / √m. Os ids são fixos (semente), então o
+# teste é determinístico; a margem de 4 erros típicos só falha com estimador errado.
+ERRO_TIPICO = 1.04 / np.sqrt(2 ** cfg.PRECISAO_HLL)
+MARGEM = 4 * ERRO_TIPICO
+
+
+def _estimar(ids):
+    registrador, posto = esbocos.registradores(ids)
+    registros = np.zeros((1, 2 ** cfg.PRECISAO_HLL), dtype=np.int8)
+    np.maximum.at(registros, (0, registrador.astype(np.int64)), posto)
+    return esbocos.estimar_total(registros)
+
+
+@pytest.mark.parametrize('distintos', [50, 3_000, 40_000, 400_000])
+def test_erro_dentro_do_limite(distintos):
+    ids = np.random.default_rng(distintos).choice(10 ** 9, distintos, replace=False)
+    assert abs(_estimar(ids) - distintos) / distintos <= MARGEM
+
+
+def test_repetidos_nao_mudam_a_estimativa():
+    ids = np.random.default_rng(1).choice(10 ** 9, 20_000, replace=False)
+    assert _estimar(np.concatenate([ids, ids[:5_000], ids])) == _estimar(ids)
+
+
+def test_combinar_igual_ao_esboco_do_todo(vendas):
+    df = etl._limpar_e_tipar(vendas)
+    metade = len(df) // 2
+    partes = [esbocos.construir_esbocos(df.iloc[:metade]), esbocos.construir_esbocos(df.iloc[metade:])]
+    pd.testing.assert_frame_equal(esbocos.combinar_esbocos(partes), esbocos.construir_esbocos(df))
+
+
+@pytest.mark.parametrize('categorias', [['Classic'], ['Veggie', 'Chicken']])
+def test_contagem_aproximada_do_dashboard(enviar, vendas, categorias):
+    enviar(vendas)
+    versao = etl.versao_atual()
+    filtro = analise.montar_filtro(categorias=categorias)
+
+    exatos = analise.kpis_financeiros(versao, filtro)
+    aproximados = analise.kpis_financeiros(versao, filtro, aproximado=True)
+    assert aproximados['pedidos_aproximados'] and not exatos['pedidos_aproximados']
+    assert abs(aproximados['pedidos'] - exatos['pedidos']) / exatos['pedidos'] <= MARGEM
+
+    por_hora = analise.pedidos_por_hora(versao, filtro).set_index('hour_of_day')['order_id']
+    estimados = analise.pedidos_por_hora(versao, filtro, aproximado=True).set_index('hour_of_day')['order_id']
+    assert list(estimados.index) == list(por_hora.index)
+    assert ((estimados - por_hora).abs() / por_hora <= MARGEM).all()
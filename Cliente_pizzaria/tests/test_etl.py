@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+import etl
+import analise
+
+# Os KPIs do Dashboard saem do cubo pré-agregado (e da tabela de pedidos ou
+# das linhas, na contagem de pedidos). Toda forma de carga tem de chegar nos
+# mesmos números que as linhas do arquivo.
+
+SELECOES = [None, ['Classic'], ['Veggie', 'Chicken']]
+
+
+def _kpis(categorias=None):
+    versao = etl.versao_atual()
+    filtro = analise.montar_filtro(categorias=categorias)
+    financeiros = analise.kpis_financeiros(versao, filtro)
+    return {
+        'faturamento': financeiros['faturamento'],
+        'pedidos': financeiros['pedidos'],
+        'dias': financeiros['dias'],
+        'pizzas': analise.kpis_operacionais(versao, filtro)['pizzas'],
+    }
+
+
+def _kpis_linhas(df, categorias=None):
+    if categorias:
+        df = df[df['pizza_category'].isin(categorias)]
+    return {
+        'faturamento': df['total_item_value'].sum(),
+        'pedidos': df['order_id'].nunique(),
+        'dias': pd.to_datetime(df['order_datetime']).dt.normalize().nunique(),
+        'pizzas': df['quantity'].sum(),
+    }
+
+
+@pytest.mark.parametrize('categorias', SELECOES)
+def test_cubo_igual_as_linhas(enviar, vendas, categorias):
+    enviar(vendas)
+    assert _kpis(categorias) == pytest.approx(_kpis_linhas(vendas, categorias))
+
+
+@pytest.mark.parametrize('categorias', SELECOES)
+def test_streaming_igual_ao_completo(enviar, vendas, monkeypatch, categorias):
+    # Vários chunks, e o último menor que os outros
+    monkeypatch.setattr(etl.cfg, 'TAMANHO_CHUNK', 700)
+    enviar(vendas, modo='streaming')
+    assert _kpis(categorias) == pytest.approx(_kpis_linhas(vendas, categorias))
+
+
+@pytest.mark.parametrize('categorias', SELECOES)
+def test_incremental_igual_ao_completo(enviar, vendas, categorias):
+    corte = vendas['order_id'].median()
+    primeiro, segundo = vendas[vendas['order_id'] <= corte], vendas[vendas['order_id'] > corte]
+    enviar(primeiro, modo='incremental')
+
+    # O segundo lote repete as 50 últimas vendas do primeiro: elas são ignoradas
+    msg = enviar(pd.concat([primeiro.tail(50), segundo]), modo='incremental')
+    assert "50 linhas já existentes" in msg
+    assert _kpis(categorias) == pytest.approx(_kpis_linhas(vendas, categorias))
+
+
+def test_incremental_sem_vendas_novas_nao_publica(enviar, vendas):
+    enviar(vendas, modo='incremental')
+    versao = etl.versao_atual()
+    enviar(vendas.sample(200, random_state=1), modo='incremental')
+    assert etl.versao_atual() == versao
+
+
+@pytest.mark.parametrize('categorias', SELECOES)
+def test_motor_polars_igual_ao_pandas(enviar, vendas, monkeypatch, categorias):
+    pytest.importorskip('polars')
+    monkeypatch.setattr(etl.cfg, 'MOTOR_ETL', 'polars')
+    enviar(vendas)
+    assert _kpis(categorias) == pytest.approx(_kpis_linhas(vendas, categorias))
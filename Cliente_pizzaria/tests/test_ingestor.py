@@ -0,0 +1,51 @@
+import io
+import pytest
+import etl
+import guardiao
+
+pl = pytest.importorskip('polars')
+import ingestor
+
+# O motor Polars conta os nulos no valor original, como o Guardião no pandas:
+# inteiros vazios (que a tipagem zera) e datas inválidas (que ela anula) não
+# podem mudar o relatório de nulos por coluna.
+
+
+def _arquivo(df):
+    arquivo = io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+    arquivo.name = 'vendas.csv'
+    return arquivo
+
+
+def _relatorios(df):
+    """(stats do Polars, mensagem do Polars, taxas do Guardião, mensagem do Guardião) do mesmo arquivo."""
+    _, stats, msg_polars = ingestor.IngestionAgent.processar(_arquivo(df))
+    integridade = guardiao.Integridade()
+    integridade.adicionar(etl._ler_upload(_arquivo(df)))
+    _, msg_guardiao = guardiao.validar_arquivo(etl._ler_upload(_arquivo(df)))
+    return stats, msg_polars, integridade.taxas_nulos(), msg_guardiao
+
+
+def test_inteiro_vazio_contado_como_nulo(vendas):
+    df = vendas.head(200).copy()
+    df['quantity'] = df['quantity'].astype(object)
+    df.loc[df.index[:80], 'quantity'] = None
+
+    stats, msg_polars, taxas, msg_guardiao = _relatorios(df)
+    assert stats['nulos_por_coluna'] == pytest.approx(taxas)
+    assert stats['nulos_por_coluna']['quantity'] == pytest.approx(40.0)
+    assert "Colunas com mais nulos: quantity (40.0%)" in msg_polars
+    assert "quantity (40.0%)" in msg_guardiao
+
+
+def test_data_vazia_e_data_invalida(vendas):
+    df = vendas.head(200).copy()
+    df.loc[df.index[:20], 'order_date'] = 'sem data'
+    df.loc[df.index[20:30], 'order_date'] = None
+
+    stats, _, taxas, _ = _relatorios(df)
+    assert stats['nulos_por_coluna'] == pytest.approx(taxas)
+    # Só as vazias são nulas; as inválidas saem depois, na falta de data válida
+    assert stats['nulos_por_coluna']['order_date'] == pytest.approx(5.0)
+    assert stats['nulos_por_coluna']['quantity'] == 0
+    assert stats['ruins'] == 10 and stats['sem_data'] == 20
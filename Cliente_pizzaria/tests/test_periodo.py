@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+import config as cfg
+import cubo
+import etl
+import analise
+
+# O período é recortado por busca binária na tabela ordenada por data
+# (cubo.fatiar); o resultado tem de ser o da comparação linha a linha.
+
+PERIODOS = [
+    (None, None),
+    ('2015-03-01', '2015-03-31'),
+    ('2015-02-14', '2015-02-14'),
+    ('2014-12-01', '2015-01-05'),   # começa antes da primeira venda
+    ('2015-12-20', '2016-02-01'),   # termina depois da última
+    ('2016-01-01', '2016-12-31'),   # sem vendas
+    ('2015-06-30', '2015-06-01'),   # fim antes do início
+]
+
+
+def _mascara_linha_a_linha(tabela, inicio, fim):
+    datas = tabela['order_date']
+    mask = pd.Series(True, index=tabela.index)
+    if inicio is not None:
+        mask &= datas >= pd.Timestamp(inicio)
+    if fim is not None:
+        mask &= datas <= pd.Timestamp(fim)
+    return mask
+
+
+@pytest.mark.parametrize('inicio, fim', PERIODOS)
+def test_fatia_igual_a_mascara(enviar, vendas, inicio, fim):
+    enviar(vendas)
+    tabela = etl.carregar_dados(cfg.COLUNAS_DASHBOARD)
+    assert tabela['order_date'].is_monotonic_increasing
+
+    esperado = tabela[_mascara_linha_a_linha(tabela, inicio, fim)]
+    pd.testing.assert_frame_equal(cubo.fatiar(tabela, inicio, fim), esperado)
+
+
+@pytest.mark.parametrize('inicio, fim', PERIODOS[1:4])
+def test_kpis_do_periodo(enviar, vendas, inicio, fim):
+    enviar(vendas)
+    filtro = analise.montar_filtro(pd.Timestamp(inicio).date(), pd.Timestamp(fim).date(), categorias=['Classic'])
+    kpis = analise.kpis_financeiros(etl.versao_atual(), filtro)
+
+    datas = pd.to_datetime(vendas['order_datetime']).dt.normalize()
+    linhas = vendas[(datas >= inicio) & (datas <= fim) & (vendas['pizza_category'] == 'Classic')]
+    assert kpis['faturamento'] == pytest.approx(linhas['total_item_value'].sum())
+    assert kpis['pedidos'] == linhas['order_id'].nunique()